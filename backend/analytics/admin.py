@@ -0,0 +1,19 @@
+# analytics/admin.py
+
+from django.contrib import admin
+from .models import ProductDailySales, SellerDailySales
+
+@admin.register(SellerDailySales)
+class SellerDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('seller', 'date', 'revenue', 'units', 'orders')
+    list_filter = ('date',)
+    list_select_related = ('seller',)
+    date_hierarchy = 'date'
+
+@admin.register(ProductDailySales)
+class ProductDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('product', 'seller', 'date', 'revenue', 'units')
+    list_filter = ('date',)
+    list_select_related = ('product', 'seller')
+    raw_id_fields = ('product', 'seller')
+    date_hierarchy = 'date'
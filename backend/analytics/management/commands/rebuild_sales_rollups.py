@@ -0,0 +1,26 @@
+# analytics/management/commands/rebuild_sales_rollups.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from analytics.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recomputes the daily sales rollups from the paid orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Only rebuild days from this date (YYYY-MM-DD) on.")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError("--since must be a date (YYYY-MM-DD).")
+
+        products, sellers = rebuild(since, using=options['database'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {products} product rows and {sellers} seller rows."
+        ))
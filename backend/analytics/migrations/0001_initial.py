@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('store', '0005_product_image_variants'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='store.product')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_daily_sales', to='users.sellerprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Product daily sales',
+                'ordering': ('product', 'date'),
+                'indexes': [models.Index(fields=['seller', 'date'], name='analytics_prod_seller_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'date'), name='analytics_product_day_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SellerDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='users.sellerprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Seller daily sales',
+                'ordering': ('seller', 'date'),
+                'constraints': [models.UniqueConstraint(fields=('seller', 'date'), name='analytics_seller_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# analytics/models.py
+
+from django.db import models
+from django.dispatch import receiver
+from orders.models import order_paid
+from store.models import Product
+from users.models import SellerProfile
+
+# --- Rollup Tables ---
+# Sales are summed per day as orders are paid (see analytics/rollups.py),
+# so the seller dashboard reads a handful of rows per day instead of
+# scanning every order item. Days are order dates (Order.created_at, UTC).
+# They can always be rebuilt from the orders: rebuild_sales_rollups.
+
+# 1. --- SellerDailySales Model ---
+
+class SellerDailySales(models.Model):
+    seller = models.ForeignKey(SellerProfile, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0) # Sum of the quantities
+    orders = models.PositiveIntegerField(default=0) # Paid orders with at least one of the seller's products
+
+    class Meta:
+        verbose_name_plural = "Seller daily sales"
+        ordering = ('seller', 'date')
+        constraints = [
+            # Also the index for "one seller, a range of days"
+            models.UniqueConstraint(fields=['seller', 'date'], name='analytics_seller_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.seller} on {self.date}"
+
+# 2. --- ProductDailySales Model ---
+
+class ProductDailySales(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    # Copied from the product so "top products of a seller" needs no join
+    seller = models.ForeignKey(SellerProfile, on_delete=models.CASCADE, related_name='product_daily_sales')
+    date = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Product daily sales"
+        ordering = ('product', 'date')
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='analytics_product_day_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'date'], name='analytics_prod_seller_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} on {self.date}"
+
+# 3. --- Signals ---
+# Add each order to the rollups the moment it is paid.
+
+@receiver(order_paid)
+def add_paid_order_to_rollups(sender, order_id, using='default', **kwargs):
+    from .rollups import record_paid_order # rollups.py imports these models
+    record_paid_order(order_id, using=using)
@@ -0,0 +1,133 @@
+# analytics/rollups.py
+
+"""
+Keeping the daily sales rollups (analytics/models.py) up to date.
+
+- record_paid_order(): adds one newly paid order, with a couple of
+  small UPDATEs per product and seller. Runs in the transaction that
+  marks the order paid, so a rollup never counts an order twice or
+  misses one.
+- rebuild(): recomputes the rollups from the paid orders with a few
+  GROUP BY queries. Used by 'manage.py rebuild_sales_rollups', e.g.
+  after the first deploy or after editing orders by hand.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from .models import ProductDailySales, SellerDailySales
+
+BATCH_SIZE = 1000
+
+
+def add_to(model, lookup, using='default', defaults=None, **amounts):
+    """
+    Adds 'amounts' to the rollup row matching 'lookup', creating it
+    (with 'defaults' for the other columns) if it doesn't exist yet.
+    Safe against a concurrent first insert.
+    """
+    manager = model.objects.using(using)
+    changes = {field: F(field) + amount for field, amount in amounts.items()}
+    if manager.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic(using=using): # Savepoint, so a clash doesn't spoil the outer transaction
+            manager.create(**lookup, **(defaults or {}), **amounts)
+    except IntegrityError:
+        # Someone created the row in the meantime
+        manager.filter(**lookup).update(**changes)
+
+
+def record_paid_order(order_id, using='default'):
+    created_at = Order.objects.using(using).values_list('created_at', flat=True).get(pk=order_id)
+    day = timezone.localtime(created_at).date() # Same day as TruncDate in rebuild()
+
+    products = defaultdict(lambda: [Decimal('0'), 0]) # (product, seller) -> [revenue, units]
+    items = OrderItem.objects.using(using).filter(order_id=order_id, product__isnull=False)
+    for product_id, seller_id, price, quantity in items.values_list(
+        'product_id', 'product__seller_id', 'price', 'quantity'
+    ):
+        totals = products[(product_id, seller_id)]
+        totals[0] += price * quantity
+        totals[1] += quantity
+
+    sellers = defaultdict(lambda: [Decimal('0'), 0])
+    for (product_id, seller_id), (revenue, units) in products.items():
+        add_to(ProductDailySales, {'product_id': product_id, 'date': day}, using,
+               defaults={'seller_id': seller_id}, revenue=revenue, units=units)
+        sellers[seller_id][0] += revenue
+        sellers[seller_id][1] += units
+
+    for seller_id, (revenue, units) in sellers.items():
+        add_to(SellerDailySales, {'seller_id': seller_id, 'date': day}, using,
+               revenue=revenue, units=units, orders=1)
+
+
+def paid_items(since=None, using='default'):
+    items = OrderItem.objects.using(using).filter(order__paid=True, product__isnull=False)
+    if since is not None:
+        items = items.filter(order__created_at__date__gte=since)
+    return items.annotate(day=TruncDate('order__created_at'))
+
+
+def rebuild(since=None, using='default'):
+    """
+    Replaces the rollups (from 'since' on, or all of them) with totals
+    computed from the paid orders. Returns (product rows, seller rows).
+    """
+    revenue = Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+    with transaction.atomic(using=using):
+        for model in (ProductDailySales, SellerDailySales):
+            rows = model.objects.using(using)
+            if since is not None:
+                rows = rows.filter(date__gte=since)
+            rows.delete()
+
+        product_rows = (
+            ProductDailySales(
+                product_id=row['product_id'], seller_id=row['product__seller_id'], date=row['day'],
+                revenue=row['revenue'], units=row['units'],
+            )
+            for row in paid_items(since, using)
+            .values('product_id', 'product__seller_id', 'day')
+            .annotate(revenue=revenue, units=Sum('quantity'))
+            .order_by()
+            .iterator(chunk_size=BATCH_SIZE)
+        )
+        products = bulk_insert(ProductDailySales, product_rows, using)
+
+        seller_rows = (
+            SellerDailySales(
+                seller_id=row['product__seller_id'], date=row['day'],
+                revenue=row['revenue'], units=row['units'], orders=row['orders'],
+            )
+            for row in paid_items(since, using)
+            .values('product__seller_id', 'day')
+            .annotate(revenue=revenue, units=Sum('quantity'), orders=Count('order_id', distinct=True))
+            .order_by()
+            .iterator(chunk_size=BATCH_SIZE)
+        )
+        sellers = bulk_insert(SellerDailySales, seller_rows, using)
+    return products, sellers
+
+
+def bulk_insert(model, rows, using):
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.using(using).bulk_create(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        model.objects.using(using).bulk_create(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,111 @@
+import hashlib
+import hmac
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderItem
+from store.models import Product
+from users.models import CustomUser
+from .models import ProductDailySales, SellerDailySales
+
+
+@override_settings(RAZORPAY_KEY_SECRET='secret')
+class SalesRollupTests(TestCase):
+
+    def setUp(self):
+        self.seller = self.make_seller('seller@example.com')
+        self.other = self.make_seller('other@example.com')
+        self.customer = CustomUser.objects.create_user(
+            email='buyer@example.com', username='buyer', password='pass12345',
+        )
+        self.mug = self.make_product(self.seller, 'mug', '12.50')
+        self.lamp = self.make_product(self.seller, 'lamp', '40.00')
+        self.pen = self.make_product(self.other, 'pen', '2.00')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def make_seller(self, email):
+        user = CustomUser.objects.create_user(
+            email=email, username=email.split('@')[0], password='pass12345',
+            role=CustomUser.Role.SELLER,
+        )
+        user.sellerprofile.is_approved = True
+        user.sellerprofile.save()
+        return user
+
+    def make_product(self, seller, slug, price):
+        return Product.objects.create(
+            seller=seller.sellerprofile, name=slug.title(), description='-',
+            price=Decimal(price), stock=100, slug=slug,
+        )
+
+    def make_order(self, lines, rzp_id):
+        order = Order.objects.create(
+            customer=self.customer, first_name='A', last_name='B', email='a@b.c',
+            address='x', postal_code='1', city='y', razorpay_order_id=rzp_id,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, price=product.price, quantity=qty)
+            for product, qty in lines
+        ])
+        return order
+
+    def pay(self, rzp_id, payment_id='pay_1'):
+        signature = hmac.new(b'secret', f'{rzp_id}|{payment_id}'.encode(), hashlib.sha256).hexdigest()
+        return self.client.post('/api/orders/verify-payment/', {
+            'razorpay_order_id': rzp_id, 'razorpay_payment_id': payment_id,
+            'razorpay_signature': signature,
+        }, format='json')
+
+    def test_paid_orders_are_added_once(self):
+        self.make_order([(self.mug, 2), (self.lamp, 1), (self.pen, 3)], 'order_1')
+        self.make_order([(self.mug, 1)], 'order_2')
+        self.make_order([(self.lamp, 5)], 'order_unpaid')
+
+        self.pay('order_1')
+        self.pay('order_1') # A retried callback changes nothing
+        self.pay('order_2', 'pay_2')
+
+        day = SellerDailySales.objects.get(seller=self.seller.sellerprofile)
+        self.assertEqual((day.revenue, day.units, day.orders), (Decimal('77.50'), 4, 2))
+        self.assertEqual(ProductDailySales.objects.get(product=self.mug).units, 3)
+        self.assertEqual(SellerDailySales.objects.get(seller=self.other.sellerprofile).revenue, Decimal('6.00'))
+
+    def test_rebuild_matches_incremental(self):
+        self.make_order([(self.mug, 2), (self.pen, 1)], 'order_1')
+        self.make_order([(self.lamp, 1)], 'order_2')
+        self.pay('order_1')
+        self.pay('order_2', 'pay_2')
+        before = list(SellerDailySales.objects.values('seller', 'date', 'revenue', 'units', 'orders'))
+
+        SellerDailySales.objects.update(revenue=0)
+        call_command('rebuild_sales_rollups', stdout=None)
+        after = list(SellerDailySales.objects.values('seller', 'date', 'revenue', 'units', 'orders'))
+        self.assertEqual(before, after)
+        self.assertEqual(ProductDailySales.objects.count(), 3)
+
+    def test_endpoint(self):
+        self.make_order([(self.mug, 2), (self.lamp, 1)], 'order_1')
+        self.pay('order_1')
+        today = timezone.localdate()
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/seller/analytics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals'], {'revenue': Decimal('65.00'), 'units': 3, 'orders': 1})
+        self.assertEqual(response.data['daily'][0]['date'], today)
+        self.assertEqual([p['slug'] for p in response.data['top_products']], ['lamp', 'mug'])
+
+        yesterday = (today - timedelta(days=1)).isoformat()
+        response = self.client.get(f'/api/seller/analytics/?end={yesterday}')
+        self.assertEqual(response.data['totals']['orders'], 0)
+        self.assertEqual(self.client.get('/api/seller/analytics/?start=tomorrow').status_code, 400)
+
+        customer = APIClient()
+        customer.force_authenticate(self.customer)
+        self.assertEqual(customer.get('/api/seller/analytics/').status_code, 403)
@@ -0,0 +1,9 @@
+# analytics/urls.py
+
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # GET ?start=&end=&top= for the logged-in seller
+    path('', views.SellerAnalyticsView.as_view(), name='seller-analytics'),
+]
@@ -0,0 +1,99 @@
+# analytics/views.py
+
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from store.permissions import IsApprovedSeller
+from users.authentication import get_seller_profile
+from .models import ProductDailySales, SellerDailySales
+
+
+class SellerAnalyticsView(APIView):
+    """
+    Sales figures for the logged-in seller, read from the daily rollups
+    (so the cost depends on the number of days, not the number of orders):
+
+    - ?start=<date>&end=<date>  (inclusive; default: the last 30 days)
+    - ?top=<n>                  number of top products (default 10, max 50)
+
+    Returns the totals for the range, one row per day with sales, and
+    the best-selling products by revenue.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsApprovedSeller]
+    default_days = 30
+    max_days = 366 * 2
+    default_top = 10
+    max_top = 50
+
+    def get(self, request, *args, **kwargs):
+        start, end = self.get_range(request)
+        top = self.get_top(request)
+        seller = get_seller_profile(request)
+
+        days = SellerDailySales.objects.filter(seller=seller, date__range=(start, end)).order_by('date')
+        daily = list(days.values('date', 'revenue', 'units', 'orders'))
+
+        top_products = list(
+            ProductDailySales.objects.filter(seller=seller, date__range=(start, end))
+            .values('product_id', 'product__name', 'product__slug')
+            .annotate(revenue=Sum('revenue'), units=Sum('units'))
+            .order_by('-revenue', 'product_id')[:top]
+        )
+
+        return Response({
+            'start': start,
+            'end': end,
+            'totals': {
+                # Summed in Python: at most max_days rows
+                'revenue': sum((day['revenue'] for day in daily), 0),
+                'units': sum(day['units'] for day in daily),
+                'orders': sum(day['orders'] for day in daily),
+            },
+            'daily': daily,
+            'top_products': [
+                {
+                    'product_id': row['product_id'],
+                    'name': row['product__name'],
+                    'slug': row['product__slug'],
+                    'revenue': row['revenue'],
+                    'units': row['units'],
+                }
+                for row in top_products
+            ],
+        })
+
+    def get_range(self, request):
+        today = timezone.localdate()
+        end = self.parse('end', request.query_params.get('end')) or today
+        start = self.parse('start', request.query_params.get('start')) or end - timedelta(days=self.default_days - 1)
+        if start > end:
+            raise ValidationError({'start': 'Must not be after end.'})
+        if (end - start).days >= self.max_days:
+            raise ValidationError({'start': f'The range can span at most {self.max_days} days.'})
+        return start, end
+
+    def get_top(self, request):
+        try:
+            top = int(request.query_params.get('top', self.default_top))
+        except ValueError:
+            raise ValidationError({'top': 'A valid integer is required.'})
+        return max(1, min(top, self.max_top))
+
+    @staticmethod
+    def parse(name, value):
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({name: 'Use an ISO date (YYYY-MM-DD).'})
+        return day
@@ -1,3 +1,19 @@
 from django.contrib import admin
+from django.utils import timezone
+from .models import Job
 
-# Register your models here.
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'queue', 'status', 'attempts', 'run_at', 'worker')
+    list_filter = ('status', 'queue')
+    search_fields = ('name',)
+    readonly_fields = ('last_error', 'worker', 'locked_until', 'created_at', 'updated_at')
+    actions = ['retry_now']
+
+    @admin.action(description="Queue the selected jobs to run now")
+    def retry_now(self, request, queryset):
+        # Their attempts start over
+        updated = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.QUEUED, run_at=timezone.now(), attempts=0, updated_at=timezone.now(),
+        )
+        self.message_user(request, f"{updated} jobs queued.")
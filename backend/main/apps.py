@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        # Lets the metrics middleware time DRF serializers
+        from .metrics import instrument_serializers, registry
+        instrument_serializers()
+        # Job queue depth, read from the database on each scrape
+        from .jobs import collect_queue_metrics
+        registry.add_collector(collect_queue_metrics)
@@ -0,0 +1,456 @@
+# main/benchmarks.py
+
+"""
+End-to-end benchmarks for the storefront and checkout flows.
+
+1. 'seed_benchmark_data' fills the configured database with a synthetic
+   catalog and order history, with bulk inserts (see seed()). Point
+   DB_NAME (or the DB_* settings) at a scratch database first.
+2. 'run_benchmarks' sends requests to the real URL routes from N
+   threads and reports, per scenario, the latency percentiles,
+   throughput, error count and SQL queries per request. Requests go
+   through Django's full handler in-process, or to a running server
+   with --base-url.
+3. Each run is saved as JSON in BENCHMARK_RESULTS_DIR, and can be
+   compared with an earlier one (--compare-to).
+
+Payments go to the local fake gateway (orders/fake_gateway.py), so no
+real gateway is called.
+"""
+
+import json
+import math
+import platform
+import random
+import subprocess
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from analytics import rollups
+from orders.models import Order, OrderItem
+from store import search
+from store.cache import bump_version
+from store.models import Category, Product
+from users.models import CustomUser, SellerProfile
+
+PREFIX = 'bench'
+PASSWORD = 'bench-password'
+BATCH_SIZE = 5000
+
+# Stock large enough that checkout benchmarks never run out
+STOCK = 10**9
+
+WORDS = (
+    'wireless bluetooth speaker headphones leather wallet cotton shirt ceramic mug '
+    'steel bottle organic coffee running shoes yoga mat desk lamp gaming mouse '
+    'mechanical keyboard backpack sunglasses watch charger cable notebook pen '
+    'kitchen knife blender candle pillow blanket jacket hoodie sneakers'
+).split()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of 'values' (which needn't be sorted)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+# --- 1. Seeding ---
+
+class SeedError(Exception):
+    """The database already holds benchmark data."""
+
+
+def benchmark_users():
+    return CustomUser.objects.filter(username__startswith=f'{PREFIX}-')
+
+
+def clear():
+    """Deletes everything seed() created."""
+    users = benchmark_users()
+    # Orders keep their rows when the customer is deleted, so go first
+    Order.objects.filter(customer__in=users).delete()
+    users.delete() # Cascades to the seller profiles and their products
+    Category.objects.filter(slug__startswith=f'{PREFIX}-').delete()
+
+
+def seed(products=100_000, orders=1_000_000, sellers=50, customers=1000, categories=20,
+         days=365, seed=42, reset=False, log=print):
+    """
+    Bulk-creates the benchmark dataset. Everything it makes is named
+    'bench-...' so clear() can remove it again. Creation dates are
+    spread over the last 'days' days, so history and analytics queries
+    have realistic ranges to work on. The same 'seed' gives the same data.
+    """
+    if benchmark_users().exists():
+        if not reset:
+            raise SeedError("Benchmark data already exists; use --reset to replace it.")
+        log("Removing the previous benchmark data...")
+        clear()
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(PASSWORD) # Hashing once keeps seeding fast
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                username=f'{PREFIX}-seller-{i}', email=f'{PREFIX}-seller-{i}@example.com',
+                password=password, role=CustomUser.Role.SELLER,
+            )
+            for i in range(sellers)
+        ] + [
+            CustomUser(
+                username=f'{PREFIX}-customer-{i}', email=f'{PREFIX}-customer-{i}@example.com',
+                password=password,
+            )
+            for i in range(customers)
+        ])
+        # bulk_create skips the signal that creates seller profiles
+        SellerProfile.objects.bulk_create([
+            SellerProfile(user_id=user_id, store_name=f'Bench store {i}', is_approved=True)
+            for i, user_id in enumerate(
+                benchmark_users().filter(role=CustomUser.Role.SELLER).order_by('id').values_list('id', flat=True)
+            )
+        ])
+        Category.objects.bulk_create([
+            Category(name=f'Bench category {i}', slug=f'{PREFIX}-category-{i}') for i in range(categories)
+        ])
+    seller_ids = list(SellerProfile.objects.filter(user__in=benchmark_users()).values_list('id', flat=True))
+    category_ids = list(Category.objects.filter(slug__startswith=f'{PREFIX}-').values_list('id', flat=True))
+    customer_ids = list(
+        benchmark_users().filter(role=CustomUser.Role.CUSTOMER).values_list('id', flat=True)
+    )
+    log(f"{sellers} sellers, {customers} customers, {categories} categories")
+
+    def spread_dates(model, ids, batch, batches):
+        # auto_now_add can't be overridden on insert, so set it afterwards
+        # (one UPDATE per batch): older batches get older dates.
+        created_at = now - timedelta(days=days * (1 - (batch + 1) / batches))
+        model.objects.filter(id__in=ids).update(created_at=created_at)
+
+    prices = {} # product id -> price, for the order items
+    batches = max(math.ceil(products / BATCH_SIZE), 1)
+    for batch, start in enumerate(range(0, products, BATCH_SIZE)):
+        with transaction.atomic():
+            created = Product.objects.bulk_create([
+                Product(
+                    seller_id=rng.choice(seller_ids),
+                    category_id=rng.choice(category_ids) if category_ids else None,
+                    name=' '.join(rng.sample(WORDS, 3)).title(),
+                    description=' '.join(rng.choices(WORDS, k=12)),
+                    price=Decimal(rng.randint(100, 99_999)) / 100,
+                    stock=STOCK,
+                    slug=f'{PREFIX}-product-{i}',
+                )
+                for i in range(start, min(start + BATCH_SIZE, products))
+            ])
+            spread_dates(Product, [product.id for product in created], batch, batches)
+        prices.update((product.id, product.price) for product in created)
+        log(f"products: {min(start + BATCH_SIZE, products)}/{products}")
+
+    product_ids = list(prices)
+    if not product_ids:
+        orders = 0
+    batches = max(math.ceil(orders / BATCH_SIZE), 1)
+    for batch, start in enumerate(range(0, orders, BATCH_SIZE)):
+        with transaction.atomic():
+            carts = []
+            for _ in range(start, min(start + BATCH_SIZE, orders)):
+                lines = [(product_id, rng.randint(1, 3)) for product_id in
+                         rng.sample(product_ids, min(rng.randint(1, 3), len(product_ids)))]
+                order = Order(
+                    customer_id=rng.choice(customer_ids), first_name='Bench', last_name='Buyer',
+                    email='buyer@example.com', address='1 Main St', postal_code='12345',
+                    city='Bench', paid=rng.random() < 0.7,
+                    total_cost=sum(prices[product_id] * quantity for product_id, quantity in lines),
+                    item_count=sum(quantity for _, quantity in lines),
+                )
+                carts.append((order, lines))
+            Order.objects.bulk_create([order for order, _ in carts])
+            OrderItem.objects.bulk_create([
+                OrderItem(order_id=order.id, product_id=product_id, price=prices[product_id], quantity=quantity)
+                for order, lines in carts for product_id, quantity in lines
+            ])
+            spread_dates(Order, [order.id for order, _ in carts], batch, batches)
+        log(f"orders: {min(start + BATCH_SIZE, orders)}/{orders}")
+
+    # Bulk inserts skip the signals that keep these up to date
+    log("Rebuilding the search index and sales rollups...")
+    search.get_backend().rebuild()
+    rollups.rebuild()
+    for model in (Product, Category, SellerProfile):
+        bump_version(model)
+
+
+# --- 2. Scenarios ---
+# Each scenario does its untimed preparation and returns a function
+# that sends the one request being measured.
+
+def scenario_catalog(context, client, rng):
+    params = rng.choice([{}, {'sort': 'price'}, {'category': rng.choice(context.category_slugs)}])
+    return lambda: client.get('/api/products/', params)
+
+
+def scenario_product_detail(context, client, rng):
+    slug = rng.choice(context.product_slugs)
+    return lambda: client.get(f'/api/products/{slug}/')
+
+
+def scenario_token(context, client, rng):
+    email = rng.choice(context.customer_emails)
+    return lambda: client.post('/api/auth/token/', {'email': email, 'password': PASSWORD})
+
+
+def checkout_payload(context, rng):
+    return {
+        'first_name': 'Bench', 'last_name': 'Buyer', 'email': 'buyer@example.com',
+        'address': '1 Main St', 'postal_code': '12345', 'city': 'Bench',
+        'items': [
+            {'product_id': product_id, 'quantity': 1}
+            for product_id in rng.sample(context.product_ids, min(rng.randint(1, 3), len(context.product_ids)))
+        ],
+    }
+
+
+def scenario_checkout(context, client, rng):
+    payload = checkout_payload(context, rng)
+    return lambda: client.post('/api/orders/create/', payload)
+
+
+def scenario_pay(context, client, rng):
+    order = client.post('/api/orders/create/', checkout_payload(context, rng))
+    order_id = order.json()['id']
+    return lambda: client.post('/api/orders/pay/', {'order_id': order_id})
+
+
+def scenario_create_then_pay(context, client, rng):
+    # The old checkout flow: two round trips, timed together
+    payload = checkout_payload(context, rng)
+
+    def send():
+        order = client.post('/api/orders/create/', payload)
+        if order.status_code != 201:
+            return order
+        return client.post('/api/orders/pay/', {'order_id': order.json()['id']})
+    return send
+
+
+def scenario_checkout_and_pay(context, client, rng):
+    payload = checkout_payload(context, rng)
+    return lambda: client.post('/api/orders/checkout/', payload)
+
+
+SCENARIOS = {
+    'catalog': scenario_catalog,
+    'product-detail': scenario_product_detail,
+    'token': scenario_token,
+    'checkout': scenario_checkout,
+    'pay': scenario_pay,
+    'create-then-pay': scenario_create_then_pay,
+    'checkout-and-pay': scenario_checkout_and_pay,
+}
+
+
+# --- 3. Running ---
+
+class LocalClient:
+    """Sends requests through Django's handler in this process."""
+
+    def __init__(self, token):
+        self.client = Client(headers={'Authorization': f'Bearer {token}'})
+
+    def get(self, path, params=None):
+        return self.client.get(path, params or {})
+
+    def post(self, path, data):
+        return self.client.post(path, data, content_type='application/json')
+
+
+class RemoteClient:
+    """Sends requests to a running server over HTTP."""
+
+    def __init__(self, token, base_url):
+        import requests # Only needed for --base-url
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f'Bearer {token}'
+        self.base_url = base_url.rstrip('/')
+
+    def get(self, path, params=None):
+        return self.session.get(self.base_url + path, params=params, timeout=30)
+
+    def post(self, path, data):
+        return self.session.post(self.base_url + path, json=data, timeout=30)
+
+
+class Context:
+    """What the scenarios pick from: a sample of the seeded data."""
+
+    def __init__(self, sample=1000):
+        products = Product.objects.filter(slug__startswith=f'{PREFIX}-', available=True)
+        sampled = list(products.order_by('id').values_list('id', 'slug')[:sample])
+        if not sampled:
+            raise SeedError("No benchmark data; run 'manage.py seed_benchmark_data' first.")
+        self.product_ids = [product_id for product_id, _ in sampled]
+        self.product_slugs = [slug for _, slug in sampled]
+        self.category_slugs = list(
+            Category.objects.filter(slug__startswith=f'{PREFIX}-').values_list('slug', flat=True)
+        ) or ['none']
+        customers = list(
+            benchmark_users().filter(role=CustomUser.Role.CUSTOMER).order_by('id')[:sample]
+        )
+        self.customer_emails = [customer.email for customer in customers]
+        # One access token per customer, so the requests don't pay for a login
+        self.tokens = [str(RefreshToken.for_user(customer).access_token) for customer in customers]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_scenario(name, context, requests, concurrency, warmup=0, base_url=None, seed=0):
+    """
+    Sends 'requests' requests for one scenario from 'concurrency'
+    threads and returns the summary dict stored with the results.
+    """
+    build = SCENARIOS[name]
+    latencies, statuses, queries = [], [], []
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    def worker(index, count):
+        rng = random.Random(f'{seed}:{name}:{index}')
+        token = context.tokens[index % len(context.tokens)]
+        client = RemoteClient(token, base_url) if base_url else LocalClient(token)
+        counter = QueryCounter()
+        mine = []
+        try:
+            for n in range(warmup + count):
+                send = build(context, client, rng)
+                counter.count = 0
+                if base_url:
+                    start = time.perf_counter()
+                    response = send()
+                    elapsed = time.perf_counter() - start
+                else:
+                    with connection.execute_wrapper(counter):
+                        start = time.perf_counter()
+                        response = send()
+                        elapsed = time.perf_counter() - start
+                if n >= warmup:
+                    mine.append((elapsed, response.status_code, None if base_url else counter.count))
+        finally:
+            connection.close()
+            with lock:
+                for elapsed, status, count in mine:
+                    latencies.append(elapsed)
+                    statuses.append(status)
+                    if count is not None:
+                        queries.append(count)
+
+    threads = [threading.Thread(target=worker, args=(i, count)) for i, count in enumerate(per_thread) if count]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        'requests': len(latencies),
+        'errors': sum(1 for status in statuses if status >= 400),
+        'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(ms, 50), 2) if ms else None,
+        'p95_ms': round(percentile(ms, 95), 2) if ms else None,
+        'p99_ms': round(percentile(ms, 99), 2) if ms else None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+# --- 4. Results ---
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def describe_environment(concurrency, requests, base_url):
+    return {
+        'revision': git_revision(),
+        'database': connection.vendor,
+        'target': base_url or 'in-process',
+        'concurrency': concurrency,
+        'requests_per_scenario': requests,
+        'products': Product.objects.count(),
+        'orders': Order.objects.count(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+
+
+def save_results(results, directory, label=''):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = timezone.now().strftime('%Y%m%d-%H%M%S-%f') + (f'-{label}' if label else '') + '.json'
+    path = directory / name
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def load_results(reference, directory):
+    """Loads a saved run: a file path, or 'latest' for the newest one."""
+    if reference == 'latest':
+        saved = sorted(Path(directory).glob('*.json'))
+        if not saved:
+            return None
+        reference = saved[-1]
+    return json.loads(Path(reference).read_text())
+
+
+def change(old, new):
+    if old in (None, 0) or new is None:
+        return ''
+    return f'{(new - old) / old * 100:+.0f}%'
+
+
+def format_table(results, baseline=None):
+    """The report printed after a run, optionally against a baseline."""
+    header = f"{'scenario':<16}{'req':>6}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+    if baseline:
+        header += f"{'Δ p95':>8}{'Δ req/s':>9}"
+    lines = [header]
+    for name, row in results['scenarios'].items():
+        cells = [row['throughput'], row['p50_ms'], row['p95_ms'], row['p99_ms'], row['queries_per_request']]
+        line = f"{name:<16}{row['requests']:>6}{row['errors']:>5}" + ''.join(
+            f"{'-' if value is None else value:>9}" for value in cells
+        )
+        previous = (baseline or {}).get('scenarios', {}).get(name)
+        if previous:
+            line += f"{change(previous['p95_ms'], row['p95_ms']):>8}{change(previous['throughput'], row['throughput']):>9}"
+        lines.append(line)
+    return '\n'.join(lines)
@@ -0,0 +1,268 @@
+# main/jobs.py
+
+"""
+A job queue stored in the configured database.
+
+    from main.jobs import enqueue
+    enqueue(process_events, event_ids)                  # as soon as a worker is free
+    enqueue(send_reminder, order_id, delay=3600)        # in an hour
+    enqueue(rebuild_search_index, queue='slow', max_attempts=1)
+
+Jobs are rows of main.models.Job, written in the caller's transaction:
+if it rolls back the job was never queued, and no worker can start a
+job before the rows it needs are committed. `manage.py runworker` runs
+them. The function must live at module level, and its arguments must
+be JSON serializable (ids, not model instances).
+
+- Claiming: on PostgreSQL workers take due jobs with SELECT ... FOR
+  UPDATE SKIP LOCKED, so they never wait on each other. Elsewhere
+  (SQLite) a worker picks a candidate and claims it with a conditional
+  UPDATE (WHERE status = 'queued'); only one worker's UPDATE can match.
+- Retries: a job that raises is queued again after JOB_RETRY_BACKOFF
+  seconds, doubling with every attempt up to JOB_RETRY_BACKOFF_MAX,
+  until it has had max_attempts; then it stays 'failed', with the
+  traceback in last_error.
+- Leases: a worker holds a job for JOB_LEASE_SECONDS. If the worker
+  dies, the job is queued again when the lease runs out. A job may
+  therefore run more than once, and must be safe to repeat.
+- Jobs that succeed are deleted, so the table stays small.
+- Metrics (see main/metrics.py): jobs run, by outcome; how long they
+  waited past their run_at and how long they took; and, read from the
+  table on each scrape, the queue depth and the age of the oldest due
+  job. Workers serve their own metrics (runworker --metrics-port).
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .metrics import DURATION_BUCKETS, registry
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_WAIT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+registry.describe('emporia_jobs_total', 'counter',
+                  "Background jobs run, by job and outcome (succeeded, retried, failed).")
+registry.describe('emporia_job_wait_seconds', 'histogram',
+                  "Time from a job being due to a worker starting it.", JOB_WAIT_BUCKETS)
+registry.describe('emporia_job_duration_seconds', 'histogram',
+                  "Time to run a background job.", DURATION_BUCKETS)
+registry.describe('emporia_job_queue_depth', 'gauge', "Jobs in the queue table, by queue and status.")
+registry.describe('emporia_job_queue_oldest_seconds', 'gauge',
+                  "How long the oldest due job of each queue has been waiting.")
+
+
+# --- 1. Enqueuing ---
+
+def job_name(func):
+    name = f'{func.__module__}.{func.__qualname__}'
+    if '.' in func.__qualname__ or '<' in name:
+        raise ValueError(f"Jobs must be module-level functions, not {name}.")
+    return name
+
+
+def enqueue(func, *args, queue='default', run_at=None, delay=None, max_attempts=None, **kwargs):
+    """
+    Queues func(*args, **kwargs). 'queue', 'run_at', 'delay' (seconds)
+    and 'max_attempts' are options of the job, never passed to 'func'.
+    Returns the Job.
+    """
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    return Job.objects.create(
+        name=job_name(func), args=list(args), kwargs=kwargs, queue=queue, run_at=run_at,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+# --- 2. Running ---
+
+def claim_jobs(queues, worker_id, limit=1, now=None):
+    """Marks up to 'limit' due jobs as running for 'worker_id' and returns them."""
+    now = now or timezone.now()
+    due = Job.objects.filter(
+        queue__in=queues, status=Job.Status.QUEUED, run_at__lte=now,
+    ).order_by('run_at', 'id')
+    claim = {
+        'status': Job.Status.RUNNING,
+        'worker': worker_id,
+        'locked_until': now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+        'attempts': F('attempts') + 1,
+        'updated_at': now,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**claim)
+    else:
+        ids = [
+            pk for pk in due.values_list('id', flat=True)[:limit]
+            if Job.objects.filter(pk=pk, status=Job.Status.QUEUED).update(**claim)
+        ]
+    return list(Job.objects.filter(id__in=ids).order_by('run_at', 'id')) if ids else []
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt, after 'attempts' failed ones."""
+    return min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+
+
+def run_job(job):
+    """Runs a claimed job and records the outcome. Never raises."""
+    start = timezone.now()
+    registry.observe('emporia_job_wait_seconds', (('queue', job.queue),),
+                     max((start - job.run_at).total_seconds(), 0))
+    began = time.perf_counter()
+    # Only the worker still holding the job may finish it (its lease may
+    # have run out and another worker taken over)
+    mine = Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, worker=job.worker)
+    try:
+        import_string(job.name)(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            outcome = 'failed'
+            mine.update(status=Job.Status.FAILED, last_error=error, worker='', locked_until=None, updated_at=now)
+            logger.error("Job %s (%s) failed for good after %s attempts:\n%s",
+                         job.pk, job.name, job.attempts, error)
+        else:
+            outcome = 'retried'
+            mine.update(
+                status=Job.Status.QUEUED, last_error=error, worker='', locked_until=None, updated_at=now,
+                run_at=now + timedelta(seconds=retry_delay(job.attempts)),
+            )
+            logger.warning("Job %s (%s) failed (attempt %s of %s); will retry.",
+                           job.pk, job.name, job.attempts, job.max_attempts)
+    else:
+        outcome = 'succeeded'
+        mine.delete()
+    registry.observe('emporia_job_duration_seconds', (('name', job.name),), time.perf_counter() - began)
+    registry.inc('emporia_jobs_total', (('name', job.name), ('outcome', outcome)))
+    return outcome
+
+
+def requeue_expired(now=None):
+    """
+    Running jobs whose lease ran out (their worker died or hung) are
+    queued again, or failed if they are out of attempts.
+    """
+    now = now or timezone.now()
+    expired = Job.objects.filter(status=Job.Status.RUNNING, locked_until__lt=now)
+    reset = {'worker': '', 'locked_until': None, 'updated_at': now}
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.Status.FAILED, last_error="The worker running it stopped or timed out.", **reset
+    )
+    queued = expired.update(status=Job.Status.QUEUED, **reset)
+    return failed + queued
+
+
+def work_off(queues=('default',), worker_id='inline', now=None):
+    """Runs due jobs until none are left (tests, runworker --burst). Returns the number run."""
+    count = 0
+    while True:
+        jobs = claim_jobs(queues, worker_id, now=now)
+        if not jobs:
+            return count
+        for job in jobs:
+            run_job(job)
+            count += 1
+
+
+# --- 3. Worker ---
+
+class Worker:
+    """
+    Runs jobs from 'queues' on 'threads' threads until stop() is called.
+    Each thread claims one job at a time, and waits 'poll_interval'
+    seconds when there is nothing due. The thread calling run() also
+    requeues jobs whose lease expired.
+    """
+
+    def __init__(self, queues=('default',), threads=1, poll_interval=None, burst=False):
+        self.queues = list(queues)
+        self.threads = threads
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.burst = burst # Exit once nothing is due
+        self.id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self):
+        logger.info("Worker %s: %s thread(s) on queues %s.", self.id, self.threads, ', '.join(self.queues))
+        threads = [
+            threading.Thread(target=self.loop, args=(f'{self.id}:{n}',), name=f'job-worker-{n}')
+            for n in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                try:
+                    requeue_expired()
+                except Exception:
+                    logger.exception("Worker %s: requeuing expired jobs failed; will retry.", self.id)
+                    connection.close()
+                close_old_connections()
+                self.stopping.wait(self.poll_interval)
+        finally:
+            self.stop()
+            for thread in threads:
+                thread.join()
+            connection.close()
+
+    def loop(self, worker_id):
+        """Claims and runs jobs until stop() (or, in burst mode, until none are due)."""
+        try:
+            while not self.stopping.is_set():
+                try:
+                    close_old_connections()
+                    jobs = claim_jobs(self.queues, worker_id)
+                    for job in jobs:
+                        run_job(job)
+                except Exception:
+                    # e.g. "database is locked" or a dropped connection:
+                    # start over on a new connection after a pause
+                    logger.exception("Worker thread %s: polling failed; will retry.", worker_id)
+                    connection.close()
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                if not jobs:
+                    if self.burst:
+                        return
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+
+# --- 4. Queue Metrics ---
+
+def collect_queue_metrics(registry):
+    """Registry collector: queue depth and the age of the oldest due job."""
+    now = timezone.now()
+    depth = Job.objects.values_list('queue', 'status').annotate(count=Count('id')).order_by()
+    registry.set_gauge('emporia_job_queue_depth', {
+        (('queue', queue), ('status', status)): count for queue, status, count in depth
+    })
+    oldest = (
+        Job.objects.filter(status=Job.Status.QUEUED, run_at__lte=now)
+        .values_list('queue').annotate(oldest=Min('run_at')).order_by()
+    )
+    registry.set_gauge('emporia_job_queue_oldest_seconds', {
+        (('queue', queue),): (now - run_at).total_seconds() for queue, run_at in oldest
+    })
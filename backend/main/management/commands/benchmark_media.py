@@ -0,0 +1,74 @@
+# main/management/commands/benchmark_media.py
+
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.views.static import serve as static_serve
+
+from main.media import serve_media
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures how fast the app serves a media file: the old DEBUG-only "
+        "static() view vs. main/media.py in each mode, plus revalidation "
+        "(304) and Range requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--size', type=int, default=512, help="File size in KB.")
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        try:
+            path = 'products/variants/bench.jpg'
+            os.makedirs(os.path.join(media_root, 'products/variants'))
+            with open(os.path.join(media_root, path), 'wb') as f:
+                f.write(os.urandom(options['size'] * 1024))
+
+            with override_settings(MEDIA_ROOT=media_root):
+                self.run_all(path, media_root, options['requests'], options['size'])
+        finally:
+            shutil.rmtree(media_root)
+
+    def run_all(self, path, media_root, count, size_kb):
+        factory = RequestFactory()
+        self.stdout.write(f"{count} requests for a {size_kb} KB file\n")
+
+        def legacy():
+            return static_serve(factory.get('/media/' + path), path, document_root=media_root)
+
+        def media(**headers):
+            return lambda: serve_media(factory.get('/media/' + path, headers=headers), path)
+
+        self.bench("static() view (old DEBUG path)", legacy, count)
+        with override_settings(MEDIA_SERVE_MODE='django'):
+            self.bench("serve_media, FileResponse", media(), count)
+            etag = serve_media(factory.get('/media/' + path), path)['ETag']
+            self.bench("serve_media, If-None-Match (304)", media(If_None_Match=etag), count)
+            self.bench("serve_media, Range 64 KB (206)", media(Range='bytes=0-65535'), count)
+        with override_settings(MEDIA_SERVE_MODE='x-accel'):
+            self.bench("serve_media, X-Accel-Redirect", media(), count)
+
+    def bench(self, label, make_response, count):
+        transferred = 0
+        start = time.perf_counter()
+        for _ in range(count):
+            response = make_response()
+            # Drain the body, like the WSGI server would
+            if response.streaming:
+                for chunk in response.streaming_content:
+                    transferred += len(chunk)
+                response.close()
+            else:
+                transferred += len(response.content)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:<38} {count / elapsed:>9.0f} req/s  "
+            f"{transferred / elapsed / 2**20:>8.1f} MB/s through Python"
+        )
@@ -0,0 +1,80 @@
+# main/management/commands/run_benchmarks.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from main import benchmarks
+from orders.fake_gateway import FakeGateway
+from orders.gateway import get_gateway
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the storefront and checkout benchmarks against the data from "
+        "'seed_benchmark_data', prints p50/p95/p99 latency, throughput and "
+        "queries per request for each scenario, and saves the run to "
+        "BENCHMARK_RESULTS_DIR. Scenarios: " + ', '.join(benchmarks.SCENARIOS) + "."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=list(benchmarks.SCENARIOS), help="Repeatable; defaults to all.")
+        parser.add_argument('--requests', type=int, default=500, help="Measured requests per scenario.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--warmup', type=int, default=5, help="Unmeasured requests per thread first.")
+        parser.add_argument('--gateway-latency', type=float, default=0.05,
+                            help="Seconds the fake payment gateway takes to answer.")
+        parser.add_argument('--base-url',
+                            help="Benchmark a running server instead (e.g. http://127.0.0.1:8000). "
+                                 "It must use the same database and SECRET_KEY; for 'pay' point "
+                                 "its RAZORPAY_API_URL at 'manage.py run_fake_gateway'.")
+        parser.add_argument('--label', default='', help="Added to the results file name.")
+        parser.add_argument('--compare-to', help="A saved results file, or 'latest'.")
+        parser.add_argument('--no-save', action='store_true')
+
+    def handle(self, *args, **options):
+        directory = settings.BENCHMARK_RESULTS_DIR
+        baseline = None
+        if options['compare_to']:
+            baseline = benchmarks.load_results(options['compare_to'], directory)
+            if baseline is None:
+                raise CommandError(f"No saved results in {directory}.")
+
+        try:
+            context = benchmarks.Context()
+        except benchmarks.SeedError as e:
+            raise CommandError(str(e))
+
+        base_url = options['base_url']
+        gateway = None if base_url else FakeGateway(latency=options['gateway_latency']).start()
+        overrides = override_settings(
+            # The in-process client sends requests as 'testserver'
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            RAZORPAY_API_URL=gateway.url if gateway else settings.RAZORPAY_API_URL,
+        )
+        try:
+            with overrides:
+                get_gateway.cache_clear() # Built from the settings once per process
+                results = {
+                    'label': options['label'],
+                    'environment': benchmarks.describe_environment(
+                        options['concurrency'], options['requests'], base_url
+                    ),
+                    'scenarios': {},
+                }
+                for name in options['scenarios'] or benchmarks.SCENARIOS:
+                    self.stderr.write(f"Running {name}...")
+                    results['scenarios'][name] = benchmarks.run_scenario(
+                        name, context, options['requests'], options['concurrency'],
+                        warmup=options['warmup'], base_url=base_url,
+                    )
+        finally:
+            get_gateway.cache_clear()
+            if gateway:
+                gateway.stop()
+
+        self.stdout.write(benchmarks.format_table(results, baseline))
+        if not options['no_save']:
+            path = benchmarks.save_results(results, directory, options['label'])
+            self.stdout.write(f"Saved to {path}")
@@ -0,0 +1,94 @@
+# main/management/commands/runworker.py
+
+import signal
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.jobs import Worker
+from main.metrics import registry
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves this worker's metrics (Prometheus text format) on any path."""
+
+    def do_GET(self):
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Scrapes every few seconds would drown the worker's own log
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs jobs from the database job queue (see main/jobs.py) until "
+        "stopped with Ctrl+C / SIGTERM, which lets running jobs finish. "
+        "--processes starts that many worker processes, each with "
+        "--threads threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help="Queue to work on; repeatable (default: 'default').")
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4, help="Jobs run at once per process.")
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Seconds between polls when idle (default: JOB_POLL_INTERVAL).")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due.")
+        parser.add_argument('--metrics-port', type=int, default=None,
+                            help="Serve this worker's metrics on this port (process N uses port + N).")
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1 or options['threads'] < 1:
+            raise CommandError("--processes and --threads must be at least 1.")
+        if options['processes'] > 1:
+            return self.supervise(options)
+
+        if options['metrics_port']:
+            server = ThreadingHTTPServer(('0.0.0.0', options['metrics_port']), MetricsHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        worker = Worker(
+            queues=options['queues'] or ['default'], threads=options['threads'],
+            poll_interval=options['poll_interval'], burst=options['burst'],
+        )
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: worker.stop())
+        self.stdout.write(f"Worker {worker.id} started ({options['threads']} threads).")
+        worker.run()
+        self.stdout.write(f"Worker {worker.id} stopped.")
+
+    def supervise(self, options):
+        """Starts one single-process worker per --processes and waits for them."""
+        args = ['--threads', str(options['threads'])]
+        for queue in options['queues'] or []:
+            args += ['--queue', queue]
+        if options['poll_interval'] is not None:
+            args += ['--poll-interval', str(options['poll_interval'])]
+        if options['burst']:
+            args.append('--burst')
+
+        manage = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runworker']
+        children = []
+        for n in range(options['processes']):
+            extra = ['--metrics-port', str(options['metrics_port'] + n)] if options['metrics_port'] else []
+            children.append(subprocess.Popen(manage + args + extra))
+
+        def forward(signum, frame):
+            for child in children:
+                child.send_signal(signum)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, forward)
+
+        codes = [child.wait() for child in children]
+        if any(codes):
+            raise CommandError(f"Worker processes exited with {codes}.")
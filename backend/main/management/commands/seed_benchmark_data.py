@@ -0,0 +1,40 @@
+# main/management/commands/seed_benchmark_data.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the configured database with synthetic sellers, customers, "
+        "categories, products and orders for 'run_benchmarks'. Use a "
+        "scratch database (e.g. DB_NAME=/tmp/bench.sqlite3)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--sellers', type=int, default=50)
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--days', type=int, default=365,
+                            help="Spread creation dates over this many days.")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed (same seed, same data).")
+        parser.add_argument('--reset', action='store_true', help="Replace existing benchmark data.")
+        parser.add_argument('--clear', action='store_true', help="Only delete the benchmark data.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            benchmarks.clear()
+            self.stdout.write("Benchmark data deleted.")
+            return
+        try:
+            benchmarks.seed(
+                products=options['products'], orders=options['orders'], sellers=options['sellers'],
+                customers=options['customers'], categories=options['categories'], days=options['days'],
+                seed=options['seed'], reset=options['reset'], log=self.stdout.write,
+            )
+        except benchmarks.SeedError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS("Benchmark data ready."))
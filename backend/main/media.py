@@ -0,0 +1,150 @@
+# main/media.py
+
+"""
+Serving user-uploaded media (MEDIA_ROOT) in production.
+
+Which path is used depends on MEDIA_SERVE_MODE (see main/settings.py):
+
+- 'x-accel' / 'x-sendfile': Django only checks the file and sets the
+  headers; the web server sends the bytes (zero-copy, handles Range).
+  nginx example:
+
+      location /protected-media/ {
+          internal;
+          alias /path/to/backend/media/;
+      }
+
+- 'django': a FileResponse, which WSGI servers hand to sendfile() via
+  wsgi.file_wrapper. Single byte ranges ('Range: bytes=...') are
+  answered with 206 Partial Content.
+
+In every mode the response carries an ETag, Last-Modified and a
+Cache-Control header: files whose name is a content hash (the product
+image variants, see store/images.py) are cached for a year as
+'immutable', everything else for MEDIA_MAX_AGE.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+ONE_YEAR = 60 * 60 * 24 * 365
+
+# Media whose file names are content hashes; they never change.
+IMMUTABLE_PREFIXES = ('products/variants/',)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+
+def cache_control_for(path):
+    if path.startswith(IMMUTABLE_PREFIXES):
+        return {'public': True, 'max_age': ONE_YEAR, 'immutable': True}
+    return {'public': True, 'max_age': settings.MEDIA_MAX_AGE}
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) (inclusive) for a single 'bytes=' range, None
+    to send the whole file (no header, or one we don't support), or
+    raises ValueError if the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first: # 'bytes=-500': the last 500 bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_media(request, path):
+    """View for MEDIA_URL + <path>."""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation: # Outside MEDIA_ROOT
+        raise Http404("Not found")
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404("Not found")
+    if not os.path.isfile(fullpath):
+        raise Http404("Not found")
+
+    etag = f'"{int(stat.st_mtime)}-{stat.st_size}"'
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        response = not_modified
+    else:
+        response = file_response(request, path, fullpath, stat.st_size, etag)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    patch_cache_control(response, **cache_control_for(path))
+    return response
+
+
+def file_response(request, path, fullpath, size, etag):
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    mode = settings.MEDIA_SERVE_MODE
+
+    if mode == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + path)
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fullpath
+        return response
+
+    # Only honour Range if the client's copy is still current (If-Range)
+    if_range = request.headers.get('If-Range')
+    byte_range = None
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(fullpath, start, end - start + 1), status=206, content_type=content_type
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
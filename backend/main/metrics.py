@@ -0,0 +1,311 @@
+# main/metrics.py
+
+"""
+Per-view request metrics, exported in the Prometheus text format.
+
+MetricsMiddleware records, for every request:
+
+- how long it took (a latency histogram per view and method)
+- how many SQL queries it ran and how long they took, through
+  connection.execute_wrapper() on each database
+- how long DRF serializers spent building the response data
+- how big the response body was
+
+GET /internal/metrics/ returns everything collected so far (see
+metrics_view for who may read it). Requests slower than
+SLOW_REQUEST_SECONDS are logged as warnings together with their
+slowest SQL statements.
+
+The numbers live in the memory of each worker process. With several
+workers, each reports its own counts; Prometheus adds them up when they
+are scraped as separate targets. The cost per request is a few clock
+reads and dictionary updates, plus one per query, so it can stay on.
+"""
+
+import bisect
+import hmac
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Statements kept per request for the slow-request log
+MAX_CAPTURED_QUERIES = 100
+LOGGED_QUERIES = 10
+
+# The request being measured on this thread (None outside requests)
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.captured = [] # (seconds, sql), at most MAX_CAPTURED_QUERIES
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+# --- 1. Storage ---
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Counters, gauges and histograms keyed by (metric name, label values).
+    Updates take a lock, so worker threads can share one registry.
+
+    Collectors are functions called before each render(), for values
+    that are read rather than counted (e.g. the depth of the job queue).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.help = {}
+        self.counters = {} # Gauges too
+        self.histograms = {}
+        self.collectors = []
+
+    def describe(self, name, kind, text, buckets=None):
+        self.help[name] = (kind, text, buckets)
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, values):
+        """Replaces every value of gauge 'name' with 'values' ({labels: value})."""
+        with self.lock:
+            for key in [key for key in self.counters if key[0] == name]:
+                del self.counters[key]
+            for labels, value in values.items():
+                self.counters[(name, labels)] = value
+
+    def add_collector(self, collector):
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.help[name][2])
+            histogram.observe(value)
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self):
+        """Returns every metric in the Prometheus text format (0.0.4)."""
+        for collector in self.collectors:
+            try:
+                collector(self)
+            except Exception:
+                # A broken collector mustn't take the other metrics down
+                logger.exception("Metrics collector %s failed.", getattr(collector, '__name__', collector))
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: (list(h.counts), h.sum, h.count) for key, h in self.histograms.items()
+            }
+
+        lines = []
+        for name, (kind, text, buckets) in self.help.items():
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind in ('counter', 'gauge'):
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+                continue
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += bucket_count
+                    le = bound if bound == '+Inf' else format_value(bound)
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {format_value(total)}')
+                lines.append(f'{name}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+registry.describe('emporia_http_requests_total', 'counter', "Requests handled, by view, method and status.")
+registry.describe('emporia_http_request_duration_seconds', 'histogram',
+                  "Time to handle a request.", DURATION_BUCKETS)
+registry.describe('emporia_http_request_db_queries', 'histogram',
+                  "SQL queries run per request.", QUERY_COUNT_BUCKETS)
+registry.describe('emporia_http_request_db_seconds_total', 'counter', "Time spent in SQL queries.")
+registry.describe('emporia_http_request_serializer_seconds_total', 'counter',
+                  "Time spent building response data in DRF serializers.")
+registry.describe('emporia_http_response_size_bytes', 'histogram',
+                  "Size of the response body (streamed responses excluded).", SIZE_BUCKETS)
+registry.describe('emporia_http_slow_requests_total', 'counter',
+                  "Requests slower than SLOW_REQUEST_SECONDS.")
+
+
+# --- 2. Collecting ---
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper for every database connection during a request."""
+    metrics = _current.get()
+    if metrics is None: # e.g. a thread started by the request
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.queries += 1
+        metrics.query_time += elapsed
+        if len(metrics.captured) < MAX_CAPTURED_QUERIES:
+            metrics.captured.append((elapsed, sql))
+
+
+def instrument_serializers():
+    """
+    Times BaseSerializer.data, which is where DRF turns instances into
+    response data (for both single and many=True serializers). Nested
+    serializers are part of their parent's time. Called once, from
+    MainConfig.ready().
+    """
+    original = BaseSerializer.data
+    if getattr(original.fget, 'instrumented', False):
+        return
+
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            return original.fget(self)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics.serializing = False
+
+    data.instrumented = True
+    BaseSerializer.data = property(data)
+
+
+class MetricsMiddleware:
+    """
+    Measures every request; goes first in MIDDLEWARE so the time
+    includes the other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - start
+
+        self.record(request, response, metrics, elapsed)
+        return response
+
+    def record(self, request, response, metrics, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        # Unmatched URLs share one label, so random paths can't blow up
+        # the number of series
+        view = match.view_name if match else 'unmatched'
+        labels = (('view', view), ('method', request.method))
+
+        registry.inc('emporia_http_requests_total', labels + (('status', response.status_code),))
+        registry.observe('emporia_http_request_duration_seconds', labels, elapsed)
+        registry.observe('emporia_http_request_db_queries', labels, metrics.queries)
+        registry.inc('emporia_http_request_db_seconds_total', labels, metrics.query_time)
+        registry.inc('emporia_http_request_serializer_seconds_total', labels, metrics.serializer_time)
+        if not response.streaming:
+            registry.observe('emporia_http_response_size_bytes', labels, len(response.content))
+
+        if elapsed >= settings.SLOW_REQUEST_SECONDS:
+            registry.inc('emporia_http_slow_requests_total', labels)
+            self.log_slow_request(request, response, view, metrics, elapsed)
+
+    def log_slow_request(self, request, response, view, metrics, elapsed):
+        slowest = sorted(metrics.captured, key=lambda query: query[0], reverse=True)[:LOGGED_QUERIES]
+        lines = [
+            f"Slow request: {request.method} {request.path} ({view}) -> {response.status_code} "
+            f"in {elapsed:.3f}s; {metrics.queries} queries in {metrics.query_time:.3f}s, "
+            f"serializers {metrics.serializer_time:.3f}s"
+        ]
+        for seconds, sql in slowest:
+            lines.append(f"  {seconds * 1000:8.1f} ms  {sql}")
+        if metrics.queries > len(metrics.captured):
+            lines.append(f"  (only the first {len(metrics.captured)} queries were kept)")
+        logger.warning('\n'.join(lines))
+
+
+# --- 3. Exporting ---
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Only answers requests carrying
+    'Authorization: Bearer <METRICS_TOKEN>' when a token is set, or
+    coming from METRICS_ALLOWED_IPS (empty by default); everyone else
+    gets a 404.
+    """
+    token = settings.METRICS_TOKEN
+    allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS or (
+        token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    )
+    if not allowed:
+        raise Http404("Not found")
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,3 +1,48 @@
+# main/models.py
+
 from django.db import models
+from django.utils import timezone
+
+# 1. --- Job Model ---
+# One unit of background work in the database queue (see main/jobs.py).
+# Jobs that succeed are deleted, so the table only holds work that is
+# waiting, running or has given up.
+
+class Job(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        FAILED = "failed", "Failed" # Out of attempts; kept for inspection
+
+    queue = models.CharField(max_length=100, default='default')
+    # Dotted path of the function to call, e.g. 'orders.webhooks.process_events'
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    # Not before this time; pushed back after each failed attempt
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+
+    # Set while a worker holds the job. A running job whose lease ran out
+    # (its worker died) is queued again.
+    worker = models.CharField(max_length=255, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('run_at', 'id')
+        indexes = [
+            # What workers poll: due jobs of a queue, oldest first
+            models.Index(fields=['queue', 'status', 'run_at'], name='main_job_poll_idx'),
+            # Expired leases
+            models.Index(fields=['status', 'locked_until'], name='main_job_lease_idx'),
+        ]
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.name} ({self.status}, {self.queue})"
@@ -0,0 +1,144 @@
+# main/replicas.py
+
+"""
+Sends the catalog's read-only queries to read replicas.
+
+Replicas are extra entries in DATABASES, listed in DATABASE_REPLICAS
+(built from DB_REPLICAS in main/settings.py). With none configured,
+everything stays on 'default' and nothing here has any effect.
+
+Only views that opt in with ReplicaReadMixin read from a replica, and
+only for GET / HEAD / OPTIONS. Everything else (writes, checkout,
+seller views, the admin, management commands, background tasks) uses
+the primary.
+
+Replicas lag a little behind the primary, so a user who just wrote
+something (edited a product, placed an order) could read the old rows
+back. To avoid that, ReplicaPinningMiddleware notices requests that
+wrote to the database and pins their user to the primary for
+REPLICA_PIN_SECONDS. The pins live in the default cache, so it must be
+shared between workers (e.g. Redis) in production.
+
+Cached catalog responses built from a replica are kept for
+REPLICA_CACHE_TIMEOUT at most, so one built from rows that were
+already stale doesn't outlive the lag for long (see store/cache.py).
+"""
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+
+# Routing state of the current request (None outside requests)
+_state = ContextVar('replica_state', default=None)
+
+
+class RoutingState:
+    def __init__(self):
+        self.read_db = None # Replica alias used for reads, if any
+        self.wrote = False # Whether the request wrote to the database
+
+
+def reading_from_replica():
+    state = _state.get()
+    return state is not None and state.read_db is not None
+
+
+def choose_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+# --- 1. Pinning ---
+
+def _pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+
+def pin_to_primary(user):
+    caches['default'].set(_pin_key(user.id), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    if not getattr(user, 'is_authenticated', False):
+        return False
+    return caches['default'].get(_pin_key(user.id), False)
+
+
+# --- 2. Router ---
+
+class ReplicaRouter:
+    """
+    Reads go to the replica chosen for the current request, if any.
+    Writes always go to the primary, and are recorded so the user can
+    be pinned to it.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        return state.read_db if state is not None else None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+# --- 3. Request Hooks ---
+
+class ReplicaPinningMiddleware:
+    """
+    Tracks the routing state of each request, and pins users whose
+    request wrote to the database to the primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        # DRF copies the authenticated user onto the Django request
+        user = getattr(request, 'user', None)
+        if state.wrote and settings.DATABASE_REPLICAS and getattr(user, 'is_authenticated', False):
+            pin_to_primary(user)
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Mixin for read-only DRF views: safe requests read from a replica,
+    unless the user is pinned to the primary.
+
+    The choice is made in initial(), once the user is authenticated,
+    and undone in finalize_response(), which DRF always calls.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = _state.get()
+        if (
+            state is not None and settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS and not is_pinned(request.user)
+        ):
+            state.read_db = choose_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        state = _state.get()
+        if state is not None:
+            state.read_db = None
+        return super().finalize_response(request, response, *args, **kwargs)
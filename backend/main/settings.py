@@ -1,4 +1,4 @@
-from decouple import config
+from decouple import Choices, Csv, config
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -29,6 +29,8 @@ INSTALLED_APPS = [
     'users',
     'store',
     'orders',
+    'analytics',
+    'main', # Project-wide helpers and management commands
     # 3rd-party apps
     'rest_framework',
     'rest_framework_simplejwt',
@@ -36,12 +38,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so request timings include all the other middleware
+    'main.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Serves the collected static files (right after SecurityMiddleware)
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Pins users who just wrote something to the primary database
+    'main.replicas.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -68,28 +76,138 @@ WSGI_APPLICATION = 'main.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# DB_ENGINE picks the backend: 'sqlite' (the default, for development)
+# or 'postgresql' (production; configured with the DB_* variables).
+# 'python manage.py benchmark_checkout --compare' shows how checkout
+# throughput changes between them.
+
+DB_ENGINE = config('DB_ENGINE', default='sqlite', cast=Choices(['sqlite', 'postgresql']))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME'),
+            'USER': config('DB_USER', default=''),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Keep connections open between requests instead of paying
+            # for a new connection (and authentication) every time...
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            # ...and check them before reuse, so a connection the server
+            # has dropped is replaced instead of failing a request.
+            'CONN_HEALTH_CHECKS': True,
+            # QuerySet.iterator() (exports, rollup rebuilds, reindexing)
+            # uses server-side cursors on PostgreSQL, streaming rows
+            # instead of loading the whole result. Behind PgBouncer in
+            # transaction pooling mode they must be turned off.
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            # Use a real file for the test database (instead of the shared
+            # in-memory one) so concurrent checkout tests can open several
+            # connections that wait on each other's locks.
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+            'OPTIONS': {},
+        }
+    }
+    # SQLite allows one writer at a time. These settings (applied to
+    # every new connection) make that hurt less:
+    # - WAL: readers no longer block the writer, or the other way round
+    # - synchronous=NORMAL: safe with WAL, and no fsync on every commit
+    # - timeout: wait up to this many seconds for the write lock
+    #   (busy_timeout) instead of failing with "database is locked"
+    # - IMMEDIATE: transactions take the write lock when they start, so
+    #   two checkouts can't both read and then deadlock upgrading to a write
+    if config('DB_SQLITE_TUNED', default=True, cast=bool):
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            'timeout': config('DB_SQLITE_TIMEOUT', default=20, cast=int),
+            'transaction_mode': 'IMMEDIATE',
+        }
+
+
+# --- Read Replicas ---
+# DB_REPLICAS is a comma-separated list: file paths with SQLite, hosts
+# (host or host:port) with PostgreSQL. Each becomes a 'replica_N'
+# database with the same settings as 'default'. Public catalog views
+# read from them (see main/replicas.py). To try it locally with SQLite,
+# copy db.sqlite3 and set DB_REPLICAS=/path/to/the/copy.sqlite3.
+
+DATABASE_REPLICAS = []
+for number, replica in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        # Tests run against the primary's test database
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_ENGINE == 'postgresql':
+        host, _, port = replica.partition(':')
+        DATABASES[alias].update(HOST=host, PORT=port or DATABASES['default']['PORT'])
+    else:
+        DATABASES[alias]['NAME'] = replica
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['main.replicas.ReplicaRouter']
+
+# After writing, a user reads from the primary for this many seconds,
+# so they see their own changes even if the replicas lag behind
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+# Upper bound on how long a catalog cache entry built from a replica lives
+REPLICA_CACHE_TIMEOUT = config('REPLICA_CACHE_TIMEOUT', default=30, cast=int)
+
+
+# -----------------------------------------------------------------
+# METRICS
+# -----------------------------------------------------------------
+# Per-view latency, SQL and serializer metrics (see main/metrics.py),
+# scraped by Prometheus from /internal/metrics/.
+
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# Who may read /internal/metrics/: anyone sending 'Authorization: Bearer
+# <METRICS_TOKEN>' (when set), or these client addresses. No address is
+# trusted by default: behind a reverse proxy (e.g. the nginx of
+# MEDIA_SERVE_MODE='x-accel') every request comes from the proxy's address, so only
+# list addresses when Prometheus reaches the app directly.
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='', cast=Csv())
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Requests slower than this are logged with their slowest SQL
+SLOW_REQUEST_SECONDS = config('SLOW_REQUEST_SECONDS', default=1.0, cast=float)
+
+
+# Where 'manage.py run_benchmarks' saves its results (see main/benchmarks.py)
+BENCHMARK_RESULTS_DIR = config('BENCHMARK_RESULTS_DIR', default=str(BASE_DIR / 'benchmark_results'))
+
+
+# -----------------------------------------------------------------
+# CACHE CONFIGURATION
+# -----------------------------------------------------------------
+# Local memory by default. For production point it at Redis, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CACHE_LOCATION=redis://127.0.0.1:6379/1
 
-DATABASES = {
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='emporia'),
     }
 }
 
-
-# --- Your PostgreSQL configuration can be commented out for now ---
-# from decouple import config
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': config('DB_NAME'),
-#         'USER': config('DB_USER'),
-#         'PASSWORD': config('DB_PASSWORD'),
-#         'HOST': config('DB_HOST'),
-#         'PORT': config('DB_PORT'),
-#     }
-# }
-
+# How long (in seconds) cached catalog responses may live (see store/cache.py)
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=60 * 15, cast=int)
 
 
 # Password validation
@@ -128,6 +246,23 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# 'python manage.py collectstatic' copies everything here. Each file gets
+# a content hash in its name plus precompressed .gz and .br copies, and
+# WhiteNoise serves them with far-future Cache-Control headers.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': config(
+            'STATICFILES_BACKEND',
+            default='whitenoise.storage.CompressedManifestStaticFilesStorage',
+        ),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -147,9 +282,10 @@ CORS_ALLOWED_ORIGINS = [
 # -----------------------------------------------------------------
 
 REST_FRAMEWORK = {
-    # Use JWT for authentication
+    # Use JWT for authentication. This subclass loads the user together
+    # with their seller profile (see users/authentication.py).
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.SellerJWTAuthentication',
     ),
     # By default, require all endpoints to be authenticated.
     # We will manually set public endpoints (like login/register) as 'AllowAny'.
@@ -178,6 +314,15 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# Trust the token's claims (including 'role') on read-only requests
+# instead of loading the user from the database on each one. Writes
+# always load the user.
+JWT_STATELESS_READS = config('JWT_STATELESS_READS', default=False, cast=bool)
+
+# How long stateless requests may reuse a cached seller profile
+# (it is also dropped whenever the profile is saved)
+SELLER_PROFILE_CACHE_TIMEOUT = config('SELLER_PROFILE_CACHE_TIMEOUT', default=60 * 5, cast=int)
+
 # -----------------------------------------------------------------
 # MEDIA FILES CONFIGURATION (for user-uploaded content)
 # -----------------------------------------------------------------
@@ -188,8 +333,66 @@ MEDIA_URL = '/media/'
 # This is the physical path on your server where files will be stored
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# How media files are served (see main/media.py):
+# - 'django':     FileResponse from the app, with Range and caching headers
+# - 'x-accel':    the app answers with X-Accel-Redirect and nginx sends the file
+# - 'x-sendfile': the same with X-Sendfile, for Apache / lighttpd
+# - 'off':        the web server serves MEDIA_ROOT itself; no Django route
+MEDIA_SERVE_MODE = config('MEDIA_SERVE_MODE', default='django')
+# For 'x-accel': the internal nginx location that maps onto MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Browser cache lifetime (seconds) for media without a content hash in
+# its name. Content-addressed files (e.g. image variants) are cached forever.
+MEDIA_MAX_AGE = config('MEDIA_MAX_AGE', default=60 * 60 * 24, cast=int)
+
 # -----------------------------------------------------------------
 # RAZORPAY CONFIGURATION
 # -----------------------------------------------------------------
 RAZORPAY_KEY_ID = config('RAZORPAY_KEY_ID')
-RAZORPAY_KEY_SECRET = config('RAZORPAY_KEY_SECRET')
\ No newline at end of file
+RAZORPAY_KEY_SECRET = config('RAZORPAY_KEY_SECRET')
+
+# Gateway HTTP client settings (see orders/gateway.py).
+# Point RAZORPAY_API_URL at the local fake gateway for tests and benchmarks:
+#   python manage.py run_fake_gateway --port 8765
+#   RAZORPAY_API_URL=http://127.0.0.1:8765/v1
+RAZORPAY_API_URL = config('RAZORPAY_API_URL', default='https://api.razorpay.com/v1')
+RAZORPAY_CONNECT_TIMEOUT = config('RAZORPAY_CONNECT_TIMEOUT', default=3.0, cast=float)
+RAZORPAY_READ_TIMEOUT = config('RAZORPAY_READ_TIMEOUT', default=10.0, cast=float)
+RAZORPAY_MAX_RETRIES = config('RAZORPAY_MAX_RETRIES', default=2, cast=int)
+RAZORPAY_RETRY_BACKOFF = config('RAZORPAY_RETRY_BACKOFF', default=0.25, cast=float)
+RAZORPAY_POOL_SIZE = config('RAZORPAY_POOL_SIZE', default=20, cast=int)
+# Webhook signing secret, set in the Razorpay dashboard (see orders/webhooks.py).
+# Leave empty to disable the webhook endpoint.
+RAZORPAY_WEBHOOK_SECRET = config('RAZORPAY_WEBHOOK_SECRET', default='')
+
+# An unpaid order holds its stock for this long; then 'manage.py
+# release_expired_orders' deletes it and puts the stock back (see
+# orders/reservations.py). The checkout page closes the payment popup a
+# minute before, so payments can't land on an order about to expire.
+ORDER_RESERVATION_MINUTES = config('ORDER_RESERVATION_MINUTES', default=30, cast=int)
+# ...unless a payment was started (it has a gateway order): the gateway
+# may still capture it later, so those orders are kept this much longer
+ORDER_PAYMENT_GRACE_MINUTES = config('ORDER_PAYMENT_GRACE_MINUTES', default=24 * 60, cast=int)
+
+# -----------------------------------------------------------------
+# BACKGROUND TASKS (see main/tasks.py and main/jobs.py)
+# -----------------------------------------------------------------
+# 'threads': a thread pool inside each web process (nothing else to run,
+# but queued work is lost if the process stops).
+# 'database': the job queue in the database, run by 'manage.py runworker'.
+BACKGROUND_TASKS_BACKEND = config(
+    'BACKGROUND_TASKS_BACKEND', default='threads', cast=Choices(['threads', 'database'])
+)
+BACKGROUND_WORKERS = config('BACKGROUND_WORKERS', default=4, cast=int)
+# Run background tasks inline instead of on the thread pool (tests)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+
+# Job queue: attempts per job, the delay before the first retry (doubled
+# for each one after it, up to the maximum), how long a worker may hold
+# a job before it is given to another one, and how often idle workers
+# look for new jobs (all in seconds).
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=5, cast=int)
+JOB_RETRY_BACKOFF = config('JOB_RETRY_BACKOFF', default=5.0, cast=float)
+JOB_RETRY_BACKOFF_MAX = config('JOB_RETRY_BACKOFF_MAX', default=3600.0, cast=float)
+JOB_LEASE_SECONDS = config('JOB_LEASE_SECONDS', default=300, cast=int)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=1.0, cast=float)
@@ -0,0 +1,72 @@
+# main/tasks.py
+
+"""
+Runs slow work in the background, so the view that triggered it can
+respond right away.
+
+    from main.tasks import run_in_background
+    run_in_background(process_events, event_ids)
+
+The function runs on a small thread pool *after* the current
+transaction commits (so it can see the rows the view just wrote), and
+on a connection of its own. Errors are logged, never raised into the
+request.
+
+With BACKGROUND_TASKS_BACKEND = 'database' the work goes to the job
+queue instead (see main/jobs.py): it survives restarts, is retried when
+it fails, and runs in 'manage.py runworker' rather than the web process.
+The arguments must then be JSON serializable.
+
+With BACKGROUND_TASKS_EAGER = True (handy in tests) the function runs
+inline, still on commit.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix='background'
+        )
+    return _executor
+
+
+def run_task(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed.", getattr(func, '__name__', func))
+    finally:
+        # Each pool thread has its own connections; don't leave them open
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Schedules func(*args, **kwargs) to run once the current transaction
+    commits (or right away if there is none).
+    """
+    if settings.BACKGROUND_TASKS_BACKEND == 'database' and not settings.BACKGROUND_TASKS_EAGER:
+        # Written in the current transaction, so it is only queued if that commits
+        from .jobs import enqueue # jobs.py imports models
+        enqueue(func, *args, **kwargs)
+        return
+
+    def submit():
+        if settings.BACKGROUND_TASKS_EAGER:
+            func(*args, **kwargs)
+        else:
+            get_executor().submit(run_task, func, args, kwargs)
+
+    transaction.on_commit(submit)
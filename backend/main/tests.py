@@ -1,3 +1,272 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from main import benchmarks, jobs
+from main.metrics import registry
+from main.models import Job
+from main.tasks import run_in_background
+from orders.models import Order
+from store.models import Product
+
+
+class MediaServingTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SERVE_MODE='django')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for name in ('products/variants/abc.jpg', 'products/2025/01/01/photo.jpg'):
+            os.makedirs(os.path.join(self.media_root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.media_root, name), 'wb') as f:
+                f.write(bytes(range(256)) * 4)
+
+    def test_full_file_and_cache_headers(self):
+        response = self.client.get('/media/products/variants/abc.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content)), 1024)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+        response = self.client.get('/media/products/2025/01/01/photo.jpg')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_revalidation(self):
+        etag = self.client.get('/media/products/variants/abc.jpg')['ETag']
+        response = self.client.get('/media/products/variants/abc.jpg', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_range(self):
+        response = self.client.get('/media/products/variants/abc.jpg', headers={'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+
+        response = self.client.get('/media/products/variants/abc.jpg', headers={'Range': 'bytes=-4'})
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(252, 256)))
+
+        response = self.client.get('/media/products/variants/abc.jpg', headers={'Range': 'bytes=5000-'})
+        self.assertEqual(response.status_code, 416)
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel(self):
+        response = self.client.get('/media/products/variants/abc.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/products/variants/abc.jpg')
+        self.assertEqual(response.content, b'')
+
+    def test_stays_inside_media_root(self):
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/missing.jpg').status_code, 404)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "SQLite tuning")
+class SQLiteTuningTests(TestCase):
+
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1) # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1']) # The test client's address
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        registry.clear()
+
+    def test_records_and_exports_per_view_metrics(self):
+        self.assertEqual(self.client.get('/api/products/').status_code, 200)
+        self.assertEqual(self.client.get('/api/products/').status_code, 200)
+
+        body = self.client.get('/internal/metrics/').content.decode()
+        labels = 'view="product-list",method="GET"'
+        self.assertIn(f'emporia_http_requests_total{{{labels},status="200"}} 2', body)
+        self.assertIn(f'emporia_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', body)
+        self.assertIn(f'emporia_http_request_db_queries_count{{{labels}}} 2', body)
+        self.assertIn(f'emporia_http_request_serializer_seconds_total{{{labels}}}', body)
+        self.assertIn(f'emporia_http_response_size_bytes_count{{{labels}}} 2', body)
+        # Unknown URLs share a single label
+        self.client.get('/no/such/page/')
+        self.assertIn('view="unmatched"', self.client.get('/internal/metrics/').content.decode())
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='')
+    def test_endpoint_is_closed_by_default(self):
+        self.assertEqual(self.client.get('/internal/metrics/').status_code, 404)
+        response = self.client.get('/internal/metrics/', headers={'Authorization': 'Bearer '})
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='s3cret')
+    def test_endpoint_is_internal(self):
+        self.assertEqual(self.client.get('/internal/metrics/').status_code, 404)
+        response = self.client.get('/internal/metrics/', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    @override_settings(SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        cache.clear() # So the categories come from the database
+        with self.assertLogs('main.metrics', 'WARNING') as logs:
+            self.client.get('/api/categories/')
+        self.assertIn('GET /api/categories/ (category-list)', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+# Jobs for JobQueueTests; they must be importable by name
+calls = []
+
+
+def record_call(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+def fail_job():
+    raise RuntimeError("boom")
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=15)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        registry.clear()
+
+    def test_runs_due_jobs_and_deletes_them(self):
+        jobs.enqueue(record_call, 1, 'a', flag=True)
+        later = jobs.enqueue(record_call, 2, delay=60)
+        self.assertEqual(jobs.work_off(), 1)
+        self.assertEqual(calls, [((1, 'a'), {'flag': True})])
+        self.assertEqual(list(Job.objects.values_list('id', flat=True)), [later.id])
+
+        self.assertEqual(jobs.work_off(now=timezone.now() + timedelta(seconds=61)), 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_retries_with_backoff_then_fails(self):
+        job = jobs.enqueue(fail_job)
+        now = timezone.now()
+        with self.assertLogs('main.jobs', 'WARNING'):
+            jobs.work_off(now=now)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.QUEUED, 1))
+        self.assertGreaterEqual(job.run_at, now + timedelta(seconds=10))
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+        self.assertEqual([jobs.retry_delay(n) for n in (1, 2, 3)], [10, 15, 15])
+        with self.assertLogs('main.jobs', 'WARNING'):
+            jobs.work_off(now=now + timedelta(hours=1))
+            jobs.work_off(now=now + timedelta(hours=2))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 3))
+
+    def test_job_of_a_dead_worker_is_requeued(self):
+        job = jobs.enqueue(record_call)
+        now = timezone.now()
+        [claimed] = jobs.claim_jobs(['default'], 'host:1:0', now=now)
+        self.assertEqual(jobs.claim_jobs(['default'], 'host:2:0', now=now), [])
+
+        self.assertEqual(jobs.requeue_expired(now=now + timedelta(minutes=1)), 0)
+        self.assertEqual(jobs.requeue_expired(now=now + timedelta(hours=1)), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (Job.Status.QUEUED, ''))
+        # The first worker no longer holds it and can't finish it
+        jobs.run_job(claimed)
+        self.assertTrue(Job.objects.filter(pk=job.pk).exists())
+
+    @override_settings(BACKGROUND_TASKS_BACKEND='database', BACKGROUND_TASKS_EAGER=False)
+    def test_run_in_background_uses_the_queue(self):
+        run_in_background(record_call, 7)
+        self.assertEqual(calls, [])
+        self.assertEqual(Job.objects.get().name, 'main.tests.record_call')
+
+    def test_queue_metrics(self):
+        jobs.enqueue(record_call)
+        jobs.enqueue(record_call, queue='slow')
+        jobs.work_off()
+        body = registry.render()
+        self.assertIn('emporia_job_queue_depth{queue="slow",status="queued"} 1', body)
+        self.assertIn('emporia_jobs_total{name="main.tests.record_call",outcome="succeeded"} 1', body)
+        self.assertIn('emporia_job_queue_oldest_seconds{queue="slow"}', body)
+
+
+class WorkerCommandTests(TransactionTestCase):
+    # Worker threads use their own connections, so the jobs must be committed
+
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_worker_command(self):
+        jobs.enqueue(record_call, 1)
+        jobs.enqueue(record_call, 2)
+        call_command('runworker', '--burst', '--threads', '2', '--poll-interval', '0.01', stdout=StringIO())
+        self.assertEqual(sorted(args for args, _ in calls), [(1,), (2,)])
+
+    def test_worker_survives_database_errors(self):
+        jobs.enqueue(record_call, 1)
+        claim_jobs = jobs.claim_jobs
+        failures = iter([OperationalError("database is locked")])
+
+        def flaky_claim(*args, **kwargs):
+            for error in failures:
+                raise error
+            return claim_jobs(*args, **kwargs)
+
+        with mock.patch('main.jobs.claim_jobs', flaky_claim), self.assertLogs('main.jobs', 'ERROR'):
+            jobs.Worker(threads=1, poll_interval=0.01, burst=True).run()
+        self.assertEqual(calls, [((1,), {})])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkSuiteTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.results_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.results_dir)
+
+    def test_percentile(self):
+        values = list(range(100, 0, -1))
+        self.assertEqual(benchmarks.percentile(values, 50), 50)
+        self.assertEqual(benchmarks.percentile(values, 99), 99)
+        self.assertEqual(benchmarks.percentile([7], 95), 7)
+        self.assertIsNone(benchmarks.percentile([], 50))
+
+    def test_seed_run_and_compare(self):
+        call_command('seed_benchmark_data', products=30, orders=40, sellers=2, customers=3,
+                     categories=2, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 30)
+        self.assertEqual(Order.objects.count(), 40)
+        self.assertEqual(Order.objects.filter(items__isnull=True).count(), 0)
+
+        with override_settings(BENCHMARK_RESULTS_DIR=self.results_dir):
+            for compare_to in (None, 'latest'):
+                out = StringIO()
+                call_command('run_benchmarks', requests=4, concurrency=2, warmup=0,
+                             gateway_latency=0, compare_to=compare_to, stdout=out, stderr=StringIO())
+
+        saved = sorted(os.listdir(self.results_dir))
+        self.assertEqual(len(saved), 2)
+        with open(os.path.join(self.results_dir, saved[0])) as f:
+            results = json.load(f)
+        self.assertEqual(set(results['scenarios']), set(benchmarks.SCENARIOS))
+        for name, row in results['scenarios'].items():
+            self.assertEqual((row['requests'], row['errors']), (4, 0), name)
+            self.assertGreater(row['queries_per_request'], 0, name)
+        self.assertIn('Δ p95', out.getvalue())
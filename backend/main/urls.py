@@ -1,9 +1,13 @@
 # main/urls.py
 
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from main.media import serve_media
+from main.metrics import metrics_view
+from orders.views import CartValidateView
 
 # 1. --- Update this import ---
 # We are removing the default view and importing our custom one
@@ -13,6 +17,9 @@ from rest_framework_simplejwt.views import TokenRefreshView,TokenObtainPairView
 urlpatterns = [
     path('admin/', admin.site.urls),
 
+    # --- Prometheus metrics (internal only, see main/metrics.py) ---
+    path('internal/metrics/', metrics_view, name='metrics'),
+
     # --- API Authentication Endpoints ---
     path('api/auth/', include('users.urls')),
     
@@ -22,10 +29,19 @@ urlpatterns = [
     
     path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
-    # --- Store & Orders Apps ---
+    # --- Store, Orders & Analytics Apps ---
+    path('api/seller/analytics/', include('analytics.urls')),
     path('api/', include('store.urls')), 
     path('api/orders/', include('orders.urls')),
+    # Reprices the browser's cart in one query (POST)
+    path('api/cart/validate/', CartValidateView.as_view(), name='cart-validate'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# --- Media Files ---
+# Uploads are served through main/media.py (caching headers, Range, or
+# handing the file to nginx / Apache). With MEDIA_SERVE_MODE='off' the
+# web server serves MEDIA_ROOT directly and Django stays out of it.
+if settings.MEDIA_SERVE_MODE != 'off':
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.*)$', serve_media, name='media'),
+    ]
\ No newline at end of file
@@ -1,7 +1,7 @@
 # orders/admin.py
 
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, PaymentEvent
 
 class OrderItemInline(admin.TabularInline):
     """
@@ -13,14 +13,34 @@ class OrderItemInline(admin.TabularInline):
     raw_id_fields = ['product'] 
     extra = 0 # Don't show any empty extra forms
 
+    def get_queryset(self, request):
+        # Each row shows its product; load them with the items
+        return super().get_queryset(request).select_related('product')
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'customer', 'first_name', 'last_name', 
-        'paid', 'created_at', 'razorpay_order_id'
+        'paid', 'total_cost', 'created_at', 'razorpay_order_id'
     )
     list_filter = ('paid', 'created_at')
+    # The 'customer' column would otherwise cost a query per row
+    list_select_related = ('customer',)
     search_fields = ('id', 'customer__email', 'first_name', 'last_name')
     
     # This is where we add the 'OrderItemInline'
-    inlines = [OrderItemInline]
\ No newline at end of file
+    inlines = [OrderItemInline]
+    readonly_fields = ('total_cost', 'item_count')
+
+    def save_related(self, request, form, formsets, change):
+        # The items may have been edited through the inline,
+        # so refresh the stored totals.
+        super().save_related(request, form, formsets, change)
+        form.instance.update_totals()
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event', 'razorpay_order_id', 'received_at', 'processed_at', 'error')
+    list_filter = ('event', 'processed_at', ('error', admin.EmptyFieldListFilter))
+    search_fields = ('event_id', 'razorpay_order_id', 'razorpay_payment_id')
+    readonly_fields = ('received_at',)
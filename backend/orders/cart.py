@@ -0,0 +1,113 @@
+# orders/cart.py
+
+"""
+Looking up a whole cart at once.
+
+The cart lives in the browser (frontend CartContext) and keeps the price
+and stock a product had when it was added. The server first sees it in
+two places:
+
+- POST /api/cart/validate/ (CartValidateView), which reprices the cart
+  and reports what can still be bought
+- checkout (OrderSerializer), whose nested items resolve 'product_id'
+
+Both load every product on the cart with a single `id__in` query
+(load_products), so a 50-line cart costs one query instead of 50.
+"""
+
+from decimal import Decimal
+
+from store.inventory import merge_quantities
+from store.models import Product
+
+# Longest cart POST /api/cart/validate/ accepts, and the most units of
+# one line. The cap keeps line totals within the response's decimals.
+MAX_CART_LINES = 100
+MAX_LINE_QUANTITY = 10000
+
+# What price_cart() reads from each product
+CART_PRODUCT_FIELDS = ('id', 'name', 'slug', 'price', 'stock', 'available')
+
+# --- Line statuses ---
+OK = 'ok'
+NOT_FOUND = 'not_found' # No such product (e.g. deleted since it was added)
+UNAVAILABLE = 'unavailable' # Taken off sale by its seller
+INSUFFICIENT_STOCK = 'insufficient_stock'
+
+
+def as_product_id(value):
+    """The integer id in 'value', or None if it isn't one."""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_products(product_ids, fields=None):
+    """
+    Returns {id: Product} for 'product_ids' in one query. Values that
+    aren't ids and products that don't exist are simply left out.
+    """
+    ids = {pk for pk in map(as_product_id, product_ids) if pk is not None}
+    if not ids:
+        return {}
+    queryset = Product.objects.all()
+    if fields:
+        queryset = queryset.only(*fields)
+    return queryset.in_bulk(ids)
+
+
+def price_cart(lines):
+    """
+    Reprices 'lines' ([{'product_id', 'quantity', 'price' (optional)}])
+    against the current products.
+
+    Each line comes back with the current price, stock and availability,
+    its line total and a status. 'price_changed' compares with the price
+    the client sent, if any. Stock is checked against the total quantity
+    of a product over all lines, the same way checkout reserves it.
+    """
+    products = load_products((line['product_id'] for line in lines), CART_PRODUCT_FIELDS)
+    wanted = merge_quantities((line['product_id'], line['quantity']) for line in lines)
+
+    items = []
+    total = Decimal('0.00')
+    item_count = 0
+    for line in lines:
+        product = products.get(line['product_id'])
+        item = {'product_id': line['product_id'], 'quantity': line['quantity']}
+        if product is None:
+            item['status'] = NOT_FOUND
+            items.append(item)
+            continue
+
+        if not product.available:
+            status = UNAVAILABLE
+        elif product.stock < wanted[product.id]:
+            status = INSUFFICIENT_STOCK
+        else:
+            status = OK
+        line_total = product.price * line['quantity']
+        item.update({
+            'name': product.name,
+            'slug': product.slug,
+            'price': product.price,
+            'price_changed': 'price' in line and line['price'] != product.price,
+            'stock': product.stock,
+            'available': product.available,
+            'line_total': line_total,
+            'status': status,
+        })
+        if status == OK:
+            total += line_total
+            item_count += line['quantity']
+        items.append(item)
+
+    return {
+        'items': items,
+        'total': total,
+        'item_count': item_count,
+        'valid': all(item['status'] == OK for item in items),
+    }
@@ -0,0 +1,112 @@
+# orders/fake_gateway.py
+
+"""
+A tiny local stand-in for the Razorpay Orders API, for tests and load
+benchmarks. It speaks just enough of the API for orders/gateway.py:
+
+- POST /v1/orders              -> creates an order
+- GET  /v1/orders?receipt=...  -> lists orders with that receipt
+- GET  /v1/orders/<id>         -> fetches one order
+
+'latency' adds a delay to every response, and 'fail_first' makes the
+first N order creations fail with a 503 *after* storing the order, to
+exercise the idempotent retry path.
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive, like the real API
+    disable_nagle_algorithm = True # Don't delay small responses on kept-alive sockets
+
+    def log_message(self, format, *args):
+        pass # Keep test and benchmark output clean
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        time.sleep(server.latency)
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length) or b'{}')
+
+        if urlparse(self.path).path.rstrip('/') != '/v1/orders':
+            return self.send_json(404, {'error': {'description': 'Not found'}})
+
+        order = {
+            'id': f'order_{uuid.uuid4().hex[:14]}',
+            'entity': 'order',
+            'amount': data.get('amount'),
+            'currency': data.get('currency', 'INR'),
+            'receipt': data.get('receipt'),
+            'status': 'created',
+        }
+        with server.lock:
+            server.orders[order['id']] = order
+            server.create_calls += 1
+            fail = server.fail_first > 0
+            if fail:
+                server.fail_first -= 1
+
+        if fail:
+            return self.send_json(503, {'error': {'description': 'Service unavailable'}})
+        return self.send_json(200, order)
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency)
+        url = urlparse(self.path)
+        path = url.path.rstrip('/')
+
+        if path == '/v1/orders':
+            receipt = parse_qs(url.query).get('receipt', [None])[0]
+            with server.lock:
+                items = [o for o in server.orders.values() if receipt in (None, o['receipt'])]
+            return self.send_json(200, {'entity': 'collection', 'count': len(items), 'items': items})
+
+        if path.startswith('/v1/orders/'):
+            order = server.orders.get(path.rsplit('/', 1)[-1])
+            if order:
+                return self.send_json(200, order)
+        return self.send_json(404, {'error': {'description': 'Not found'}})
+
+
+class FakeGateway(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256 # Accept bursts of concurrent connections
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, fail_first=0):
+        super().__init__((host, port), FakeGatewayHandler)
+        self.latency = latency
+        self.fail_first = fail_first
+        self.orders = {}
+        self.create_calls = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self):
+        """Serves in a background thread; returns self for chaining."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,75 @@
+# orders/filters.py
+
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+class OrderFilterBackend(filters.BaseFilterBackend):
+    """
+    Filters order history in the database:
+
+    - ?paid=true|false
+    - ?created_after=<date or datetime>   (inclusive)
+    - ?created_before=<date or datetime>  (exclusive; a bare date means
+      the end of that day, so ?created_after=2025-01-01&created_before=2025-01-01
+      is the whole day)
+
+    Views that list something other than orders (e.g. order items) set
+    'order_filter_prefix' to the path of the order, e.g. 'order__'.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        prefix = getattr(view, 'order_filter_prefix', '')
+
+        paid = params.get('paid', '').lower()
+        if paid in TRUE_VALUES:
+            queryset = queryset.filter(**{f'{prefix}paid': True})
+        elif paid in FALSE_VALUES:
+            queryset = queryset.filter(**{f'{prefix}paid': False})
+        elif paid:
+            raise ValidationError({'paid': 'Use true or false.'})
+
+        created_after = params.get('created_after')
+        if created_after:
+            queryset = queryset.filter(
+                **{f'{prefix}created_at__gte': self.parse_moment('created_after', created_after)}
+            )
+
+        created_before = params.get('created_before')
+        if created_before:
+            queryset = queryset.filter(
+                **{f'{prefix}created_at__lt': self.parse_moment('created_before', created_before, end_of_day=True)}
+            )
+
+        return queryset
+
+    @staticmethod
+    def parse_moment(name, value, end_of_day=False):
+        """
+        Parses an ISO date or datetime into an aware datetime. A date
+        is the start of that day, or the start of the next one when
+        'end_of_day' is set.
+        """
+        try:
+            day = parse_date(value)
+            if day is not None:
+                if end_of_day:
+                    day += timedelta(days=1)
+                moment = datetime.combine(day, time.min)
+            else:
+                moment = parse_datetime(value)
+                if moment is None:
+                    raise ValueError
+        except ValueError:
+            raise ValidationError({name: 'Use an ISO date (YYYY-MM-DD) or datetime.'})
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
@@ -0,0 +1,188 @@
+# orders/gateway.py
+
+"""
+HTTP client for the payment gateway (Razorpay Orders API).
+
+- Connections are pooled and reused across requests (one client per
+  process), instead of a new TLS handshake for every checkout.
+- Every call has a connect and a read timeout, so a slow gateway can't
+  hold a worker forever.
+- Creating a gateway order is retried safely: the order's receipt is
+  unique, so before trying again we ask the gateway whether an order
+  with that receipt already exists (the first attempt may have gone
+  through even though we never saw the response).
+
+There is a blocking client for the regular (WSGI) views and an
+awaitable wrapper for the ASGI code path.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: rate limiting and server-side failures.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GatewayError(Exception):
+    """The gateway could not be reached or rejected the request."""
+
+
+class RazorpayGateway:
+    """
+    Blocking client, built on a pooled `requests.Session`.
+    """
+
+    def __init__(self, key_id, key_secret, base_url, connect_timeout=3.0,
+                 read_timeout=10.0, max_retries=2, backoff=0.25, pool_size=20):
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        self.session.auth = (key_id, key_secret)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            key_id=settings.RAZORPAY_KEY_ID,
+            key_secret=settings.RAZORPAY_KEY_SECRET,
+            base_url=settings.RAZORPAY_API_URL,
+            connect_timeout=settings.RAZORPAY_CONNECT_TIMEOUT,
+            read_timeout=settings.RAZORPAY_READ_TIMEOUT,
+            max_retries=settings.RAZORPAY_MAX_RETRIES,
+            backoff=settings.RAZORPAY_RETRY_BACKOFF,
+            pool_size=settings.RAZORPAY_POOL_SIZE,
+        )
+
+    @staticmethod
+    def order_payload(amount, currency, receipt):
+        return {
+            "amount": amount,
+            "currency": currency,
+            "receipt": receipt,
+            "payment_capture": 1, # Auto-capture payment
+        }
+
+    def backoff_delay(self, attempt):
+        return self.backoff * (2 ** (attempt - 1))
+
+    @staticmethod
+    def first_item(collection):
+        items = collection.get('items') or []
+        return items[0] if items else None
+
+    @staticmethod
+    def error_message(response):
+        try:
+            return response.json()['error']['description']
+        except (ValueError, KeyError, TypeError):
+            return f"Gateway responded with HTTP {response.status_code}."
+
+
+    def request(self, method, path, **kwargs):
+        return self.session.request(
+            method, f'{self.base_url}{path}',
+            timeout=(self.connect_timeout, self.read_timeout), **kwargs
+        )
+
+    def find_order_by_receipt(self, receipt):
+        response = self.request('GET', '/orders', params={'receipt': receipt})
+        if response.status_code != 200:
+            raise GatewayError(self.error_message(response))
+        return self.first_item(response.json())
+
+    def create_order(self, amount, currency, receipt):
+        """
+        Creates a gateway order, or returns the one that already exists
+        for 'receipt'. Raises GatewayError when all attempts fail.
+        """
+        payload = self.order_payload(amount, currency, receipt)
+        last_error = "Gateway unavailable."
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff_delay(attempt))
+                # Did an earlier attempt succeed after all?
+                try:
+                    existing = self.find_order_by_receipt(receipt)
+                except (requests.RequestException, GatewayError) as e:
+                    last_error = str(e)
+                    continue
+                if existing:
+                    return existing
+
+            try:
+                response = self.request('POST', '/orders', json=payload)
+            except requests.RequestException as e:
+                last_error = str(e)
+                continue
+
+            if response.status_code in RETRY_STATUSES:
+                last_error = self.error_message(response)
+                continue
+            if response.status_code >= 400:
+                raise GatewayError(self.error_message(response))
+            return response.json()
+
+        raise GatewayError(last_error)
+
+
+class AsyncRazorpayGateway:
+    """
+    Awaitable client for the ASGI code path.
+
+    The blocking calls run on a dedicated thread pool sized to the
+    connection pool, so while one checkout waits for the gateway the
+    event loop keeps serving others, and the number of gateway calls in
+    flight is bounded by the pool rather than by the web workers.
+    """
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self.executor = ThreadPoolExecutor(
+            max_workers=gateway.pool_size, thread_name_prefix='gateway'
+        )
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def find_order_by_receipt(self, receipt):
+        return await self.run(self.gateway.find_order_by_receipt, receipt)
+
+    async def create_order(self, amount, currency, receipt):
+        """
+        Same contract as RazorpayGateway.create_order.
+        """
+        return await self.run(self.gateway.create_order, amount, currency, receipt)
+
+
+# --- Shared Instances ---
+# One client per process, so the connection pool is actually reused.
+
+@lru_cache(maxsize=None)
+def get_gateway():
+    return RazorpayGateway.from_settings()
+
+
+@lru_cache(maxsize=None)
+def get_async_gateway():
+    # Shares the blocking client's connection pool
+    return AsyncRazorpayGateway(get_gateway())
+
+
+def receipt_for(order):
+    """The gateway receipt for one of our orders; also our idempotency key."""
+    return f"order_rcptid_{order.id}"
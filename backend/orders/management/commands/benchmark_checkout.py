@@ -0,0 +1,195 @@
+# orders/management/commands/benchmark_checkout.py
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from main.benchmarks import percentile
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from store.inventory import shard_stock
+from store.models import Product
+from users.models import CustomUser
+
+PREFIX = 'bench-checkout'
+
+# --compare runs the benchmark once per configuration, each in its own
+# process (the database settings are read once, at startup).
+SQLITE_CONFIGS = [
+    ("sqlite, default settings", {'DB_SQLITE_TUNED': 'False'}),
+    ("sqlite, WAL + busy timeout", {'DB_SQLITE_TUNED': 'True'}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures checkout throughput with concurrent writers: N threads "
+        "each create orders through OrderSerializer (order, items and the "
+        "stock reservation in one transaction) against the configured "
+        "database. Rows it creates are deleted at the end. --shards runs "
+        "once per shard count (0 = the single stock row), e.g. '--threads 64 "
+        "--products 1 --shards 0 16' for a flash sale. With --compare, "
+        "runs once for each SQLite configuration on a scratch database, "
+        "plus PostgreSQL when DB_ENGINE=postgresql is set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=400, help="Total orders to create.")
+        parser.add_argument('--products', type=int, default=10,
+                            help="Distinct products; fewer means more contention on stock rows.")
+        parser.add_argument('--items', type=int, default=3, help="Cart lines per order.")
+        parser.add_argument('--shards', type=int, nargs='+', default=[0],
+                            help="Stock shards per product; several values run once each.")
+        parser.add_argument('--compare', action='store_true')
+        parser.add_argument('--label', default='', help="Name printed with the result.")
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(options)
+
+        label = options['label'] or self.describe()
+        for shards in options['shards']:
+            customers, products = self.seed(options['threads'], options['products'], shards)
+            try:
+                results = self.run(customers, products, options)
+            finally:
+                self.cleanup()
+            self.report(f"{label}, {shards} shards" if shards else label, results)
+
+    # --- 1. Setup ---
+
+    def describe(self):
+        db = settings.DATABASES['default']
+        if 'sqlite' not in db['ENGINE']:
+            return db['ENGINE'].rsplit('.', 1)[-1]
+        tuned = 'transaction_mode' in db.get('OPTIONS', {})
+        return f"sqlite, {'WAL + busy timeout' if tuned else 'default settings'}"
+
+    def seed(self, threads, product_count, shards=0):
+        self.cleanup() # Leftovers from an interrupted run
+        seller = CustomUser.objects.create_user(
+            email=f'{PREFIX}-seller@example.com', username=f'{PREFIX}-seller',
+            password=None, role=CustomUser.Role.SELLER,
+        )
+        customers = [
+            CustomUser.objects.create_user(
+                email=f'{PREFIX}-{i}@example.com', username=f'{PREFIX}-{i}', password=None,
+            )
+            for i in range(threads)
+        ]
+        Product.objects.bulk_create([
+            Product(
+                seller=seller.sellerprofile, name=f'Bench product {i}', slug=f'{PREFIX}-{i}',
+                price=Decimal('9.99'), stock=10**9,
+            )
+            for i in range(product_count)
+        ])
+        # bulk_create doesn't set the ids on every backend
+        products = list(Product.objects.filter(slug__startswith=f'{PREFIX}-').order_by('id'))
+        if shards:
+            for product in products:
+                shard_stock(product, shards)
+        return customers, products
+
+    def cleanup(self):
+        users = CustomUser.objects.filter(username__startswith=f'{PREFIX}-')
+        # Orders keep their rows when the customer is deleted, so go first
+        Order.objects.filter(customer__in=users).delete()
+        users.delete() # Cascades to the seller profile and its products
+
+    # --- 2. Running ---
+
+    def run(self, customers, products, options):
+        per_thread = max(options['orders'] // options['threads'], 1)
+        items = min(options['items'], len(products))
+        latencies, errors = [], []
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(customers))
+
+        def worker(index, customer):
+            request = SimpleNamespace(user=customer, method='POST')
+            mine, failed = [], []
+            try:
+                barrier.wait()
+                for n in range(per_thread):
+                    # Rotate through the products so threads collide on them
+                    start = (index + n) % len(products)
+                    lines = [products[(start + k) % len(products)] for k in range(items)]
+                    payload = {
+                        'first_name': 'Bench', 'last_name': 'Buyer', 'email': customer.email,
+                        'address': '1 Main St', 'postal_code': '12345', 'city': 'Bench',
+                        'items': [{'product_id': product.id, 'quantity': 1} for product in lines],
+                    }
+                    began = time.perf_counter()
+                    try:
+                        serializer = OrderSerializer(data=payload, context={'request': request})
+                        serializer.is_valid(raise_exception=True)
+                        serializer.save()
+                        mine.append(time.perf_counter() - began)
+                    except OperationalError as exc: # e.g. "database is locked"
+                        failed.append(str(exc))
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(mine)
+                    errors.extend(failed)
+
+        threads = [
+            threading.Thread(target=worker, args=(i, customer)) for i, customer in enumerate(customers)
+        ]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        return SimpleNamespace(
+            latencies=latencies, errors=errors, elapsed=elapsed, threads=len(customers)
+        )
+
+    def report(self, label, results):
+        done = len(results.latencies)
+        line = f"{label:<40} {results.threads:>3} threads  {done / results.elapsed:>8.1f} orders/s"
+        if done:
+            ms = [latency * 1000 for latency in results.latencies]
+            line += f"  p50 {percentile(ms, 50):>7.1f} ms  p95 {percentile(ms, 95):>7.1f} ms"
+        line += f"  {len(results.errors)} failed"
+        self.stdout.write(line)
+        if results.errors:
+            self.stdout.write(f"    first error: {results.errors[0]}")
+
+    # --- 3. Comparing configurations ---
+
+    def compare(self, options):
+        args = [
+            '--threads', str(options['threads']), '--orders', str(options['orders']),
+            '--products', str(options['products']), '--items', str(options['items']),
+            '--shards', *map(str, options['shards']),
+        ]
+        manage = [sys.executable, str(settings.BASE_DIR / 'manage.py')]
+
+        for label, overrides in SQLITE_CONFIGS:
+            with tempfile.TemporaryDirectory() as scratch:
+                env = dict(os.environ, DB_ENGINE='sqlite',
+                           DB_NAME=os.path.join(scratch, 'bench.sqlite3'), **overrides)
+                subprocess.run(manage + ['migrate', '-v', '0'], env=env, check=True)
+                subprocess.run(manage + ['benchmark_checkout', '--label', label] + args,
+                               env=env, check=True)
+
+        if os.environ.get('DB_ENGINE') == 'postgresql' or settings.DB_ENGINE == 'postgresql':
+            # Runs against the configured (already migrated) database
+            env = dict(os.environ, DB_ENGINE='postgresql')
+            subprocess.run(manage + ['benchmark_checkout', '--label', 'postgresql'] + args,
+                           env=env, check=True)
+        else:
+            self.stdout.write("(set DB_ENGINE=postgresql and the DB_* variables to include PostgreSQL)")
@@ -0,0 +1,68 @@
+# orders/management/commands/benchmark_gateway.py
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from orders.fake_gateway import FakeGateway
+from orders.gateway import AsyncRazorpayGateway, RazorpayGateway
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures gateway order creation throughput against a local fake "
+        "gateway with artificial latency: blocking client on N worker "
+        "threads (WSGI) vs. the async client on one event loop (ASGI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=8,
+                            help="Worker threads for the blocking client (like WSGI workers).")
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help="In-flight requests for the async client.")
+        parser.add_argument('--latency', type=float, default=0.2,
+                            help="Seconds the fake gateway takes to answer.")
+
+    def handle(self, *args, **options):
+        server = FakeGateway(latency=options['latency']).start()
+        try:
+            kwargs = dict(key_id='rzp_bench', key_secret='bench', base_url=server.url,
+                          pool_size=max(options['workers'], options['concurrency']))
+            count = options['requests']
+
+            elapsed = self.run_blocking(RazorpayGateway(**kwargs), count, options['workers'])
+            self.report(f"blocking, {options['workers']} threads", count, elapsed)
+
+            elapsed = asyncio.run(self.run_async(
+                AsyncRazorpayGateway(RazorpayGateway(**kwargs)), count, options['concurrency']
+            ))
+            self.report(f"async, {options['concurrency']} in flight", count, elapsed)
+        finally:
+            server.stop()
+
+    def run_blocking(self, gateway, count, workers):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda i: gateway.create_order(100, 'INR', f'bench_sync_{i}'), range(count)))
+        return time.perf_counter() - start
+
+    async def run_async(self, gateway, count, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with semaphore:
+                await gateway.create_order(100, 'INR', f'bench_async_{i}')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(count)))
+        elapsed = time.perf_counter() - start
+        gateway.executor.shutdown()
+        return elapsed
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(
+            f"{label:28} {count} orders in {elapsed:6.2f}s -> {count / elapsed:8.1f} orders/s"
+        )
@@ -0,0 +1,44 @@
+# orders/management/commands/process_payment_events.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from orders.webhooks import pending_event_ids, process_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Processes stored webhook events that are still unprocessed after "
+        "--older-than seconds, e.g. because the process that received them "
+        "restarted first. Run it every few minutes (cron), or keep it "
+        "running with --every. See orders/webhooks.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=float, default=60, metavar='SECONDS',
+            help="Leave events received in the last SECONDS to the request that stored them (default: 60).",
+        )
+        parser.add_argument(
+            '--every', type=float, default=0, metavar='SECONDS',
+            help="Keep running, sweeping every SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = 0
+            while True:
+                event_ids = pending_event_ids(older_than=options['older_than'])
+                if not event_ids:
+                    break
+                process_events(event_ids)
+                processed += len(event_ids)
+            if processed or options['verbosity'] > 1:
+                self.stdout.write(f"Processed {processed} pending events.")
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+            # Don't keep a connection the database may have dropped meanwhile
+            close_old_connections()
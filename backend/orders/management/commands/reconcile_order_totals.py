@@ -0,0 +1,62 @@
+# orders/management/commands/reconcile_order_totals.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfills and reconciles the stored Order.total_cost / item_count "
+        "against the order items. Safe to run repeatedly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of orders to check per query (default: 1000).",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report the orders that are out of sync.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        checked = fixed = 0
+        last_id = 0
+
+        # Walk the table by primary key so each batch is an index range
+        # scan, no matter how many orders there are.
+        while True:
+            batch = list(
+                Order.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .with_computed_totals()
+                .only('id', 'total_cost', 'item_count')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            checked += len(batch)
+
+            stale = []
+            for order in batch:
+                if (order.total_cost != order.computed_total_cost
+                        or order.item_count != order.computed_item_count):
+                    order.total_cost = order.computed_total_cost
+                    order.item_count = order.computed_item_count
+                    stale.append(order)
+
+            if stale and not dry_run:
+                with transaction.atomic():
+                    Order.objects.bulk_update(stale, ['total_cost', 'item_count'])
+            fixed += len(stale)
+
+        verb = "would fix" if dry_run else "fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} orders, {verb} {fixed}."
+        ))
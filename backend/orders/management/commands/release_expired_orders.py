@@ -0,0 +1,37 @@
+# orders/management/commands/release_expired_orders.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from orders.reservations import DEFAULT_BATCH_SIZE, release_expired_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes unpaid orders older than ORDER_RESERVATION_MINUTES and puts "
+        "their stock back, in batches. Run it every minute (cron), or keep it "
+        "running with --every. See orders/reservations.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help=f"Orders released per transaction (default: {DEFAULT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            '--every', type=float, default=0, metavar='SECONDS',
+            help="Keep running, sweeping every SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_orders(batch_size=options['batch_size'])
+            if released or options['verbosity'] > 1:
+                self.stdout.write(f"Released {released} expired orders.")
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+            # Don't keep a connection the database may have dropped meanwhile
+            close_old_connections()
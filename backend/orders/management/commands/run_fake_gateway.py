@@ -0,0 +1,28 @@
+# orders/management/commands/run_fake_gateway.py
+
+from django.core.management.base import BaseCommand
+
+from orders.fake_gateway import FakeGateway
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local fake payment gateway for development and load tests. "
+        "Point RAZORPAY_API_URL at the printed URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help="Seconds to wait before every response.")
+
+    def handle(self, *args, **options):
+        server = FakeGateway(options['host'], options['port'], latency=options['latency'])
+        self.stdout.write(self.style.SUCCESS(f"Fake gateway listening on {server.url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
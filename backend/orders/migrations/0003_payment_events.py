@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+def blank_ids_to_null(apps, schema_editor):
+    # Empty strings would clash under the new unique constraint; NULLs don't.
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.filter(razorpay_order_id='').update(razorpay_order_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('event', models.CharField(max_length=100)),
+                ('razorpay_order_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('razorpay_payment_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ('received_at',),
+            },
+        ),
+        migrations.RunPython(blank_ids_to_null, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='razorpay_order_id',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
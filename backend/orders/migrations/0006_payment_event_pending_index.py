@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_payment_event_errors'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentevent',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['received_at'], name='orders_event_pending_idx'),
+        ),
+    ]
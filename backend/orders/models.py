@@ -1,9 +1,66 @@
 # orders/models.py
 
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
 from store.models import Product
 
+# --- Signals ---
+# Sent once per order, when it goes from unpaid to paid (see
+# OrderQuerySet.mark_paid), with 'order_id' and 'using'. Receivers run
+# inside the transaction that marks the order paid.
+
+order_paid = Signal()
+
+# --- QuerySet ---
+# Bulk listings that can't trust (or don't have) the stored totals can
+# compute them in SQL instead of walking every order's items in Python.
+
+class OrderQuerySet(models.QuerySet):
+    def with_computed_totals(self):
+        """
+        Annotates 'computed_total_cost' and 'computed_item_count' with a
+        single GROUP BY over the order items.
+        """
+        return self.annotate(
+            computed_total_cost=Coalesce(
+                Sum(F('items__price') * F('items__quantity'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            computed_item_count=Coalesce(Sum('items__quantity'), Value(0)),
+        )
+
+    def mark_paid(self, razorpay_order_id, razorpay_payment_id, razorpay_signature=None):
+        """
+        Marks the order with this gateway order id as paid, writing only
+        the payment columns. The 'paid=False' guard makes it safe to call
+        again for the same payment (a retried callback or a webhook that
+        arrives after the checkout callback): it then updates nothing.
+        Sends 'order_paid' when the order actually changed, in the same
+        transaction. Returns the number of orders updated (0 or 1).
+        """
+        values = {
+            'paid': True,
+            'razorpay_payment_id': razorpay_payment_id,
+            'updated_at': timezone.now(), # update() skips auto_now
+        }
+        if razorpay_signature:
+            values['razorpay_signature'] = razorpay_signature
+        with transaction.atomic(using=self.db):
+            updated = self.filter(razorpay_order_id=razorpay_order_id, paid=False).update(**values)
+            if updated:
+                order_id = self.filter(razorpay_order_id=razorpay_order_id).values_list('id', flat=True).get()
+                order_paid.send(sender=Order, order_id=order_id, using=self.db)
+        return updated
+
 # 1. --- Order Model ---
 # This will be the main "receipt" for a customer's purchase.
 
@@ -30,12 +87,35 @@ class Order(models.Model):
     
     # --- Payment Info ---
     paid = models.BooleanField(default=False) # Has the payment gone through?
-    razorpay_order_id = models.CharField(max_length=255, blank=True, null=True)
+    # Unique (and so indexed): payment callbacks and webhooks look orders
+    # up by it. NULL until the payment is started, and NULLs don't clash.
+    razorpay_order_id = models.CharField(max_length=255, blank=True, null=True, unique=True)
     razorpay_payment_id = models.CharField(max_length=255, blank=True, null=True)
     razorpay_signature = models.CharField(max_length=255, blank=True, null=True)
 
+    # --- Denormalized Totals ---
+    # Written once when the items are created (see OrderSerializer.create)
+    # so rendering an order doesn't need to load its items.
+    # 'item_count' is the number of units, i.e. the sum of the quantities.
+    total_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created_at',)
+        indexes = [
+            # A customer's order history, newest first (keyset pagination)
+            models.Index(
+                fields=['customer', '-created_at', '-id'],
+                name='orders_cust_created_idx',
+            ),
+            # Paid / unpaid orders in a date range (reports, admin filters)
+            models.Index(
+                fields=['paid', 'created_at'],
+                name='orders_paid_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Order {self.id} by {self.customer.email}"
@@ -43,8 +123,21 @@ class Order(models.Model):
     # --- Model Method ---
     # This is the 'get_total_cost' method from our plan.
     def get_total_cost(self):
-        """Calculates the total cost of the order."""
-        return sum(item.get_cost() for item in self.items.all())
+        """Returns the total cost of the order (stored on the order)."""
+        return self.total_cost
+
+    def update_totals(self, save=True):
+        """
+        Recomputes 'total_cost' and 'item_count' from the items in SQL.
+        Use this after editing the items of an existing order.
+        """
+        totals = Order.objects.filter(pk=self.pk).with_computed_totals().values(
+            'computed_total_cost', 'computed_item_count'
+        ).get()
+        self.total_cost = totals['computed_total_cost']
+        self.item_count = totals['computed_item_count']
+        if save:
+            self.save(update_fields=['total_cost', 'item_count', 'updated_at'])
 
 
 # 2. --- OrderItem Model ---
@@ -77,4 +170,37 @@ class OrderItem(models.Model):
     # --- Model Method ---
     def get_cost(self):
         """Calculates the cost of this single line item."""
-        return self.price * self.quantity
\ No newline at end of file
+        return self.price * self.quantity
+
+
+# 3. --- PaymentEvent Model ---
+# One row per gateway webhook event we have received. The unique
+# 'event_id' is what makes redelivered events harmless: they are
+# dropped on insert and never processed twice.
+
+class PaymentEvent(models.Model):
+    event_id = models.CharField(max_length=255, unique=True)
+    event = models.CharField(max_length=100) # e.g. "payment.captured"
+    razorpay_order_id = models.CharField(max_length=255, blank=True, null=True)
+    razorpay_payment_id = models.CharField(max_length=255, blank=True, null=True)
+    payload = models.JSONField()
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True) # NULL until handled
+    # Set when the event couldn't be applied, e.g. a payment for an order
+    # that no longer exists; such events need a refund or a manual fix
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ('received_at',)
+        indexes = [
+            # Events still waiting to be processed (process_payment_events);
+            # partial, so it stays as small as the backlog
+            models.Index(
+                fields=['received_at'], condition=models.Q(processed_at__isnull=True),
+                name='orders_event_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event} ({self.event_id})"
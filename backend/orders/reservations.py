@@ -0,0 +1,104 @@
+# orders/reservations.py
+
+"""
+Stock reservations of unpaid orders, and releasing them.
+
+Checkout takes the stock out as soon as the order is created (see
+OrderSerializer.create), so an order that is never paid would hold it
+forever. Instead, an unpaid order's reservation lasts
+ORDER_RESERVATION_MINUTES. After that, release_expired_orders():
+
+- finds expired orders in batches, walking the (paid, created_at) index
+  oldest first, so each batch costs the same however many orders exist
+- adds their quantities up per product and puts them back into stock
+  with set-based UPDATEs (store.inventory.release_stock)
+- deletes the orders and their items, so unpaid leftovers don't pile up
+  in the orders table
+
+Run it every minute or so:
+
+    python manage.py release_expired_orders            # once (e.g. cron)
+    python manage.py release_expired_orders --every 60 # as a worker
+
+An order being paid while its batch is swept can't be lost: the batch
+is locked (SELECT ... FOR UPDATE where the database supports it) and the
+delete only matches orders that are still unpaid.
+
+An order that has a gateway order may still be paid after its
+reservation: the customer may have been in the payment popup, and the
+gateway can capture an authorized payment later. Those orders are kept
+(with their stock) for ORDER_PAYMENT_GRACE_MINUTES more. A payment that
+still arrives for an order that is gone is flagged, not dropped (see
+orders.webhooks.flag_orphaned_payment).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from store.inventory import release_stock
+from .models import Order, OrderItem
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def reservation_cutoff(now=None):
+    """Unpaid orders created before this have lost their reservation."""
+    return (now or timezone.now()) - timedelta(minutes=settings.ORDER_RESERVATION_MINUTES)
+
+
+def reservation_expires_at(order):
+    return order.created_at + timedelta(minutes=settings.ORDER_RESERVATION_MINUTES)
+
+
+def payment_cutoff(now=None):
+    """Unpaid orders with a gateway order created before this are released too."""
+    return reservation_cutoff(now) - timedelta(minutes=settings.ORDER_PAYMENT_GRACE_MINUTES)
+
+
+def release_batch(cutoff, grace_cutoff, batch_size):
+    """Releases one batch; returns the number of orders deleted."""
+    with transaction.atomic():
+        # 'paid__in' rather than 'paid=False': Django writes the latter as
+        # NOT paid, which SQLite can't turn into a range on the index
+        batch = Order.objects.filter(
+            Q(razorpay_order_id__isnull=True) | Q(created_at__lt=grace_cutoff),
+            paid__in=[False], created_at__lt=cutoff,
+        ).order_by('created_at')
+        if connection.features.has_select_for_update_skip_locked:
+            # Rows locked by a payment (or another sweeper) are left for next time
+            batch = batch.select_for_update(skip_locked=True)
+        ids = list(batch.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        quantities = dict(
+            OrderItem.objects.filter(order_id__in=ids, product__isnull=False)
+            .values('product_id').annotate(total=Sum('quantity'))
+            .values_list('product_id', 'total')
+        )
+        release_stock(quantities)
+
+        # The items go with them, in one DELETE ... WHERE order_id IN (...)
+        Order.objects.filter(id__in=ids, paid=False).only('id').delete()
+        return len(ids)
+
+
+def release_expired_orders(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Deletes every unpaid order whose reservation has expired and puts its
+    stock back, one batch (and one transaction) at a time. Orders with a
+    gateway order wait out the payment grace period first. Returns the
+    number of orders released.
+    """
+    cutoff = reservation_cutoff(now)
+    grace_cutoff = payment_cutoff(now)
+    released = 0
+    while True:
+        count = release_batch(cutoff, grace_cutoff, batch_size)
+        released += count
+        if count < batch_size:
+            return released
@@ -1,10 +1,52 @@
 # orders/serializers.py
 
+from django.db import transaction
 from rest_framework import serializers
+from .cart import MAX_CART_LINES, MAX_LINE_QUANTITY, as_product_id, load_products
 from .models import Order, OrderItem
+from store.inventory import available_stock, merge_quantities, reserve_stock
+from store.fieldsets import SparseFieldsetMixin
 from store.models import Product
 from store.serializers import ProductSerializer
 
+class CartProductField(serializers.PrimaryKeyRelatedField):
+    """
+    'product_id' on a cart line. Inside a cart, OrderItemListSerializer
+    has already loaded the products of every line with one query, so
+    this only picks the product out of that; on its own it falls back
+    to the usual one-query lookup.
+    """
+
+    def to_internal_value(self, data):
+        products = getattr(self.parent.parent, 'products', None)
+        if products is None:
+            return super().to_internal_value(data)
+        product_id = as_product_id(data)
+        if product_id is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        product = products.get(product_id)
+        if product is None:
+            self.fail('does_not_exist', pk_value=data)
+        return product
+
+
+class OrderItemListSerializer(serializers.ListSerializer):
+    """The items of an order: loads their products in one query, then validates each line."""
+
+    products = None
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data) # Reports 'not_a_list'
+        self.products = load_products(
+            line.get('product_id') for line in data if isinstance(line, dict)
+        )
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.products = None
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     # We include a nested ProductSerializer to show product details
     # We set it to read_only=True because we'll handle creation manually
@@ -12,7 +54,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
     
     # This 'product_id' is what the frontend will send in the cart
     # It's 'write_only' because we only use it to *create* the OrderItem
-    product_id = serializers.PrimaryKeyRelatedField(
+    product_id = CartProductField(
         queryset=Product.objects.all(), write_only=True, source='product'
     )
     
@@ -20,14 +62,19 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = ['id', 'product', 'product_id', 'price', 'quantity']
         read_only_fields = ['price'] # Price will be set from the Product
+        list_serializer_class = OrderItemListSerializer
+
 
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Supports ?fields= and ?expand= on reads, including nested paths
+    # such as ?fields=id,items.quantity,items.product.name
+    # (see store/fieldsets.py)
 
-class OrderSerializer(serializers.ModelSerializer):
     # This is our nested serializer. It will handle the list of items
     # in the cart.
     items = OrderItemSerializer(many=True)
     
-    # We'll send back the total cost, which is a 'model method'
+    # We'll send back the total cost, which is stored on the order
     total_cost = serializers.SerializerMethodField(read_only=True)
     
     # We'll send back the customer's email
@@ -46,11 +93,14 @@ class OrderSerializer(serializers.ModelSerializer):
             'city',
             'items', # The nested list of cart items
             'total_cost',
+            'item_count',
             'customer_email',
             'paid',
             'razorpay_order_id',
         ]
-        read_only_fields = ['id', 'total_cost', 'customer_email', 'paid', 'razorpay_order_id']
+        read_only_fields = [
+            'id', 'total_cost', 'item_count', 'customer_email', 'paid', 'razorpay_order_id'
+        ]
 
     def get_total_cost(self, obj):
         return obj.get_total_cost()
@@ -59,43 +109,139 @@ class OrderSerializer(serializers.ModelSerializer):
         """
         This is the custom logic for creating an Order and its
         associated OrderItems from the nested 'items' data.
+
+        Everything runs in one transaction: the order, all of its items
+        (one bulk INSERT) and the stock reservation. If any line is out
+        of stock, nothing is written and the error points at that line.
         """
         # Pop the 'items' data from the validated data
         items_data = validated_data.pop('items')
         
         # We set the 'customer' automatically from the request user
         validated_data['customer'] = self.context['request'].user
-        
-        # Create the Order instance (e.g., with shipping info)
-        order = Order.objects.create(**validated_data)
 
-        total_cost = 0
-        
-        # Loop through each item in the cart data
-        for item_data in items_data:
-            product = item_data['product'] # This is the Product object
-            quantity = item_data['quantity']
-
-            # Check if there is enough stock
-            if product.stock < quantity:
-                # If not, roll back the transaction and raise an error
-                order.delete() # Delete the order we just created
-                raise serializers.ValidationError(
-                    f"Not enough stock for {product.name}. Available: {product.stock}"
+        with transaction.atomic():
+            # --- Reserve the stock first ---
+            # Each product gets a single conditional UPDATE
+            # (stock = stock - q WHERE stock >= q), so concurrent
+            # checkouts can never oversell.
+            quantities = merge_quantities(
+                (item['product'].id, item['quantity']) for item in items_data
+            )
+            # The products are loaded already; so is whether their stock is sharded
+            shards = {item['product'].id: item['product'].stock_shards for item in items_data}
+            failed = reserve_stock(quantities, shards)
+            if failed:
+                # Raising inside the atomic block rolls back the
+                # reservations that did succeed.
+                raise self.stock_error(items_data, failed)
+
+            # Create the Order instance (e.g., with shipping info)
+            order = Order(**validated_data)
+
+            # Build the OrderItems in memory
+            order_items = [
+                OrderItem(
+                    order=order,
+                    product=item['product'],
+                    # --- This is a crucial step ---
+                    # We save the price from the *Product* at the time of purchase
+                    price=item['product'].price,
+                    quantity=item['quantity'],
                 )
+                for item in items_data
+            ]
 
-            # Create the OrderItem
-            order_item = OrderItem.objects.create(
-                order=order,
-                product=product,
-                # --- This is a crucial step ---
-                # We save the price from the *Product* at the time of purchase
-                price=product.price, 
-                quantity=quantity
-            )
-            
-            # --- Update the product stock ---
-            product.stock -= quantity
-            product.save()
+            # Store the totals so we never have to add up the items again
+            order.total_cost = sum(item.get_cost() for item in order_items)
+            order.item_count = sum(item.quantity for item in order_items)
+            order.save()
+
+            OrderItem.objects.bulk_create(order_items)
 
-        return order
\ No newline at end of file
+        return order
+
+    def stock_error(self, items_data, failed):
+        """
+        Builds a ValidationError with one entry per cart line, so the
+        client can tell which lines are out of stock.
+        """
+        available = available_stock(failed)
+        line_errors = []
+        for item in items_data:
+            product = item['product']
+            if product.id in failed:
+                line_errors.append({'quantity': [
+                    f"Not enough stock for {product.name}. "
+                    f"Available: {available.get(product.id, 0)}"
+                ]})
+            else:
+                line_errors.append({})
+        return serializers.ValidationError({'items': line_errors})
+
+
+# --- Cart Validation ---
+
+class CartLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_LINE_QUANTITY)
+    # The price the cart is showing, to tell whether it changed
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+
+class CartSerializer(serializers.Serializer):
+    """What POST /api/cart/validate/ accepts: {"items": [{"product_id", "quantity", "price"}]}"""
+    items = CartLineSerializer(many=True, allow_empty=False, max_length=MAX_CART_LINES)
+
+
+class CartItemResultSerializer(serializers.Serializer):
+    # Lines whose product no longer exists only have the first three
+    # (fields that aren't required are left out when missing)
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    status = serializers.CharField()
+    name = serializers.CharField(required=False)
+    slug = serializers.CharField(required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    price_changed = serializers.BooleanField(required=False)
+    stock = serializers.IntegerField(required=False)
+    available = serializers.BooleanField(required=False)
+    # Wide enough for any price times MAX_LINE_QUANTITY, over MAX_CART_LINES
+    line_total = serializers.DecimalField(max_digits=17, decimal_places=2, required=False)
+
+
+class CartResultSerializer(serializers.Serializer):
+    """The repriced cart built by orders.cart.price_cart()."""
+    items = CartItemResultSerializer(many=True)
+    total = serializers.DecimalField(max_digits=17, decimal_places=2)
+    item_count = serializers.IntegerField()
+    valid = serializers.BooleanField()
+
+
+class SellerOrderItemSerializer(serializers.ModelSerializer):
+    """
+    One line of an order, as the seller of its product sees it: what
+    was bought, whether it is paid and where it has to be shipped.
+    """
+    order_id = serializers.IntegerField(source='order.id', read_only=True)
+    ordered_at = serializers.DateTimeField(source='order.created_at', read_only=True)
+    paid = serializers.BooleanField(source='order.paid', read_only=True)
+    product_id = serializers.IntegerField(source='product.id', read_only=True)
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    product_slug = serializers.CharField(source='product.slug', read_only=True)
+
+    # --- Shipping Details ---
+    first_name = serializers.CharField(source='order.first_name', read_only=True)
+    last_name = serializers.CharField(source='order.last_name', read_only=True)
+    address = serializers.CharField(source='order.address', read_only=True)
+    postal_code = serializers.CharField(source='order.postal_code', read_only=True)
+    city = serializers.CharField(source='order.city', read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = [
+            'id', 'order_id', 'ordered_at', 'paid',
+            'product_id', 'product_name', 'product_slug', 'price', 'quantity',
+            'first_name', 'last_name', 'address', 'postal_code', 'city',
+        ]
+        read_only_fields = fields
@@ -1,3 +1,655 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from store.inventory import available_stock, shard_stock
+from store.models import Product
+from users.models import CustomUser
+from .fake_gateway import FakeGateway
+from .gateway import get_async_gateway, get_gateway, receipt_for
+from .models import Order, OrderItem, PaymentEvent
+from .reservations import release_expired_orders
+from .webhooks import parse_events, record_events
+
+
+class OrderTestMixin:
+    """
+    Builds a seller with a couple of products and a customer.
+    """
+
+    def make_catalog(self, stock=10):
+        seller = CustomUser.objects.create_user(
+            email='seller@example.com', username='seller', password='pass12345',
+            role=CustomUser.Role.SELLER,
+        )
+        self.customer = CustomUser.objects.create_user(
+            email='buyer@example.com', username='buyer', password='pass12345',
+        )
+        self.mug = Product.objects.create(
+            seller=seller.sellerprofile, name='Mug', description='A mug',
+            price=Decimal('12.50'), stock=stock, slug='mug',
+        )
+        self.lamp = Product.objects.create(
+            seller=seller.sellerprofile, name='Lamp', description='A lamp',
+            price=Decimal('40.00'), stock=stock, slug='lamp',
+        )
+
+    def order_payload(self, items):
+        return {
+            'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com',
+            'address': '1 Main St', 'postal_code': '12345', 'city': 'London',
+            'items': [{'product_id': product.id, 'quantity': qty} for product, qty in items],
+        }
+
+
+class OrderTotalsTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.make_catalog()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_create_stores_totals(self):
+        response = self.client.post(
+            '/api/orders/create/',
+            self.order_payload([(self.mug, 2), (self.lamp, 1)]),
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        order = Order.objects.get(id=response.data['id'])
+        self.assertEqual(order.total_cost, Decimal('65.00'))
+        self.assertEqual(order.item_count, 3)
+        self.assertEqual(response.data['item_count'], 3)
+
+    def test_reconcile_command_fixes_stale_totals(self):
+        order = Order.objects.create(
+            customer=self.customer, first_name='A', last_name='B', email='a@b.c',
+            address='x', postal_code='1', city='y',
+        )
+        OrderItem.objects.create(order=order, product=self.mug, price=Decimal('12.50'), quantity=4)
+
+        out = StringIO()
+        call_command('reconcile_order_totals', stdout=out)
+        self.assertIn('fixed 1', out.getvalue())
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_cost, Decimal('50.00'))
+        self.assertEqual(order.item_count, 4)
+
+    def test_computed_totals_annotation(self):
+        order = Order.objects.create(
+            customer=self.customer, first_name='A', last_name='B', email='a@b.c',
+            address='x', postal_code='1', city='y',
+        )
+        OrderItem.objects.create(order=order, product=self.lamp, price=Decimal('40.00'), quantity=2)
+        annotated = Order.objects.with_computed_totals().get(pk=order.pk)
+        self.assertEqual(annotated.computed_total_cost, Decimal('80.00'))
+        self.assertEqual(annotated.computed_item_count, 2)
+
+
+class OrderStockTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.make_catalog(stock=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_out_of_stock_line_rolls_back_everything(self):
+        response = self.client.post(
+            '/api/orders/create/',
+            self.order_payload([(self.lamp, 1), (self.mug, 5)]),
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['items'][0], {})
+        self.assertIn('Available: 3', str(response.data['items'][1]['quantity'][0]))
+
+        self.assertFalse(Order.objects.exists())
+        self.lamp.refresh_from_db()
+        self.assertEqual(self.lamp.stock, 3)
+
+    def test_duplicate_lines_share_one_reservation(self):
+        response = self.client.post(
+            '/api/orders/create/',
+            self.order_payload([(self.mug, 2), (self.mug, 2)]),
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.mug.refresh_from_db()
+        self.assertEqual(self.mug.stock, 3)
+
+
+class CartValidationTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.make_catalog(stock=3)
+        self.client = APIClient()
+
+    def test_reprices_cart_in_one_query(self):
+        self.mug.price = Decimal('15.00')
+        self.mug.save()
+        self.lamp.available = False
+        self.lamp.save()
+        cart = {'items': [
+            {'product_id': self.mug.id, 'quantity': 2, 'price': '12.50'},
+            {'product_id': self.lamp.id, 'quantity': 1},
+            {'product_id': 999999, 'quantity': 1},
+        ]}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/cart/validate/', cart, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(queries), 1)
+
+        mug, lamp, missing = response.data['items']
+        self.assertEqual((mug['status'], mug['price'], mug['line_total']), ('ok', '15.00', '30.00'))
+        self.assertTrue(mug['price_changed'])
+        self.assertEqual(lamp['status'], 'unavailable')
+        self.assertEqual(missing, {'product_id': 999999, 'quantity': 1, 'status': 'not_found'})
+        self.assertEqual(response.data['total'], '30.00')
+        self.assertFalse(response.data['valid'])
+
+    def test_stock_is_checked_over_all_lines(self):
+        cart = {'items': [
+            {'product_id': self.mug.id, 'quantity': 2},
+            {'product_id': self.mug.id, 'quantity': 2},
+        ]}
+        response = self.client.post('/api/cart/validate/', cart, format='json')
+        self.assertEqual([item['status'] for item in response.data['items']], ['insufficient_stock'] * 2)
+
+    def test_huge_quantity_is_rejected(self):
+        self.mug.price = Decimal('99999999.99')
+        self.mug.stock = 10 ** 6
+        self.mug.save()
+        for quantity, code in ((10 ** 12, 400), (10000, 200)):
+            cart = {'items': [{'product_id': self.mug.id, 'quantity': quantity}] * 100}
+            response = self.client.post('/api/cart/validate/', cart, format='json')
+            self.assertEqual(response.status_code, code)
+
+    def test_checkout_loads_products_once(self):
+        from .serializers import OrderSerializer
+        payload = self.order_payload([(self.mug, 1), (self.lamp, 1), (self.mug, 1)])
+        payload['items'].append({'product_id': 999999, 'quantity': 1})
+        serializer = OrderSerializer(data=payload)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(list(serializer.errors), ['items'])
+        self.assertIn('does not exist', str(serializer.errors['items']))
+
+
+class ReservationExpiryTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.make_catalog(stock=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def checkout(self, items, minutes_ago=0, paid=False):
+        response = self.client.post('/api/orders/create/', self.order_payload(items), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        Order.objects.filter(id=response.data['id']).update(
+            created_at=timezone.now() - timedelta(minutes=minutes_ago), paid=paid,
+        )
+        return response.data['id']
+
+    def test_expired_unpaid_orders_give_their_stock_back(self):
+        expired = [self.checkout([(self.mug, 2), (self.lamp, 1)], minutes_ago=45) for _ in range(3)]
+        recent = self.checkout([(self.mug, 1)], minutes_ago=5)
+        paid = self.checkout([(self.lamp, 1)], minutes_ago=45, paid=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            released = release_expired_orders(batch_size=2)
+        self.assertEqual(released, 3)
+        # Two batches of a fixed number of queries, plus the empty lookup that ends it
+        self.assertLess(len(queries), 25)
+
+        self.assertFalse(Order.objects.filter(id__in=expired).exists())
+        self.assertFalse(OrderItem.objects.filter(order_id__in=expired).exists())
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {recent, paid})
+        self.mug.refresh_from_db()
+        self.lamp.refresh_from_db()
+        self.assertEqual((self.mug.stock, self.lamp.stock), (9, 9))
+
+    def test_sharded_stock_is_released_into_a_shard(self):
+        shard_stock(self.mug, 4)
+        self.checkout([(self.mug, 3)], minutes_ago=45)
+        self.assertEqual(available_stock([self.mug.id])[self.mug.id], 7)
+        release_expired_orders()
+        self.assertEqual(available_stock([self.mug.id])[self.mug.id], 10)
+
+    @override_settings(ORDER_PAYMENT_GRACE_MINUTES=60, RAZORPAY_KEY_SECRET='secret')
+    def test_started_payments_are_kept_for_the_grace_period(self):
+        started = self.checkout([(self.mug, 2)], minutes_ago=45)
+        Order.objects.filter(id=started).update(razorpay_order_id='order_late')
+        self.assertEqual(release_expired_orders(), 0)
+        # The gateway captured the payment after the reservation ran out
+        response = self.client.post('/api/orders/verify-payment/', {
+            'razorpay_order_id': 'order_late', 'razorpay_payment_id': 'pay_1',
+            'razorpay_signature': sign('order_late|pay_1', 'secret'),
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        abandoned = self.checkout([(self.mug, 1)], minutes_ago=45 + 61)
+        Order.objects.filter(id=abandoned).update(razorpay_order_id='order_gone')
+        self.assertEqual(release_expired_orders(), 1)
+        self.mug.refresh_from_db()
+        self.assertEqual(self.mug.stock, 8)
+
+        with self.assertLogs('orders.webhooks', 'ERROR'):
+            response = self.client.post('/api/orders/verify-payment/', {
+                'razorpay_order_id': 'order_gone', 'razorpay_payment_id': 'pay_2',
+                'razorpay_signature': sign('order_gone|pay_2', 'secret'),
+            }, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_expired_order_cannot_be_paid(self):
+        order_id = self.checkout([(self.mug, 1)], minutes_ago=45)
+        response = self.client.post('/api/orders/pay/', {'order_id': order_id}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class ConcurrentCheckoutTests(OrderTestMixin, TransactionTestCase):
+    """
+    Many buyers race for the last units of a product; the conditional
+    UPDATE must let exactly 'stock' of them through.
+    """
+    buyers = 20
+    stock = 5
+
+    def setUp(self):
+        self.make_catalog(stock=self.stock)
+
+    def checkout(self, barrier, results):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        try:
+            barrier.wait()
+            response = client.post(
+                '/api/orders/create/',
+                self.order_payload([(self.mug, 1)]),
+                format='json',
+            )
+            results.append(response.status_code)
+        finally:
+            connection.close()
+
+    def test_no_overselling(self):
+        barrier = threading.Barrier(self.buyers)
+        results = []
+        threads = [
+            threading.Thread(target=self.checkout, args=(barrier, results))
+            for _ in range(self.buyers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), self.buyers)
+        self.assertEqual(results.count(201), self.stock)
+        self.assertEqual(results.count(400), self.buyers - self.stock)
+
+        self.mug.refresh_from_db()
+        self.assertEqual(self.mug.stock, 0)
+        self.assertEqual(OrderItem.objects.filter(product=self.mug).count(), self.stock)
+
+
+class FakeGatewayMixin:
+    """
+    Runs the local fake gateway and points the gateway client at it.
+    """
+    gateway_options = {}
+
+    def setUp(self):
+        super().setUp()
+        self.gateway = FakeGateway(**self.gateway_options).start()
+        self.addCleanup(self.gateway.stop)
+        overrides = override_settings(RAZORPAY_API_URL=self.gateway.url, RAZORPAY_RETRY_BACKOFF=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # The clients are built once per process from the settings
+        get_gateway.cache_clear()
+        get_async_gateway.cache_clear()
+        self.addCleanup(get_gateway.cache_clear)
+        self.addCleanup(get_async_gateway.cache_clear)
+
+    def make_order(self, total='65.00'):
+        return Order.objects.create(
+            customer=self.customer, first_name='A', last_name='B', email='a@b.c',
+            address='x', postal_code='1', city='y', total_cost=Decimal(total), item_count=1,
+        )
+
+
+class StartPaymentTests(FakeGatewayMixin, OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.make_catalog()
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_creates_gateway_order(self):
+        order = self.make_order()
+        response = self.client.post('/api/orders/pay/', {'order_id': order.id}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['amount'], 6500)
+
+        order.refresh_from_db()
+        self.assertEqual(order.razorpay_order_id, response.data['razorpay_order_id'])
+        self.assertEqual(self.gateway.orders[order.razorpay_order_id]['receipt'], receipt_for(order))
+
+    def test_retry_reuses_gateway_order(self):
+        order = self.make_order()
+        first = self.client.post('/api/orders/pay/', {'order_id': order.id}, format='json')
+        second = self.client.post('/api/orders/pay/', {'order_id': order.id}, format='json')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.gateway.create_calls, 1)
+
+    def test_checkout_in_one_request(self):
+        response = self.client.post(
+            '/api/orders/checkout/', self.order_payload([(self.mug, 2), (self.lamp, 1)]), format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['amount'], 6500)
+        self.assertEqual(response.data['item_count'], 3)
+
+        order = Order.objects.get(id=response.data['order_id'])
+        self.assertEqual(order.razorpay_order_id, response.data['razorpay_order_id'])
+        self.mug.refresh_from_db()
+        self.assertEqual(self.mug.stock, 8)
+
+    def test_checkout_out_of_stock_skips_gateway(self):
+        response = self.client.post(
+            '/api/orders/checkout/', self.order_payload([(self.mug, 50)]), format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.gateway.create_calls, 0)
+        self.assertFalse(Order.objects.exists())
+
+    def test_async_view(self):
+        order = self.make_order()
+        token = AccessToken.for_user(self.customer)
+        response = async_to_sync(AsyncClient().post)(
+            '/api/orders/pay/async/', {'order_id': order.id},
+            content_type='application/json', headers={'Authorization': f'Bearer {token}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.razorpay_order_id, response.json()['razorpay_order_id'])
+
+    def test_async_view_uses_configured_authentication(self):
+        token = AccessToken.for_user(self.customer)
+        rest_framework = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework.authentication.BasicAuthentication',),
+        }
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            response = async_to_sync(AsyncClient().post)(
+                '/api/orders/pay/async/', {'order_id': self.make_order().id},
+                content_type='application/json', headers={'Authorization': f'Bearer {token}'},
+            )
+        self.assertEqual(response.status_code, 401)
+
+    def test_async_view_requires_token(self):
+        response = async_to_sync(AsyncClient().post)(
+            '/api/orders/pay/async/', {'order_id': 1}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class GatewayRetryTests(FakeGatewayMixin, OrderTestMixin, TestCase):
+    # The first creation is stored by the gateway but answered with a 503
+    gateway_options = {'fail_first': 1}
+
+    def setUp(self):
+        self.make_catalog()
+        super().setUp()
+
+    def test_retry_reuses_order_with_same_receipt(self):
+        order = self.make_order()
+        gateway_order = get_gateway().create_order(6500, 'INR', receipt_for(order))
+
+        self.assertEqual(self.gateway.create_calls, 1)
+        self.assertEqual(len(self.gateway.orders), 1)
+        self.assertIn(gateway_order['id'], self.gateway.orders)
+
+    def test_unreachable_gateway(self):
+        self.gateway.stop()
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        with override_settings(RAZORPAY_MAX_RETRIES=0, RAZORPAY_CONNECT_TIMEOUT=0.5):
+            get_gateway.cache_clear()
+            response = client.post('/api/orders/pay/', {'order_id': self.make_order().id}, format='json')
+        self.assertEqual(response.status_code, 502)
+
+
+def sign(message, secret):
+    return hmac.new(secret.encode(), msg=message.encode(), digestmod=hashlib.sha256).hexdigest()
+
+
+@override_settings(RAZORPAY_KEY_SECRET='secret')
+class PaymentVerificationTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.make_catalog()
+        self.order = Order.objects.create(
+            customer=self.customer, first_name='A', last_name='B', email='a@b.c',
+            address='x', postal_code='1', city='y', razorpay_order_id='order_abc',
+        )
+        OrderItem.objects.create(order=self.order, product=self.mug, price=Decimal('12.50'), quantity=1)
+        self.client = APIClient()
+
+    def verify(self, payment_id='pay_1', signature=None):
+        signature = signature or sign(f'order_abc|{payment_id}', 'secret')
+        return self.client.post('/api/orders/verify-payment/', {
+            'razorpay_order_id': 'order_abc',
+            'razorpay_payment_id': payment_id,
+            'razorpay_signature': signature,
+        }, format='json')
+
+    def test_marks_order_paid(self):
+        response = self.verify()
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(response.data['paid'])
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.paid)
+        self.assertEqual(self.order.razorpay_payment_id, 'pay_1')
+
+    def test_retried_callback_is_idempotent(self):
+        self.verify()
+        updated_at = Order.objects.get(pk=self.order.pk).updated_at
+        response = self.verify()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).updated_at, updated_at)
+
+    def test_other_payment_for_paid_order(self):
+        self.verify()
+        self.assertEqual(self.verify(payment_id='pay_2').status_code, 409)
+
+    def test_bad_signature(self):
+        self.assertEqual(self.verify(signature='nope').status_code, 400)
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.paid)
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET='whsec', BACKGROUND_TASKS_EAGER=True)
+class WebhookTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.make_catalog()
+        self.order = Order.objects.create(
+            customer=self.customer, first_name='A', last_name='B', email='a@b.c',
+            address='x', postal_code='1', city='y', razorpay_order_id='order_abc',
+        )
+
+    def captured(self, event_id, payment_id='pay_1', order_id='order_abc'):
+        return {
+            'id': event_id, 'entity': 'event', 'event': 'payment.captured',
+            'payload': {'payment': {'entity': {'id': payment_id, 'order_id': order_id}}},
+        }
+
+    def post(self, data, secret='whsec'):
+        body = json.dumps(data)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                '/api/orders/webhook/', body, content_type='application/json',
+                headers={'X-Razorpay-Signature': sign(body, secret)},
+            )
+
+    def test_batch_marks_order_paid(self):
+        with self.assertLogs('orders.webhooks', 'ERROR'):
+            response = self.post([self.captured('evt_1'), self.captured('evt_2', order_id='order_other')])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'received': 2, 'duplicates': 0})
+
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.paid)
+        self.assertEqual(self.order.razorpay_payment_id, 'pay_1')
+        self.assertFalse(PaymentEvent.objects.filter(processed_at__isnull=True).exists())
+        # A payment for an order we don't have is flagged, not dropped
+        self.assertEqual(PaymentEvent.objects.get(error__gt='').event_id, 'evt_2')
+
+    def test_redelivered_events_are_dropped(self):
+        self.post({'events': [self.captured('evt_1')]})
+        response = self.post({'events': [self.captured('evt_1'), self.captured('evt_1')]})
+        self.assertEqual(response.json(), {'received': 1, 'duplicates': 1})
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+
+    def test_unprocessed_events_are_processed_again(self):
+        # Stored, but the process died before handling it
+        record_events(parse_events([self.captured('evt_1')]))
+        self.assertFalse(Order.objects.get(pk=self.order.pk).paid)
+
+        response = self.post([self.captured('evt_1')])
+        self.assertEqual(response.json(), {'received': 1, 'duplicates': 1})
+        self.assertTrue(Order.objects.get(pk=self.order.pk).paid)
+
+    def test_sweep_processes_pending_events(self):
+        record_events(parse_events([self.captured('evt_1')]))
+        call_command('process_payment_events', stdout=StringIO())
+        self.assertFalse(Order.objects.get(pk=self.order.pk).paid) # Too recent
+
+        PaymentEvent.objects.update(received_at=timezone.now() - timedelta(minutes=5))
+        out = StringIO()
+        call_command('process_payment_events', stdout=out)
+        self.assertIn('Processed 1 pending events.', out.getvalue())
+        self.assertTrue(Order.objects.get(pk=self.order.pk).paid)
+
+    def test_single_event_uses_header_id(self):
+        event = self.captured(None)
+        del event['id']
+        body = json.dumps(event)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/orders/webhook/', body, content_type='application/json',
+                headers={'X-Razorpay-Signature': sign(body, 'whsec'), 'X-Razorpay-Event-Id': 'evt_h'},
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(PaymentEvent.objects.filter(event_id='evt_h').exists())
+
+    def test_bad_signature(self):
+        response = self.post([self.captured('evt_1')], secret='wrong')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_event_without_id(self):
+        event = self.captured('x')
+        del event['id']
+        self.assertEqual(self.post([event]).status_code, 400)
+
+
+class OrderHistoryTests(OrderTestMixin, TestCase):
+
+    def setUp(self):
+        self.make_catalog(stock=100)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def place_orders(self, count, paid=False):
+        for _ in range(count):
+            response = self.client.post(
+                '/api/orders/create/', self.order_payload([(self.mug, 1), (self.lamp, 2)]), format='json'
+            )
+            Order.objects.filter(pk=response.data['id']).update(paid=paid)
+
+    def count_queries(self, url, client=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return len(ctx)
+
+    def test_customer_history_query_count_is_constant(self):
+        self.place_orders(2)
+        before = self.count_queries('/api/orders/')
+        self.place_orders(8)
+        self.assertEqual(self.count_queries('/api/orders/'), before)
+
+        response = self.client.get('/api/orders/')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(len(response.data['results'][0]['items']), 2)
+
+    def test_sparse_fields_reach_nested_items(self):
+        self.place_orders(1)
+        response = self.client.get('/api/orders/?fields=id,items.quantity,items.product.name')
+        order = response.data['results'][0]
+        self.assertEqual(set(order), {'id', 'items'})
+        self.assertEqual(order['items'][0], {'quantity': 1, 'product': {'name': 'Mug'}})
+
+    def test_only_own_orders_and_pagination(self):
+        self.place_orders(3)
+        other = CustomUser.objects.create_user(email='x@example.com', username='x', password='pass12345')
+        Order.objects.create(customer=other, first_name='A', last_name='B', email='a@b.c',
+                             address='x', postal_code='1', city='y')
+
+        response = self.client.get('/api/orders/?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_filters(self):
+        self.place_orders(2, paid=True)
+        self.place_orders(1)
+        self.assertEqual(len(self.client.get('/api/orders/?paid=true').data['results']), 2)
+        self.assertEqual(len(self.client.get('/api/orders/?paid=false').data['results']), 1)
+
+        today = timezone.now().date().isoformat()
+        self.assertEqual(len(self.client.get(f'/api/orders/?created_after={today}&created_before={today}').data['results']), 3)
+        self.assertEqual(len(self.client.get('/api/orders/?created_before=2000-01-01').data['results']), 0)
+        self.assertEqual(self.client.get('/api/orders/?created_after=soon').status_code, 400)
+
+    def test_seller_items(self):
+        self.place_orders(2, paid=True)
+        seller_client = APIClient()
+        seller = CustomUser.objects.get(email='seller@example.com')
+        seller.sellerprofile.is_approved = True
+        seller.sellerprofile.save()
+        seller_client.force_authenticate(seller)
+
+        url = '/api/orders/seller/items/?paid=true'
+        before = self.count_queries(url, seller_client)
+        self.place_orders(5, paid=True)
+        self.assertEqual(self.count_queries(url, seller_client), before)
+
+        results = seller_client.get(url).data['results']
+        self.assertEqual(len(results), 14)
+        self.assertEqual(results[0]['city'], 'London')
+        self.assertTrue(results[0]['paid'])
+
+        # Customers can't use it
+        self.assertEqual(self.client.get('/api/orders/seller/items/').status_code, 403)
@@ -4,12 +4,25 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    # The logged-in customer's orders (GET)
+    path('', views.OrderHistoryView.as_view(), name='order-history'),
+    # Order lines for the logged-in seller's products (GET)
+    path('seller/items/', views.SellerOrderItemListView.as_view(), name='seller-order-items'),
+
     # 1. POST to this to create an order in our DB
     path('create/', views.OrderCreateView.as_view(), name='order-create'),
     
     # 2. POST to this (with an 'order_id') to create a Razorpay order
     path('pay/', views.StartPaymentView.as_view(), name='start-payment'),
+    # 2b. Same as 'pay/', non-blocking when served through ASGI
+    path('pay/async/', views.start_payment_async, name='start-payment-async'),
+    
+    # 1+2. Both of the above in one request
+    path('checkout/', views.CheckoutView.as_view(), name='checkout'),
     
     # 3. POST to this with Razorpay IDs to verify payment
     path('verify-payment/', views.PaymentVerificationView.as_view(), name='verify-payment'),
+
+    # 4. Razorpay posts payment events here (one or a batch per request)
+    path('webhook/', views.WebhookView.as_view(), name='payment-webhook'),
 ]
\ No newline at end of file
@@ -3,20 +3,32 @@
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Order
-from .serializers import OrderSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from .filters import OrderFilterBackend
+from .models import Order, OrderItem
+from .cart import price_cart
+from .reservations import reservation_cutoff, reservation_expires_at
+from .serializers import CartResultSerializer, CartSerializer, OrderSerializer, SellerOrderItemSerializer
+from .gateway import GatewayError, get_async_gateway, get_gateway, receipt_for
+from .webhooks import (
+    WebhookError, flag_orphaned_payment, parse_events, process_events, record_events, verify_signature,
+)
+from main.tasks import run_in_background
+from store.pagination import KeysetPagination
+from store.permissions import IsApprovedSeller
+from store.queries import QueryPlanMixin, plan_queryset
+from users.authentication import get_seller_profile
+from asgiref.sync import sync_to_async
 from django.conf import settings
-import razorpay
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
 import hmac
 import hashlib
 import json
 
-# Initialize Razorpay client
-razorpay_client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
-
 # --- 1. View for Creating an Order ---
 
 class OrderCreateView(generics.CreateAPIView):
@@ -32,6 +44,29 @@ class OrderCreateView(generics.CreateAPIView):
         """Pass request context to the serializer."""
         return {'request': self.request}
 
+# --- 1b. Cart Validation ---
+
+class CartValidateView(APIView):
+    """
+    Reprices a cart before checkout. POST the whole cart:
+
+        {"items": [{"product_id": 1, "quantity": 2, "price": "9.99"}, ...]}
+
+    and get back every line with its current price, stock, availability
+    and line total, plus the cart total and whether it can be checked
+    out as is ('valid'). All products are read with one query.
+
+    Nothing is reserved; checkout checks the stock again. Anyone may
+    call it, since the cart exists before the customer logs in.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = CartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = price_cart(serializer.validated_data['items'])
+        return Response(CartResultSerializer(result).data)
+
 # --- 2. View for Starting the Payment ---
 
 class StartPaymentView(APIView):
@@ -52,44 +87,172 @@ class StartPaymentView(APIView):
 
         # Get the order from our database
         try:
-            order = Order.objects.get(id=order_id, customer=request.user, paid=False)
+            # An order past its reservation (orders/reservations.py) may
+            # no longer have its stock, so it can't be paid any more
+            order = Order.objects.get(
+                id=order_id, customer=request.user, paid=False, created_at__gte=reservation_cutoff()
+            )
         except Order.DoesNotExist:
             return Response(
-                {"error": "Order not found or already paid."}, 
+                {"error": "Order not found, already paid or expired."}, 
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Get total cost in the smallest currency unit (e.g., paise)
-        # Razorpay expects the amount in integers
-        amount_in_paise = int(order.get_total_cost() * 100)
-
         # --- Create Razorpay Order ---
+        # The gateway client pools connections, enforces timeouts and
+        # retries safely (see orders/gateway.py). An order that already
+        # has a gateway order (e.g. the customer retried) reuses it.
         try:
-            razorpay_order = razorpay_client.order.create({
-                "amount": amount_in_paise,
-                "currency": "INR", # Change as needed
-                "receipt": f"order_rcptid_{order.id}",
-                "payment_capture": 1 # Auto-capture payment
-            })
-            
-            # Save the Razorpay Order ID to our model
-            order.razorpay_order_id = razorpay_order['id']
-            order.save()
-
-            # Return the Razorpay order details to the frontend
-            return Response({
-                "razorpay_order_id": razorpay_order['id'],
-                "amount": razorpay_order['amount'],
-                "currency": razorpay_order['currency'],
-                "key": settings.RAZORPAY_KEY_ID,
-            }, status=status.HTTP_200_OK)
-
-        except Exception as e:
+            payload = start_payment(order)
+        except GatewayError as e:
             return Response(
                 {"error": str(e)}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                status=status.HTTP_502_BAD_GATEWAY
             )
 
+        # Return the Razorpay order details to the frontend
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+def start_payment(order):
+    """
+    Creates the gateway order for 'order' and saves its id, or reuses
+    the one saved by an earlier attempt without calling the gateway.
+    Returns the payment payload for the frontend.
+    """
+    if order.razorpay_order_id:
+        return existing_payment_payload(order)
+    razorpay_order = get_gateway().create_order(amount_in_paise(order), "INR", receipt_for(order))
+    # Save the Razorpay Order ID to our model
+    order.razorpay_order_id = razorpay_order['id']
+    order.save(update_fields=['razorpay_order_id', 'updated_at'])
+    return payment_payload(razorpay_order, order)
+
+
+def amount_in_paise(order):
+    """
+    Total cost in the smallest currency unit (e.g., paise).
+    Razorpay expects the amount in integers.
+    """
+    return int(order.get_total_cost() * 100)
+
+
+def payment_payload(razorpay_order, order):
+    """
+    What the frontend needs to open the Razorpay checkout popup, and
+    when the order's stock reservation runs out ('expires_at').
+    """
+    return {
+        "razorpay_order_id": razorpay_order['id'],
+        "amount": razorpay_order['amount'],
+        "currency": razorpay_order['currency'],
+        "key": settings.RAZORPAY_KEY_ID,
+        "expires_at": reservation_expires_at(order),
+    }
+
+
+def existing_payment_payload(order):
+    """payment_payload() for a gateway order created earlier, built from our own row."""
+    return payment_payload({
+        'id': order.razorpay_order_id, 'amount': amount_in_paise(order), 'currency': "INR",
+    }, order)
+
+
+# --- 2b. Async View for Starting the Payment (ASGI) ---
+
+def authenticate(request):
+    """
+    Runs the configured DRF authentication classes, like APIView does.
+    Returns the user of the first that accepts the request, or None.
+    """
+    for authenticator_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authenticator_class().authenticate(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+@csrf_exempt # Authenticated with a JWT header, not a session cookie
+async def start_payment_async(request):
+    """
+    Same contract as StartPaymentView, for deployments served through
+    main/asgi.py (e.g. `uvicorn main.asgi:application`).
+
+    The gateway call is awaited on the event loop instead of blocking a
+    worker thread, so a slow gateway no longer limits how many
+    checkouts a worker can have in flight.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    # --- Authenticate ---
+    # With the same classes as the DRF views (DEFAULT_AUTHENTICATION_CLASSES)
+    try:
+        user = await sync_to_async(authenticate)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({"error": str(e.detail)}, status=401)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+
+    try:
+        order_id = int(json.loads(request.body or b'{}').get('order_id') or 0)
+    except (ValueError, TypeError, AttributeError):
+        order_id = 0
+    if not order_id:
+        return JsonResponse({"error": "Order ID is required."}, status=400)
+
+    order = await Order.objects.filter(
+        id=order_id, customer=user, paid=False, created_at__gte=reservation_cutoff()
+    ).afirst()
+    if order is None:
+        return JsonResponse({"error": "Order not found, already paid or expired."}, status=404)
+
+    if order.razorpay_order_id:
+        return JsonResponse(existing_payment_payload(order))
+
+    try:
+        razorpay_order = await get_async_gateway().create_order(
+            amount_in_paise(order), "INR", receipt_for(order)
+        )
+    except GatewayError as e:
+        return JsonResponse({"error": str(e)}, status=502)
+
+    await Order.objects.filter(pk=order.pk).aupdate(
+        razorpay_order_id=razorpay_order['id'], updated_at=timezone.now()
+    )
+    return JsonResponse(payment_payload(razorpay_order, order))
+
+# --- 2c. Checkout in One Request ---
+
+class CheckoutView(APIView):
+    """
+    Creates the order (reserving its stock) and starts its payment in
+    one request: the body of /api/orders/create/ in, the payload of
+    /api/orders/pay/ out, plus the new order's id and totals.
+
+    The order and its reservation are one transaction, committed before
+    the gateway is called, so a slow gateway never holds database locks.
+    If the gateway fails, the order stays unpaid and the response (502)
+    carries its 'order_id', so the client can retry /api/orders/pay/.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = OrderSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        order = serializer.save()
+
+        summary = {
+            "order_id": order.id,
+            "total_cost": str(order.total_cost),
+            "item_count": order.item_count,
+        }
+        try:
+            payload = start_payment(order)
+        except GatewayError as e:
+            return Response({"error": str(e), **summary}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response({**summary, **payload}, status=status.HTTP_201_CREATED)
+
 # --- 3. View for Verifying the Payment ---
 
 class PaymentVerificationView(APIView):
@@ -124,24 +287,32 @@ class PaymentVerificationView(APIView):
                 )
 
             # --- Signature is Valid ---
-            # Get the order and mark it as paid
-            try:
-                order = Order.objects.get(razorpay_order_id=razorpay_order_id)
-                
-                order.paid = True
-                order.razorpay_payment_id = razorpay_payment_id
-                order.razorpay_signature = razorpay_signature
-                order.save()
-                
-                # We'll send back the serialized order data as confirmation
-                serializer = OrderSerializer(order)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-
-            except Order.DoesNotExist:
+            # Mark the order as paid with one narrow UPDATE. It only
+            # matches an unpaid order, so a retried callback writes nothing.
+            Order.objects.mark_paid(razorpay_order_id, razorpay_payment_id, razorpay_signature)
+
+            # Load the order (with its items, in a fixed number of
+            # queries) to send back as confirmation
+            order = plan_queryset(
+                Order.objects.filter(razorpay_order_id=razorpay_order_id), OrderSerializer
+            ).first()
+            if order is None:
+                # The payment went through, but its order has expired and
+                # been released (orders/reservations.py)
+                flag_orphaned_payment(razorpay_order_id, razorpay_payment_id, 'callback')
                 return Response(
-                    {"error": "Order not found."}, 
+                    {"error": "Order not found. The payment has been flagged for a refund."}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
+            if order.razorpay_payment_id != razorpay_payment_id:
+                # Already paid, but by a different payment
+                return Response(
+                    {"error": "Order has already been paid."},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            serializer = OrderSerializer(order)
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
         except KeyError:
             return Response(
@@ -152,4 +323,85 @@ class PaymentVerificationView(APIView):
             return Response(
                 {"error": str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+# --- 4. Webhook for Gateway Events ---
+
+class WebhookView(APIView):
+    """
+    Receives payment events from Razorpay, one or many per request.
+    Checks the signature, stores the new events and answers 202 right
+    away; the events are processed in the background (see orders/webhooks.py).
+    """
+    # The gateway doesn't log in; the signature is the authentication
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        if not settings.RAZORPAY_WEBHOOK_SECRET:
+            return Response(
+                {"error": "Webhooks are not configured."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        # The signature covers the raw body, so read it before parsing
+        body = request.body
+        if not verify_signature(body, request.headers.get('X-Razorpay-Signature')):
+            return Response(
+                {"error": "Invalid webhook signature."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            events = parse_events(json.loads(body), request.headers.get('X-Razorpay-Event-Id'))
+        except ValueError:
+            return Response({"error": "Invalid JSON."}, status=status.HTTP_400_BAD_REQUEST)
+        except WebhookError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Redelivered events that were never processed are tried again
+        new_ids, pending_ids = record_events(events)
+        if pending_ids:
+            run_in_background(process_events, pending_ids)
+
+        return Response(
+            {"received": len(events), "duplicates": len(events) - len(new_ids)},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+# --- 5. Order History ---
+
+class OrderHistoryView(QueryPlanMixin, generics.ListAPIView):
+    """
+    The logged-in customer's orders, newest first, with their items.
+    Cursor-paginated (see store/pagination.py); filter with
+    ?paid=true|false&created_after=<date>&created_before=<date>.
+    The items, their products and sellers are loaded with a fixed
+    number of queries, however many orders are on the page.
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [OrderFilterBackend]
+
+    def get_queryset(self):
+        # By id, so this also works with stateless (token) users
+        return Order.objects.filter(customer_id=self.request.user.id)
+
+class SellerOrderItemListView(QueryPlanMixin, generics.ListAPIView):
+    """
+    Order lines for the logged-in seller's products, newest first, with
+    the shipping details. Same pagination and filters as the order history.
+    """
+    serializer_class = SellerOrderItemSerializer
+    permission_classes = [permissions.IsAuthenticated, IsApprovedSeller]
+    pagination_class = KeysetPagination
+    filter_backends = [OrderFilterBackend]
+    order_filter_prefix = 'order__' # The filters apply to the item's order
+
+    def get_keyset_ordering(self):
+        # Items are inserted with their order, so ids follow the order dates
+        return ('-id',)
+
+    def get_queryset(self):
+        return OrderItem.objects.filter(product__seller=get_seller_profile(self.request))
@@ -0,0 +1,165 @@
+# orders/webhooks.py
+
+"""
+Ingestion of payment gateway webhooks.
+
+The endpoint (WebhookView) only does the cheap part: check the
+signature, store the events and answer 202. Handling them (marking
+orders as paid) happens in the background in process_events().
+
+A request may carry one event, as Razorpay sends them, or a batch: a
+JSON list of events, or {"events": [...]}. Every event needs an id: its
+own "id" key, or for a single event the X-Razorpay-Event-Id header.
+Events we have already stored are dropped, so redeliveries are cheap
+and never processed twice.
+
+An event whose background run never happened (the process restarted,
+the task failed) stays unprocessed. It is picked up again when the
+gateway redelivers it, and by `manage.py process_payment_events`, which
+sweeps up events still unprocessed after a while.
+"""
+
+import hashlib
+import hmac
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from main.metrics import registry
+from .models import Order, PaymentEvent
+
+logger = logging.getLogger(__name__)
+
+registry.describe('emporia_orphaned_payments_total', 'counter',
+                  "Payments received for an order that no longer exists (e.g. released after expiry).")
+
+# Events that mean the money has been received
+PAID_EVENTS = {'payment.captured', 'order.paid'}
+
+MAX_EVENTS_PER_REQUEST = 500
+
+
+class WebhookError(Exception):
+    """The request body isn't a valid event or batch of events."""
+
+
+def verify_signature(body, signature, secret=None):
+    """
+    Razorpay signs the raw request body with the webhook secret
+    (HMAC-SHA256, hex encoded).
+    """
+    secret = settings.RAZORPAY_WEBHOOK_SECRET if secret is None else secret
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode('utf-8'), msg=body, digestmod=hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def entity(event, name):
+    """The 'payment' or 'order' entity inside an event, or {}."""
+    try:
+        return event['payload'][name]['entity'] or {}
+    except (KeyError, TypeError):
+        return {}
+
+
+def parse_events(data, header_event_id=None):
+    """
+    Turns a decoded request body into unsaved PaymentEvent rows.
+    Raises WebhookError if it doesn't look like events.
+    """
+    if isinstance(data, dict) and 'events' in data:
+        data = data['events']
+    single = isinstance(data, dict)
+    events = [data] if single else data
+
+    if not isinstance(events, list) or not events:
+        raise WebhookError("Expected an event or a list of events.")
+    if len(events) > MAX_EVENTS_PER_REQUEST:
+        raise WebhookError(f"At most {MAX_EVENTS_PER_REQUEST} events per request.")
+
+    rows = {}
+    for event in events:
+        if not isinstance(event, dict) or not event.get('event'):
+            raise WebhookError("Every event needs an 'event' type.")
+        event_id = event.get('id') or (header_event_id if single else None)
+        if not event_id:
+            raise WebhookError("Every event needs an 'id'.")
+
+        payment = entity(event, 'payment')
+        order = entity(event, 'order')
+        # A batch may repeat an event; the last copy wins
+        rows[str(event_id)] = PaymentEvent(
+            event_id=str(event_id),
+            event=event['event'],
+            razorpay_order_id=payment.get('order_id') or order.get('id'),
+            razorpay_payment_id=payment.get('id'),
+            payload=event,
+        )
+    return list(rows.values())
+
+
+def record_events(events):
+    """
+    Stores the events we haven't seen yet. Returns two lists of ids: the
+    new events, and the events to process, which adds the duplicates
+    whose earlier delivery was stored but never processed.
+    """
+    ids = [event.event_id for event in events]
+    seen = dict(PaymentEvent.objects.filter(event_id__in=ids).values_list('event_id', 'processed_at'))
+    new = [event for event in events if event.event_id not in seen]
+    # ignore_conflicts covers the same event arriving twice at once
+    PaymentEvent.objects.bulk_create(new, ignore_conflicts=True)
+    new_ids = [event.event_id for event in new]
+    return new_ids, new_ids + [event_id for event_id, processed_at in seen.items() if processed_at is None]
+
+
+def flag_orphaned_payment(razorpay_order_id, razorpay_payment_id, source):
+    """
+    A payment was received for a gateway order we no longer have an order
+    for: the money was taken, so it needs a refund or the order restored
+    by hand. Logged as an error and counted, never dropped silently.
+    Returns the message to store with the event.
+    """
+    message = (
+        f"Payment {razorpay_payment_id} for gateway order {razorpay_order_id} "
+        "has no order (it may have expired); refund it or restore the order."
+    )
+    logger.error("%s (%s)", message, source)
+    registry.inc('emporia_orphaned_payments_total', (('source', source),))
+    return message
+
+
+def process_events(event_ids):
+    """
+    Handles stored events. Each one is claimed with a conditional UPDATE
+    first, so two workers can't both act on it.
+    """
+    events = PaymentEvent.objects.filter(event_id__in=event_ids, processed_at__isnull=True)
+    for event in events:
+        with transaction.atomic():
+            claimed = PaymentEvent.objects.filter(
+                pk=event.pk, processed_at__isnull=True
+            ).update(processed_at=timezone.now())
+            if not claimed:
+                continue
+            if event.event in PAID_EVENTS and event.razorpay_order_id and event.razorpay_payment_id:
+                updated = Order.objects.mark_paid(event.razorpay_order_id, event.razorpay_payment_id)
+                if not updated and not Order.objects.filter(razorpay_order_id=event.razorpay_order_id).exists():
+                    error = flag_orphaned_payment(event.razorpay_order_id, event.razorpay_payment_id, 'webhook')
+                    PaymentEvent.objects.filter(pk=event.pk).update(error=error)
+
+
+def pending_event_ids(older_than=60, limit=1000):
+    """
+    Ids of events received more than 'older_than' seconds ago and still
+    not processed, oldest first (by the orders_event_pending_idx index).
+    """
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return list(
+        PaymentEvent.objects.filter(processed_at__isnull=True, received_at__lt=cutoff)
+        .order_by('received_at').values_list('event_id', flat=True)[:limit]
+    )
@@ -1,5 +1,7 @@
 from django.contrib import admin
+from .inventory import rebalance_stock
 from .models import Category, Product
+from .search import filter_products, tokenize
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -14,3 +16,21 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ('name', 'description')
     #auto populate slug fields
     prepopulated_fields = {'slug': ('name',)}
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            # Only the edited fields: the rest of the form holds values
+            # loaded earlier, e.g. a stock that checkouts have lowered since
+            obj.save(update_fields=[*form.changed_data, 'updated_at'])
+        else:
+            super().save_model(request, obj, form, change)
+        # A sharded product's stock lives in its shards (store/inventory.py)
+        if 'stock' in form.changed_data:
+            rebalance_stock([obj])
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of LIKE scans over every product.
+        # Every match is returned; the changelist paginates them.
+        if not tokenize(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        return filter_products(queryset, search_term), False
@@ -0,0 +1,322 @@
+# store/bulk.py
+
+"""
+Bulk product import and export for sellers, in CSV or JSON lines.
+
+Import (an upsert keyed by slug):
+
+- Rows are read one at a time from the upload and handled in chunks.
+  Each chunk takes a fixed number of queries, however many rows it has:
+  one lookup for its categories, one for the slugs that already exist,
+  one bulk INSERT (plus a lookup of the new ids), one bulk UPDATE and
+  one search-index write.
+- A row with errors is skipped and reported with its row number; the
+  other rows are still imported.
+- A slug that belongs to another seller is an error, never an update.
+- Bulk writes skip the model signals, so the search index and the
+  catalog cache are updated here (see store/models.py).
+
+Every row must have 'slug', 'name' and 'price'. The other columns are
+optional: a new product gets the model default, an existing one keeps
+its current value. A missing column, an empty CSV cell and a key left
+out of a JSON line all count as missing; send null in JSON lines to
+clear a category.
+
+Export streams the seller's products in the same format, so an export
+can be edited and imported again.
+"""
+
+import codecs
+import csv
+import json
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.parsers import BaseParser
+
+from .cache import bump_version_on_commit
+from .inventory import rebalance_stock
+from .models import Category, Product
+from . import search
+
+# Columns, in export order. 'category' holds the category slug.
+COLUMNS = ['slug', 'name', 'description', 'price', 'stock', 'category', 'available']
+
+FORMATS = ('csv', 'jsonl')
+
+DEFAULT_CHUNK_SIZE = 500
+
+# The response lists at most this many row errors (all are counted).
+MAX_REPORTED_ERRORS = 1000
+
+# Written on update when the row has them ('name' and 'price' always do)
+UPDATE_FIELDS = ['name', 'description', 'price', 'stock', 'category', 'available']
+
+
+class BulkFormatError(Exception):
+    """The upload can't be read as the given format."""
+
+
+def detect_format(filename='', content_type=''):
+    """Guesses 'csv' or 'jsonl' from a file name or content type."""
+    name = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    return None
+
+
+# --- 1. Reading ---
+
+def read_rows(stream, file_format):
+    """
+    Yields (row number, dict) from a binary stream, without reading it
+    all into memory. Row numbers count data rows, starting at 1.
+    """
+    text = codecs.iterdecode(stream, 'utf-8-sig')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        if reader.fieldnames is None:
+            return
+        for number, row in enumerate(reader, start=1):
+            # Empty cells count as missing (see the module docstring)
+            yield number, {key: value for key, value in row.items() if key and value not in ('', None)}
+    elif file_format == 'jsonl':
+        number = 0
+        for line in text:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else {'__invalid__': True}
+    else:
+        raise BulkFormatError(f"Unknown format '{file_format}'. Choose from: {', '.join(FORMATS)}.")
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- 2. Importing ---
+
+class ProductImportSerializer(serializers.Serializer):
+    """
+    Validates one row. Runs no queries; lookups happen per chunk.
+    Optional columns the row doesn't have are left out of the result.
+    """
+    slug = serializers.SlugField(max_length=255)
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    stock = serializers.IntegerField(required=False, min_value=0)
+    category = serializers.SlugField(max_length=255, required=False, allow_null=True)
+    available = serializers.BooleanField(required=False)
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+class ProductImporter:
+    """
+    Upserts products for one seller:
+
+        result = ProductImporter(seller_profile).run(read_rows(upload, 'csv'))
+    """
+
+    def __init__(self, seller, chunk_size=DEFAULT_CHUNK_SIZE, using='default'):
+        self.seller = seller
+        self.chunk_size = chunk_size
+        self.using = using
+        self.categories = {} # slug -> Category, shared by all chunks
+        # Kept on the importer so a caller can report progress after an error
+        self.result = ImportResult()
+
+    def run(self, rows):
+        result = self.result
+        for chunk in chunked(rows, self.chunk_size):
+            with transaction.atomic(using=self.using):
+                self.import_chunk(chunk, result)
+        if result.created or result.updated:
+            bump_version_on_commit(Product)
+        return result
+
+    def validate(self, chunk, result):
+        valid = {}
+        for number, row in chunk:
+            if '__invalid__' in row:
+                result.add_error(number, {'non_field_errors': ["Invalid JSON object."]})
+                continue
+            serializer = ProductImportSerializer(data=row)
+            if serializer.is_valid():
+                # A slug repeated in the chunk: the last row wins
+                valid[serializer.validated_data['slug']] = (number, serializer.validated_data)
+            else:
+                result.add_error(number, serializer.errors)
+        return valid
+
+    def load_categories(self, slugs):
+        missing = set(slugs) - set(self.categories)
+        if missing:
+            for category in Category.objects.using(self.using).filter(slug__in=missing):
+                self.categories[category.slug] = category
+
+    def build(self, product, data):
+        """Sets the row's columns on 'product'; the others keep their value."""
+        for field in UPDATE_FIELDS:
+            if field not in data:
+                continue
+            if field == 'category':
+                product.category = self.categories.get(data['category']) if data['category'] else None
+            else:
+                setattr(product, field, data[field])
+        return product
+
+    def import_chunk(self, chunk, result):
+        valid = self.validate(chunk, result)
+        if not valid:
+            return
+
+        self.load_categories(data['category'] for _, data in valid.values() if data.get('category'))
+        existing = {
+            product.slug: product
+            for product in Product.objects.using(self.using).filter(slug__in=list(valid))
+        }
+
+        to_create, to_update = [], []
+        for slug, (number, data) in valid.items():
+            if data.get('category') and data['category'] not in self.categories:
+                result.add_error(number, {'category': [f"Unknown category '{data['category']}'."]})
+                continue
+            product = existing.get(slug)
+            if product is None:
+                to_create.append((number, self.build(Product(slug=slug, seller=self.seller), data)))
+            elif product.seller_id != self.seller.pk:
+                result.add_error(number, {'slug': ["This slug is already used by another seller."]})
+            else:
+                to_update.append((self.build(product, data), data))
+
+        if to_update:
+            # Rows with the same columns are updated together, so a file
+            # without e.g. a 'stock' column leaves the stock alone; one
+            # UPDATE per set of columns, usually one per chunk.
+            now = timezone.now()
+            groups = defaultdict(list)
+            for product, data in to_update:
+                product.updated_at = now # bulk_update skips auto_now
+                groups[tuple(field for field in UPDATE_FIELDS if field in data)].append(product)
+            for fields, products in groups.items():
+                Product.objects.using(self.using).bulk_update(products, [*fields, 'updated_at'])
+            # Spread the new stock of sharded products over their shards
+            rebalance_stock([product for product, data in to_update if 'stock' in data])
+            to_update = [product for product, _ in to_update]
+            result.updated += len(to_update)
+
+        created = []
+        if to_create:
+            # Another upload may have taken a slug since we looked; such
+            # rows are skipped by the INSERT and reported below.
+            Product.objects.using(self.using).bulk_create(
+                [product for _, product in to_create], ignore_conflicts=True
+            )
+            saved = {
+                slug: (seller_id, pk)
+                for slug, seller_id, pk in Product.objects.using(self.using)
+                .filter(slug__in=[product.slug for _, product in to_create])
+                .values_list('slug', 'seller_id', 'id')
+            }
+            for number, product in to_create:
+                seller_id, pk = saved.get(product.slug, (None, None))
+                if seller_id == self.seller.pk:
+                    product.pk = pk
+                    created.append(product)
+                else:
+                    result.add_error(number, {'slug': ["This slug is already used by another seller."]})
+            result.created += len(created)
+
+        search.get_backend(self.using).index_products(to_update + created)
+
+
+# --- 3. Exporting ---
+
+class Echo:
+    """A file-like object that hands back what is written to it."""
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset):
+    """
+    Yields one dict per product, reading the rows in batches with
+    iterator() so memory stays flat for large catalogs.
+    """
+    values = queryset.order_by('id').values(
+        'slug', 'name', 'description', 'price', 'stock', 'category__slug', 'available'
+    )
+    for row in values.iterator(chunk_size=2000):
+        row['category'] = row.pop('category__slug')
+        yield row
+
+
+def export_lines(queryset, file_format):
+    """Yields the export as text, one line at a time."""
+    rows = export_rows(queryset)
+    if file_format == 'csv':
+        writer = csv.DictWriter(Echo(), fieldnames=COLUMNS)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+    elif file_format == 'jsonl':
+        for row in rows:
+            row['price'] = str(row['price'])
+            yield json.dumps({column: row[column] for column in COLUMNS}) + '\n'
+    else:
+        raise BulkFormatError(f"Unknown format '{file_format}'. Choose from: {', '.join(FORMATS)}.")
+
+
+# --- 4. Upload Parsers ---
+# Let the import view read a raw CSV / JSON-lines request body as a
+# stream, instead of DRF loading it into memory first.
+
+class CSVUploadParser(BaseParser):
+    media_type = 'text/csv'
+    file_format = 'csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return {'file': stream if stream is not None else [], 'file_format': self.file_format}
+
+
+class JSONLinesUploadParser(CSVUploadParser):
+    media_type = 'application/x-ndjson'
+    file_format = 'jsonl'
@@ -0,0 +1,129 @@
+# store/cache.py
+
+"""
+Versioned read-through cache for the public catalog.
+
+Every model the catalog depends on has a version counter in the cache.
+Cache keys embed the versions of the models a response was built from,
+so bumping a counter (from the post_save / post_delete signals in
+store/models.py) makes every stale entry unreachable at once, without
+having to know which keys exist. Old entries simply expire.
+
+Single rows can have a counter of their own too. Stock changes from
+checkouts (store/inventory.py) only bump the counters of the products
+they touched, so an order doesn't throw away the whole product cache.
+
+The backend is whatever Django's 'default' cache is configured to
+(local memory by default, Redis in production). Only get / set /
+get_many / add / incr are used, which every backend supports.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from main.replicas import reading_from_replica
+
+# How long an entry may live before it is rebuilt even without a bump.
+CATALOG_CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 15)
+
+KEY_PREFIX = 'catalog'
+
+
+def get_cache():
+    return caches['default']
+
+
+def _version_key(model, pk=None):
+    key = f'{KEY_PREFIX}:version:{model._meta.label_lower}'
+    return key if pk is None else f'{key}:{pk}'
+
+
+def get_versions(models, objects=()):
+    """
+    Returns the current version of each model, then of each (model, pk)
+    in 'objects', in one cache round trip. Counters start at 1 and are
+    created on first use.
+    """
+    cache = get_cache()
+    keys = [_version_key(model) for model in models] + [_version_key(model, pk) for model, pk in objects]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            # 'add' won't overwrite a counter another process just created.
+            cache.add(key, 1, timeout=None)
+            found[key] = cache.get(key, 1)
+        versions.append(found[key])
+    return versions
+
+
+def bump_version(model, pks=None):
+    """
+    Invalidates every cached entry built from 'model', or with 'pks'
+    only the entries built from those rows.
+    """
+    cache = get_cache()
+    keys = [_version_key(model)] if pks is None else [_version_key(model, pk) for pk in pks]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The counter was evicted (or never created); any fresh value
+            # works as long as it differs from what old keys embed.
+            cache.set(key, _fresh_version(), timeout=None)
+
+
+def bump_version_on_commit(model, pks=None):
+    """
+    Bumps the version once the current transaction commits, so a
+    concurrent reader can't re-cache the old rows under the new version.
+    """
+    transaction.on_commit(lambda: bump_version(model, pks))
+
+
+def _fresh_version():
+    return int(time.time() * 1000)
+
+
+def make_key(name, identifier, models, objects=()):
+    versions = '.'.join(str(version) for version in get_versions(models, objects))
+    return f'{KEY_PREFIX}:{name}:{identifier}:v{versions}'
+
+
+def read_through(name, identifier, models, build, objects=()):
+    """
+    Returns the cached value for (name, identifier), calling 'build()'
+    to compute and store it on a miss. 'models' are the models the value
+    is built from, and 'objects' ((model, pk) pairs) the single rows
+    whose own versions it also depends on. Returns (value, key); the key
+    changes whenever the value may have changed, which makes it a good
+    ETag.
+    """
+    cache = get_cache()
+    key = make_key(name, identifier, models, objects)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout=entry_timeout())
+    return value, key
+
+
+def entry_timeout(short=False):
+    """
+    How long to keep an entry just built. 'short' entries may predate
+    the last bump (their versions were read after their rows).
+    """
+    if short or reading_from_replica():
+        # The replica may not have the change behind the last bump
+        # yet; don't keep what we read from it for long.
+        return min(CATALOG_CACHE_TIMEOUT, settings.REPLICA_CACHE_TIMEOUT)
+    return CATALOG_CACHE_TIMEOUT
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
@@ -0,0 +1,100 @@
+# store/fieldsets.py
+
+"""
+Sparse fieldsets: clients pick the fields they want in a response.
+
+    GET /api/products/?fields=id,slug,name,price,image_variants
+    GET /api/products/?expand=seller,category
+    GET /api/orders/?fields=id,total_cost,items.quantity,items.product.name
+
+- ?fields= keeps only the listed fields. A dotted name reaches into a
+  nested serializer ('items.product.name'); naming just the nested
+  field ('items') keeps all of its fields. Unknown names are ignored.
+- ?expand= swaps a field for its richer form, e.g. 'seller' (an id)
+  for {"id": ..., "store_name": ...}. Serializers list what can be
+  expanded in Meta.expandable_fields. Expanded fields are always kept.
+
+The query follows the fields: QueryPlanMixin (store/queries.py) builds
+its select_related() / .only() from the narrowed serializer, so columns
+nobody asked for aren't read. Only GET / HEAD / OPTIONS requests are
+narrowed; writes always see the full serializer.
+"""
+
+import hashlib
+from collections import namedtuple
+
+from rest_framework.permissions import SAFE_METHODS
+
+# Both are frozensets of dotted paths, so a Fieldset can key a cache
+Fieldset = namedtuple('Fieldset', ['fields', 'expand'])
+
+# Stop pathological query strings from producing huge plans / cache keys
+MAX_PATHS = 50
+
+
+def parse_paths(value):
+    paths = {path.strip() for path in (value or '').split(',') if path.strip()}
+    return frozenset(sorted(paths)[:MAX_PATHS])
+
+
+def fieldset_from_request(request):
+    """The Fieldset asked for by a safe request, or None."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    fieldset = Fieldset(parse_paths(params.get('fields')), parse_paths(params.get('expand')))
+    return fieldset if fieldset.fields or fieldset.expand else None
+
+
+def fieldset_key(fieldset):
+    """A short, stable string for cache keys ('' for the full representation)."""
+    if not fieldset:
+        return ''
+    canonical = f"{','.join(sorted(fieldset.fields))};{','.join(sorted(fieldset.expand))}"
+    return hashlib.md5(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def split_paths(paths):
+    """{'id', 'items.price', 'items'} -> {'id': set(), 'items': {'price'}}"""
+    tree = {}
+    for path in paths:
+        head, _, rest = path.partition('.')
+        tree.setdefault(head, set())
+        if rest:
+            tree[head].add(rest)
+    return tree
+
+
+def apply_fieldset(serializer, fields, expand):
+    """Narrows (and expands) 'serializer.fields' in place, recursively."""
+    expanded = split_paths(expand)
+    expandable = getattr(getattr(serializer, 'Meta', None), 'expandable_fields', {})
+    for name in expanded:
+        if name in expandable:
+            serializer.fields[name] = expandable[name]()
+
+    wanted = split_paths(fields)
+    if wanted:
+        for name in list(serializer.fields):
+            if name not in wanted and name not in expanded:
+                serializer.fields.pop(name)
+
+    for name, field in serializer.fields.items():
+        nested = getattr(field, 'child', field) # many=True wraps the serializer
+        if hasattr(nested, 'fields') and (wanted.get(name) or expanded.get(name)):
+            apply_fieldset(nested, wanted.get(name, set()), expanded.get(name, set()))
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin: applies ?fields= / ?expand= from the request in
+    the context, or an explicit 'fieldset'. Nested serializers are
+    narrowed by their parent, never from the request themselves.
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fieldset is None:
+            fieldset = fieldset_from_request(self.context.get('request'))
+        if fieldset:
+            apply_fieldset(self, fieldset.fields, fieldset.expand)
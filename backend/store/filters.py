@@ -0,0 +1,84 @@
+# store/filters.py
+
+from decimal import Decimal, InvalidOperation
+
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+# --- Sort Orders ---
+# Each sort maps to a keyset ordering (see store/pagination.py). The
+# last column is always the primary key so the order is total, and each
+# one is backed by an index on Product that leads with 'available' (see
+# Product.Meta.indexes).
+
+PRODUCT_SORT_ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'name': ('name', 'id'),
+}
+DEFAULT_PRODUCT_SORT = 'newest'
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def get_product_sort_ordering(request):
+    sort = request.query_params.get('sort') or DEFAULT_PRODUCT_SORT
+    try:
+        return PRODUCT_SORT_ORDERINGS[sort]
+    except KeyError:
+        raise ValidationError({
+            'sort': f"Unknown sort '{sort}'. Choose from: {', '.join(PRODUCT_SORT_ORDERINGS)}."
+        })
+
+
+class ProductFilterBackend(filters.BaseFilterBackend):
+    """
+    Filters the product catalog in the database:
+
+    - ?category=<slug>
+    - ?seller=<seller id>
+    - ?min_price=<amount>&max_price=<amount>
+    - ?in_stock=true
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        category = params.get('category')
+        if category:
+            queryset = queryset.filter(category__slug=category)
+
+        seller = params.get('seller')
+        if seller:
+            queryset = queryset.filter(seller_id=self.parse_int('seller', seller))
+
+        min_price = params.get('min_price')
+        if min_price:
+            queryset = queryset.filter(price__gte=self.parse_price('min_price', min_price))
+
+        max_price = params.get('max_price')
+        if max_price:
+            queryset = queryset.filter(price__lte=self.parse_price('max_price', max_price))
+
+        if params.get('in_stock', '').lower() in TRUE_VALUES:
+            queryset = queryset.filter(stock__gt=0)
+
+        return queryset
+
+    @staticmethod
+    def parse_int(name, value):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: 'A valid integer is required.'})
+
+    @staticmethod
+    def parse_price(name, value):
+        try:
+            price = Decimal(value)
+        except InvalidOperation:
+            raise ValidationError({name: 'A valid number is required.'})
+        if not price.is_finite() or price < 0:
+            raise ValidationError({name: 'A valid number is required.'})
+        return price
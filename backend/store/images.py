@@ -0,0 +1,112 @@
+# store/images.py
+
+"""
+Resized variants of product images.
+
+Sellers upload originals of any size. After an upload, a background task
+(see main/tasks.py) renders each variant below as WebP and as JPEG, and
+records the file names and sizes in Product.image_variants:
+
+    {
+        "source": "products/2025/01/31/mug.png",   # the image they were built from
+        "thumb": {"width": 200, "height": 200,
+                  "webp": "products/variants/3f2a...webp",
+                  "jpeg": "products/variants/91bc...jpg"},
+        "card": {...},
+        "detail": {...},
+    }
+
+Variant files are named after a hash of their content, so a name always
+means the same bytes: they can be cached forever, and a new upload
+produces new names instead of overwriting files browsers already have.
+"""
+
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .cache import bump_version_on_commit
+
+# name -> (width, height, crop). Cropped variants are exactly that size
+# (uniform grid tiles); the others fit inside the box, keeping the
+# aspect ratio, and are never enlarged.
+VARIANTS = {
+    'thumb': (200, 200, True),
+    'card': (400, 400, True),
+    'detail': (1200, 1200, False),
+}
+
+# format key -> (Pillow format, file extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+VARIANT_DIR = 'products/variants'
+
+
+def variants_are_current(product):
+    """True if image_variants were built from the product's current image."""
+    name = product.image.name if product.image else ''
+    return (product.image_variants or {}).get('source', '') == name
+
+
+def render(image, width, height, crop):
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.LANCZOS)
+    return resized
+
+
+def save_content_addressed(data, extension, storage=default_storage):
+    """Stores 'data' under a name derived from its hash; returns the name."""
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    name = f'{VARIANT_DIR}/{digest}.{extension}'
+    if not storage.exists(name): # Same name, same bytes: nothing to do
+        storage.save(name, ContentFile(data))
+    return name
+
+
+def build_variants(source_file, storage=default_storage):
+    """
+    Renders every variant of an image file. Returns the dict stored in
+    Product.image_variants (without 'source').
+    """
+    with Image.open(source_file) as original:
+        original = ImageOps.exif_transpose(original) # Respect camera rotation
+        original = original.convert('RGB') # JPEG has no alpha; WebP doesn't need it here
+
+        variants = {}
+        for variant, (width, height, crop) in VARIANTS.items():
+            image = render(original, width, height, crop)
+            entry = {'width': image.width, 'height': image.height}
+            for key, (pil_format, extension, options) in FORMATS.items():
+                buffer = BytesIO()
+                image.save(buffer, pil_format, **options)
+                entry[key] = save_content_addressed(buffer.getvalue(), extension, storage)
+            variants[variant] = entry
+    return variants
+
+
+def generate_product_variants(product_id, image_name):
+    """
+    Background task: builds the variants for one product image. Does
+    nothing if the product has been given another image since.
+    """
+    from .models import Product # Avoid a circular import with store/models.py
+
+    if not image_name:
+        return
+    with default_storage.open(image_name, 'rb') as source:
+        variants = build_variants(source)
+    variants['source'] = image_name
+
+    # update() skips the post_save signals, so this doesn't re-trigger
+    # the task; the product's cache entries are bumped by hand.
+    updated = Product.objects.filter(pk=product_id, image=image_name).update(image_variants=variants)
+    if updated:
+        bump_version_on_commit(Product, [product_id])
@@ -0,0 +1,258 @@
+# store/inventory.py
+
+"""
+Stock bookkeeping for products.
+
+All changes go through conditional UPDATE statements evaluated by the
+database (`stock = stock - q WHERE stock >= q`), never through
+read-modify-write in Python, so two concurrent checkouts can't both
+take the last unit.
+
+Sharded stock
+-------------
+Every checkout of a product updates its one row, so buyers of a hot
+product (a flash sale) wait for each other's transactions one at a
+time. shard_stock() can split such a product's stock over N StockShard
+rows instead:
+
+- A checkout takes its quantity from one randomly chosen shard, then
+  tries one more, and only if neither has enough locks all the shards
+  and takes from several. With N shards, up to N buyers go at once.
+- Product.stock becomes a copy of the shards' total, which everything
+  that shows or filters on stock keeps reading. It is refreshed in the
+  background after checkouts (sync_stock), coalescing bursts into one
+  UPDATE, so it can trail the shards by a moment; checkout itself only
+  ever trusts the shards.
+- A seller setting the stock rebalances the shards (rebalance_stock).
+
+This pays off on databases with row locks (PostgreSQL). SQLite locks
+the whole database for every write, so there it only adds queries.
+"""
+
+import random
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Now
+
+from main.tasks import run_in_background
+from .cache import bump_version, bump_version_on_commit, get_cache
+from .models import Product, StockShard
+
+# Single shards tried before locking them all
+SHARD_ATTEMPTS = 2
+
+
+def merge_quantities(lines):
+    """
+    Turns [(product_id, quantity), ...] into {product_id: total_quantity},
+    so a product that appears on several cart lines is updated once.
+    """
+    totals = Counter()
+    for product_id, quantity in lines:
+        totals[product_id] += quantity
+    return dict(totals)
+
+
+def reserve_stock(quantities, shards=None):
+    """
+    Takes 'quantities' ({product_id: quantity}) out of stock.
+
+    'shards' ({product_id: Product.stock_shards}) saves looking up which
+    products are sharded when the caller already has them loaded.
+
+    Returns the set of product ids that did not have enough stock.
+    Products that succeeded are already decremented, so callers must run
+    this inside `transaction.atomic()` and roll back on any failure.
+    """
+    if shards is None:
+        shards = dict(
+            Product.objects.filter(pk__in=quantities, stock_shards__gt=0).values_list('pk', 'stock_shards')
+        )
+    failed = set()
+    sharded = []
+    # Always lock rows in the same (id) order so two carts sharing
+    # products can't deadlock each other.
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        if shards.get(product_id):
+            taken = take_from_shards(product_id, quantity, shards[product_id])
+            sharded.append(product_id)
+        else:
+            taken = Product.objects.filter(pk=product_id, stock__gte=quantity, stock_shards=0).update(
+                stock=F('stock') - quantity, updated_at=Now()
+            )
+            if not taken and Product.objects.filter(pk=product_id, stock_shards__gt=0).exists():
+                # Sharded since the caller looked; the shards hold the stock now
+                taken = take_from_shards(product_id, quantity, None)
+                sharded.append(product_id)
+        if not taken:
+            failed.add(product_id)
+    if sharded:
+        transaction.on_commit(lambda: schedule_stock_sync(sharded))
+    # update() skips the post_save signal, so refresh the cached stock
+    # ourselves; only these products' cache entries show it
+    bump_version_on_commit(Product, [pk for pk in quantities if pk not in failed])
+    return failed
+
+
+def release_stock(quantities):
+    """
+    Puts 'quantities' ({product_id: quantity}) back into stock, e.g. from
+    orders that were never paid. Products are locked in id order, like
+    in reserve_stock(), then updated with one `stock = stock + q` UPDATE
+    per distinct quantity (a handful, however many products there are).
+    Sharded products get their units back in a random shard. Deleted
+    products are skipped.
+    """
+    if not quantities:
+        return
+    shards = dict(
+        Product.objects.select_for_update().filter(pk__in=quantities).order_by('pk')
+        .values_list('pk', 'stock_shards')
+    )
+    plain = defaultdict(list) # quantity -> product ids
+    sharded = defaultdict(list) # (shard index, quantity) -> product ids
+    for pk, count in shards.items():
+        if count:
+            sharded[random.randrange(count), quantities[pk]].append(pk)
+        else:
+            plain[quantities[pk]].append(pk)
+
+    for quantity, ids in plain.items():
+        Product.objects.filter(pk__in=ids).update(stock=F('stock') + quantity, updated_at=Now())
+    for (index, quantity), ids in sharded.items():
+        StockShard.objects.filter(product_id__in=ids, index=index).update(
+            quantity=F('quantity') + quantity
+        )
+    if sharded:
+        released = [pk for ids in sharded.values() for pk in ids]
+        transaction.on_commit(lambda: schedule_stock_sync(released))
+    bump_version_on_commit(Product, list(shards))
+
+
+# --- Sharded Stock ---
+
+def take_from_shards(product_id, quantity, shard_count):
+    """
+    Takes 'quantity' from the shards of one product; returns whether it could.
+    'shard_count' may be None (or stale): it only picks the shards tried first.
+    """
+    if shard_count:
+        start = random.randrange(shard_count)
+        for attempt in range(min(SHARD_ATTEMPTS, shard_count)):
+            index = (start + attempt) % shard_count
+            if StockShard.objects.filter(
+                product_id=product_id, index=index, quantity__gte=quantity
+            ).update(quantity=F('quantity') - quantity):
+                return True
+
+    # No single shard had enough: lock them all (in index order, to avoid
+    # deadlocks) and take from as many as it needs.
+    rows = list(
+        StockShard.objects.select_for_update().filter(product_id=product_id).order_by('index')
+    )
+    if sum(row.quantity for row in rows) < quantity:
+        return False
+    remaining = quantity
+    for row in rows:
+        take = min(row.quantity, remaining)
+        if take:
+            StockShard.objects.filter(pk=row.pk).update(quantity=F('quantity') - take)
+            remaining -= take
+        if not remaining:
+            break
+    return True
+
+
+def split_stock(total, shard_count):
+    """Spreads 'total' over 'shard_count' shards as evenly as possible."""
+    share, extra = divmod(total, shard_count)
+    return [share + (1 if index < extra else 0) for index in range(shard_count)]
+
+
+def shard_stock(product, shard_count, total=None):
+    """
+    Splits the stock of 'product' over 'shard_count' shards, or merges it
+    back into Product.stock when 'shard_count' is 0 ('None' keeps the
+    current count). 'total' sets the stock at the same time; by default
+    the current stock is kept.
+    """
+    with transaction.atomic():
+        # Checkouts of an unsharded product lock this row too, so none
+        # can be half way through while we move its stock around.
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        if shard_count is None:
+            shard_count = product.stock_shards
+        shards = list(StockShard.objects.select_for_update().filter(product=product).order_by('index'))
+        if total is None:
+            total = sum(shard.quantity for shard in shards) if product.stock_shards else product.stock
+
+        StockShard.objects.filter(product=product, index__gte=shard_count).delete()
+        if shard_count:
+            StockShard.objects.bulk_create(
+                [
+                    StockShard(product=product, index=index, quantity=quantity)
+                    for index, quantity in enumerate(split_stock(total, shard_count))
+                ],
+                update_conflicts=True, unique_fields=['product', 'index'], update_fields=['quantity'],
+            )
+        Product.objects.filter(pk=product.pk).update(
+            stock=total, stock_shards=shard_count, updated_at=Now()
+        )
+        bump_version_on_commit(Product, [product.pk])
+    return total
+
+
+def rebalance_stock(products):
+    """
+    Sets the stock of sharded products to their Product.stock, spread
+    evenly over their shards. Called after a seller sets the stock;
+    unsharded products are skipped. Whether a product is sharded is read
+    from the database, not from the (possibly stale) instances.
+    """
+    stock = {product.pk: product.stock for product in products}
+    sharded = Product.objects.filter(pk__in=stock, stock_shards__gt=0).values_list('pk', flat=True)
+    for pk in sharded:
+        # shard_stock() reads the shard count again under the row lock
+        shard_stock(Product(pk=pk), None, total=stock[pk])
+
+
+def available_stock(product_ids):
+    """{product_id: stock} straight from the shards for sharded products."""
+    stock = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'stock'))
+    stock.update(
+        StockShard.objects.filter(product_id__in=product_ids)
+        .values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+    )
+    return stock
+
+
+def _sync_key(product_id):
+    return f'inventory:sync:{product_id}'
+
+
+def schedule_stock_sync(product_ids):
+    """
+    Queues sync_stock() for products whose shards just changed, unless a
+    sync is already queued for them: that one will see these changes too.
+    """
+    cache = get_cache()
+    pending = [pk for pk in product_ids if cache.add(_sync_key(pk), True, timeout=60)]
+    if pending:
+        run_in_background(sync_stock, pending)
+
+
+def sync_stock(product_ids):
+    """Copies the shards' total into Product.stock."""
+    # Cleared before reading, so a checkout that commits after this
+    # point queues a sync of its own.
+    get_cache().delete_many([_sync_key(pk) for pk in product_ids])
+    total = StockShard.objects.filter(product=OuterRef('pk')).values('product').annotate(
+        total=Sum('quantity')
+    ).values('total')
+    Product.objects.filter(pk__in=product_ids, stock_shards__gt=0).update(
+        stock=Coalesce(Subquery(total), 0)
+    )
+    bump_version(Product, product_ids)
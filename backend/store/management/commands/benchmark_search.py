@@ -0,0 +1,89 @@
+# store/management/commands/benchmark_search.py
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.models import Product
+from store.search import LikeSearchBackend, get_backend
+from users.models import CustomUser
+
+WORDS = (
+    'wireless bluetooth speaker headphones leather wallet cotton shirt ceramic mug '
+    'steel bottle organic coffee running shoes yoga mat desk lamp gaming mouse '
+    'mechanical keyboard backpack sunglasses watch charger cable notebook pen '
+    'kitchen knife blender candle pillow blanket jacket hoodie sneakers'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the full-text search index against the icontains baseline. "
+        "With --seed, synthetic products are created inside a transaction "
+        "that is rolled back at the end, so the database is left untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Number of synthetic products to create for the run.")
+        parser.add_argument('--repeat', type=int, default=20,
+                            help="Times each query is run per backend.")
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--query', action='append', dest='queries',
+                            help="Query to run (repeatable). Defaults to a built-in set.")
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or ['bluetooth speaker', 'leather', 'mech', 'organic coffee beans']
+
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+
+            queryset = Product.objects.filter(available=True)
+            backends = [('index', get_backend(queryset.db)), ('icontains', LikeSearchBackend(queryset.db))]
+            total = queryset.count()
+            self.stdout.write(f"{total} products, {options['repeat']} runs per query\n")
+
+            for query in queries:
+                for label, backend in backends:
+                    timings = []
+                    hits = 0
+                    for _ in range(options['repeat']):
+                        start = time.perf_counter()
+                        hits = len(backend.search(queryset, query, options['limit']))
+                        timings.append((time.perf_counter() - start) * 1000)
+                    timings.sort()
+                    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                    self.stdout.write(
+                        f"{query!r:28} {label:10} hits={hits:<4} "
+                        f"mean={statistics.mean(timings):8.2f}ms p95={p95:8.2f}ms"
+                    )
+
+            # Leave the database exactly as we found it
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        user = CustomUser.objects.create_user(
+            email='search-benchmark@example.invalid', username='search-benchmark',
+            password=None, role=CustomUser.Role.SELLER,
+        )
+        rng = random.Random(42)
+        batch = []
+        for i in range(count):
+            batch.append(Product(
+                seller=user.sellerprofile,
+                name=' '.join(rng.sample(WORDS, 3)).title(),
+                description=' '.join(rng.choices(WORDS, k=30)),
+                price=rng.randint(1, 500),
+                stock=rng.randint(0, 50),
+                slug=f'search-benchmark-{i}',
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        # bulk_create skips the signals that maintain the index
+        get_backend(Product.objects.db).rebuild()
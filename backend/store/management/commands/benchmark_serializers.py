@@ -0,0 +1,73 @@
+# store/management/commands/benchmark_serializers.py
+
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+
+from store.fieldsets import Fieldset
+from store.models import Category, Product
+from store.serializers import ProductListSerializer, ProductSerializer
+from users.models import SellerProfile
+
+# What a product grid card shows
+CARD_FIELDS = Fieldset(frozenset({'id', 'slug', 'name', 'price', 'image_variants'}), frozenset())
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the cost of serializing product rows (in memory, no "
+        "database): ProductSerializer vs. ProductListSerializer, with every "
+        "field and with a grid-card fieldset. Reports ms per 1,000 rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    # Image URLs are made absolute from the request's host
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        products = self.make_products(options['rows'])
+        request = Request(RequestFactory().get('/api/products/'))
+        context = {'request': request}
+
+        cases = [
+            ("ProductSerializer, all fields", ProductSerializer, None),
+            ("ProductListSerializer, all fields", ProductListSerializer, None),
+            ("ProductSerializer, card fields", ProductSerializer, CARD_FIELDS),
+            ("ProductListSerializer, card fields", ProductListSerializer, CARD_FIELDS),
+        ]
+        self.stdout.write(f"{options['rows']} rows, best of {options['repeat']} runs")
+        for label, serializer_class, fieldset in cases:
+            best = float('inf')
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                serializer_class(products, many=True, context=context, fieldset=fieldset).data
+                best = min(best, time.perf_counter() - start)
+            per_thousand = best * 1000 * 1000 / len(products)
+            self.stdout.write(f"{label:<38} {per_thousand:>8.2f} ms / 1,000 rows")
+
+    def make_products(self, count):
+        seller = SellerProfile(id=1, user_id=1, store_name='Bench store')
+        category = Category(id=1, name='Audio', slug='audio')
+        variants = {
+            'source': 'products/bench.jpg',
+            **{
+                name: {'width': size, 'height': size, 'webp': f'products/variants/{name}.webp',
+                       'jpeg': f'products/variants/{name}.jpg'}
+                for name, size in (('thumb', 200), ('card', 400), ('detail', 1200))
+            },
+        }
+        now = timezone.now()
+        return [
+            Product(
+                id=i, seller=seller, category=category, name=f'Product {i}', slug=f'product-{i}',
+                description='A fine product ' * 20, price=Decimal('19.99'), stock=5,
+                image='products/bench.jpg', image_variants=variants, created_at=now, updated_at=now,
+            )
+            for i in range(1, count + 1)
+        ]
@@ -0,0 +1,31 @@
+# store/management/commands/build_image_variants.py
+
+from django.core.management.base import BaseCommand
+
+from store.images import generate_product_variants, variants_are_current
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the resized image variants (see store/images.py) for products "
+        "whose variants are missing or out of date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rebuild every product's variants.")
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        built = failed = 0
+        for product in products.only('id', 'image', 'image_variants').iterator(chunk_size=500):
+            if not options['all'] and variants_are_current(product):
+                continue
+            try:
+                generate_product_variants(product.pk, product.image.name)
+            except (OSError, ValueError) as e: # Missing or unreadable file
+                failed += 1
+                self.stderr.write(f"Product {product.pk} ({product.image.name}): {e}")
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f"Built variants for {built} products, {failed} failed."))
@@ -0,0 +1,30 @@
+# store/management/commands/export_products.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.bulk import FORMATS, export_lines
+from store.models import Product
+from users.models import SellerProfile
+
+
+class Command(BaseCommand):
+    help = "Writes a seller's products as CSV or JSON lines, in the import format."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', required=True, help="Email of the seller.")
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help="File to write (default: stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            seller = SellerProfile.objects.get(user__email=options['seller'])
+        except SellerProfile.DoesNotExist:
+            raise CommandError(f"No seller with email {options['seller']}.")
+
+        lines = export_lines(Product.objects.filter(seller=seller), options['format'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+                out.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,44 @@
+# store/management/commands/import_products.py
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.bulk import DEFAULT_CHUNK_SIZE, FORMATS, ProductImporter, detect_format, read_rows
+from users.models import SellerProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates or updates a seller's products from a CSV or JSON-lines file "
+        "(matched by slug). See store/bulk.py for the columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin.")
+        parser.add_argument('--seller', required=True, help="Email of the seller who owns the products.")
+        parser.add_argument('--format', choices=FORMATS, help="File format (default: from the extension).")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            seller = SellerProfile.objects.get(user__email=options['seller'])
+        except SellerProfile.DoesNotExist:
+            raise CommandError(f"No seller with email {options['seller']}.")
+
+        file_format = options['format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError("Can't tell the file format; pass --format.")
+
+        importer = ProductImporter(seller, chunk_size=options['chunk_size'])
+        if options['path'] == '-':
+            result = importer.run(read_rows(sys.stdin.buffer, file_format))
+        else:
+            with open(options['path'], 'rb') as stream:
+                result = importer.run(read_rows(stream, file_format))
+
+        for error in result.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created}, updated {result.updated}, failed {result.failed}."
+        ))
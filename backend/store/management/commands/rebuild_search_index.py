@@ -0,0 +1,18 @@
+# store/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text product search index from the products table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias to rebuild.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic(using=options['database']):
+            get_backend(options['database']).rebuild()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,33 @@
+# store/management/commands/shard_stock.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.inventory import shard_stock
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Splits the stock of the given products over N counter shards, so "
+        "concurrent checkouts of them don't queue on one row (e.g. before a "
+        "flash sale). --shards 0 merges the stock back into the product. "
+        "See store/inventory.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='+', metavar='slug')
+        parser.add_argument('--shards', type=int, required=True)
+
+    def handle(self, *args, **options):
+        shards = options['shards']
+        if not 0 <= shards <= 1000:
+            raise CommandError("--shards must be between 0 and 1000.")
+        products = {product.slug: product for product in Product.objects.filter(slug__in=options['slugs'])}
+        missing = [slug for slug in options['slugs'] if slug not in products]
+        if missing:
+            raise CommandError(f"Unknown products: {', '.join(missing)}")
+
+        for slug, product in products.items():
+            total = shard_stock(product, shards)
+            where = f"{shards} shards" if shards else "the product row"
+            self.stdout.write(f"{slug}: {total} in stock, in {where}")
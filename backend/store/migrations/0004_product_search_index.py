@@ -0,0 +1,46 @@
+# Creates the full-text search index used by store/search.py.
+
+from django.db import migrations
+
+
+PG_VECTOR = (
+    "(setweight(to_tsvector('english', coalesce(\"store_product\".\"name\", '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(\"store_product\".\"description\", '')), 'B'))"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts USING fts5("
+            "name, description, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            "INSERT INTO store_product_fts (rowid, name, description) "
+            "SELECT id, name, description FROM store_product"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS store_product_search_idx "
+            f"ON store_product USING GIN ({PG_VECTOR})"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS store_product_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS store_product_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_product_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
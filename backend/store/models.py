@@ -2,7 +2,12 @@
 
 from django.db import models
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from users.models import SellerProfile # <-- We need to link to our SellerProfile
+from main.tasks import run_in_background
+from .cache import bump_version_on_commit
+from . import images, search
 
 # 1. --- Category Model ---
 
@@ -42,10 +47,18 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # Number of StockShard rows holding this product's stock, or 0 when
+    # 'stock' itself is the stock. For sharded products 'stock' is a copy
+    # of the shards' total, kept up to date in the background. Change it
+    # with store.inventory.shard_stock() only.
+    stock_shards = models.PositiveSmallIntegerField(default=0, editable=False)
     
     # --- Media Uploads ---
     # The 'upload_to' path will be relative to your MEDIA_ROOT
     image = models.ImageField(upload_to='products/%Y/%m/%d/', blank=True, null=True)
+    # Resized copies of 'image' (thumb / card / detail, WebP and JPEG),
+    # built in the background after each upload. See store/images.py.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     # --- Slug Field ---
     slug = models.SlugField(max_length=255, unique=True)
@@ -55,7 +68,94 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-         ordering = ('-created_at',) # Show newest products first
+         # Show newest products first. 'id' breaks ties between products
+         # created in the same instant so the order is always stable.
+         ordering = ('-created_at', '-id')
+         indexes = [
+             # Backs the keyset pagination of the public catalog:
+             # WHERE available AND (created_at, id) < (X, Y) ORDER BY created_at DESC, id DESC
+             models.Index(
+                 fields=['available', '-created_at', '-id'],
+                 name='store_prod_avail_created_idx',
+             ),
+             # Catalog filtered by category, newest first
+             models.Index(
+                 fields=['available', 'category', '-created_at', '-id'],
+                 name='store_prod_avail_cat_idx',
+             ),
+             # Price ranges and sorting by price
+             models.Index(
+                 fields=['available', 'price', 'id'],
+                 name='store_prod_avail_price_idx',
+             ),
+             # Sorting by name (?sort=name)
+             models.Index(
+                 fields=['available', 'name', 'id'],
+                 name='store_prod_avail_name_idx',
+             ),
+         ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+# 2b. --- StockShard Model ---
+
+class StockShard(models.Model):
+    """
+    One slice of the stock of a product that sells fast enough for its
+    row lock to become the bottleneck. Each checkout takes from a single
+    shard, so buyers of the same product mostly don't wait on each
+    other. See store/inventory.py.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'index'], name='store_stockshard_product_index'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}#{self.index}: {self.quantity}'
+
+# 3. --- Signals ---
+# The public catalog responses are cached (see store/cache.py).
+# Whenever a model they are built from changes, we bump that model's
+# version so the cached copies are no longer used.
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SellerProfile)
+@receiver(post_delete, sender=SellerProfile)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_version_on_commit(sender)
+
+# Keep the full-text search index (see store/search.py) in sync.
+# Bulk writes that skip signals must call the search backend themselves.
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, using='default', **kwargs):
+    if update_fields is not None and not {'name', 'description'} & set(update_fields):
+        return # Nothing searchable changed (e.g. a stock update)
+    search.get_backend(using).index_products([instance])
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, using='default', **kwargs):
+    search.get_backend(using).remove_products([instance.pk])
+
+# Build the image variants whenever a product gets a new image.
+
+@receiver(post_save, sender=Product)
+def schedule_image_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if images.variants_are_current(instance):
+        return
+    if instance.image:
+        run_in_background(images.generate_product_variants, instance.pk, instance.image.name)
+    else:
+        # The image was removed; so are its variants
+        Product.objects.filter(pk=instance.pk).update(image_variants={})
@@ -0,0 +1,214 @@
+# store/pagination.py
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a fixed ordering.
+
+    Instead of OFFSET, every page is fetched with a WHERE clause that
+    starts right after the last row of the previous page, e.g.
+    `created_at < X OR (created_at = X AND id < Y)`. Combined with a
+    composite index on the ordering columns, page N costs the same as
+    page 1.
+
+    The cursor is an opaque, URL-safe token holding the ordering values
+    of the boundary row, so links stay stable while products are added.
+    The last ordering field must be unique (we append the primary key
+    as a tiebreaker if it is missing).
+    """
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    # Default ordering; views can override it with a 'get_keyset_ordering' method.
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.model = queryset.model
+
+        position, reverse = self.decode_cursor(request)
+
+        # --- Build the page query ---
+        # For the "previous" direction we walk the index backwards and
+        # flip the rows again before returning them.
+        ordering = self._flip(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        queryset = self._load_ordering_columns(queryset)
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(ordering, position))
+
+        # Fetch one extra row to find out if there is another page.
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # --- Settings helpers ---
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, view):
+        ordering = tuple(self.ordering)
+        if view is not None and hasattr(view, 'get_keyset_ordering'):
+            ordering = tuple(view.get_keyset_ordering())
+
+        # Make sure the ordering is total, otherwise rows sharing the
+        # same value could be skipped or repeated between pages.
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            direction = '-' if ordering[-1].startswith('-') else ''
+            ordering += (f'{direction}id',)
+        return ordering
+
+    # --- Links ---
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # We went past the end; the first page is a safe place to go back to.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    def _link(self, obj, reverse):
+        values = [self._value(obj, field) for field in self.ordering]
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(values, reverse)
+        )
+
+    # --- Cursor encoding ---
+
+    def encode_cursor(self, values, reverse):
+        payload = {'v': values}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        """
+        Returns (position, reverse) where 'position' is the list of
+        ordering values of the boundary row, or None for the first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            raw_values = payload['v']
+            reverse = bool(payload.get('r'))
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.ordering, raw_values)
+            ]
+        except (TypeError, KeyError, ValueError, UnicodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    # --- Query helpers ---
+
+    def _field(self, name):
+        name = name.lstrip('-')
+        if name == 'pk':
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    def _value(self, obj, name):
+        field = self._field(name)
+        return field.value_to_string(obj)
+
+    def _load_ordering_columns(self, queryset):
+        # If the view narrowed the columns with .only(), make sure the
+        # cursor values are loaded too, or building the links would cost
+        # an extra query per boundary row.
+        names, defer = queryset.query.deferred_loading
+        if names and not defer:
+            queryset = queryset.only(*names, *(name.lstrip('-') for name in self.ordering))
+        return queryset
+
+    @staticmethod
+    def _flip(ordering):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+    def _seek_filter(self, ordering, position):
+        """
+        Builds `(a, b, c) > (x, y, z)` for a mixed-direction ordering:
+
+            a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+
+        The leading `a >= x` is redundant but lets the database use the
+        index on 'a' as a range scan instead of evaluating the OR per row.
+        """
+        names = [name.lstrip('-') for name in ordering]
+        ops = ['lt' if name.startswith('-') else 'gt' for name in ordering]
+
+        seek = Q()
+        equal = Q()
+        for name, op, value in zip(names, ops, position):
+            seek |= equal & Q(**{f'{name}__{op}': value})
+            equal &= Q(**{name: value})
+
+        leading = Q(**{f'{names[0]}__{ops[0]}e': position[0]})
+        return leading & seek
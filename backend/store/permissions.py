@@ -1,6 +1,7 @@
 # store/permissions.py
 
 from rest_framework import permissions
+from users.authentication import get_seller_profile
 
 class IsApprovedSeller(permissions.BasePermission):
     """
@@ -9,13 +10,12 @@ class IsApprovedSeller(permissions.BasePermission):
     message = "You are not an approved seller."
 
     def has_permission(self, request, view):
-        # Check if user is authenticated, is a 'SELLER', and has an approved profile
-        return (
-            request.user.is_authenticated and
-            request.user.role == 'SELLER' and
-            hasattr(request.user, 'sellerprofile') and
-            request.user.sellerprofile.is_approved
-        )
+        # Check if user is authenticated, is a 'SELLER', and has an approved profile.
+        # The profile is resolved once per request (see users/authentication.py).
+        if not (request.user.is_authenticated and request.user.role == 'SELLER'):
+            return False
+        profile = get_seller_profile(request)
+        return profile is not None and profile.is_approved
 
 class IsProductOwner(permissions.BasePermission):
     """
@@ -24,5 +24,7 @@ class IsProductOwner(permissions.BasePermission):
     message = "You do not have permission to modify this product."
     
     def has_object_permission(self, request, view, obj):
-        # The product's seller must be the same as the logged-in user's profile
-        return obj.seller == request.user.sellerprofile
\ No newline at end of file
+        # The product's seller must be the same as the logged-in user's profile.
+        # Compare ids, so the product's seller doesn't have to be loaded.
+        profile = get_seller_profile(request)
+        return profile is not None and obj.seller_id == profile.pk
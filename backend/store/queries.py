@@ -0,0 +1,171 @@
+# store/queries.py
+
+"""
+Query planning for serializer-backed views.
+
+A serializer already declares everything it is going to read from a
+model instance: plain columns ('price'), columns on related objects
+('seller.store_name') and nested serializers. This module walks those
+declarations once and turns them into the matching `select_related()`,
+`prefetch_related()` and `.only()` calls, so a list of 500 products
+costs one query instead of 1001.
+"""
+
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+from .fieldsets import SparseFieldsetMixin, fieldset_from_request
+
+
+class QueryPlan:
+    """
+    The joins and columns a serializer needs, relative to one model.
+
+    - 'select_related': forward FK / one-to-one paths to JOIN.
+    - 'prefetch': (path, related model, nested QueryPlan) for to-many relations.
+    - 'only': column paths to load, or None when we can't know them
+      (e.g. a SerializerMethodField may read anything).
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.select_related = []
+        self.prefetch = []
+        self.only = {'pk'}
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        for path, related_model, plan in self.prefetch:
+            queryset = queryset.prefetch_related(
+                Prefetch(path, queryset=plan.apply(related_model._default_manager.all()))
+            )
+        if self.only is not None:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def plan_queryset(queryset, serializer_class, only=True, fieldset=None):
+    """
+    Applies the query plan of 'serializer_class' to 'queryset'.
+    Pass only=False to keep loading every column (needed by views that
+    save the instance afterwards, since a deferred save skips columns
+    such as 'updated_at'). A 'fieldset' (see store/fieldsets.py) plans
+    for just the fields the client asked for.
+    """
+    return build_plan(queryset.model, serializer_class, only, fieldset).apply(queryset)
+
+
+# Bounded, since clients choose the fieldsets
+@lru_cache(maxsize=512)
+def build_plan(model, serializer_class, only=True, fieldset=None):
+    # Serializer fields are only bound on instantiation; the plan is
+    # cached per class (and fieldset) so this happens once per process.
+    serializer = serializer_class(fieldset=fieldset) if fieldset else serializer_class()
+    plan = QueryPlan(model)
+    _plan_fields(plan, model, serializer.fields.values(), prefix='', only=only)
+    if not only:
+        plan.only = None
+    return plan
+
+
+def _plan_fields(plan, model, fields, prefix, only):
+    for field in fields:
+        if field.write_only:
+            continue
+
+        if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+            # The field reads the whole object; any column may be used.
+            plan.only = None
+            continue
+
+        _plan_source(plan, model, field, field.source.split('.'), prefix, only)
+
+
+def _plan_source(plan, model, field, parts, prefix, only):
+    name, rest = parts[0], parts[1:]
+    try:
+        model_field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # A property or method on the model; we can't tell what it reads.
+        plan.only = None
+        return
+
+    path = f'{prefix}{name}'
+
+    # --- To-many relations: a nested list serializer becomes a Prefetch ---
+    if model_field.one_to_many or model_field.many_to_many:
+        child = getattr(field, 'child', None)
+        related_model = model_field.related_model
+        nested = QueryPlan(related_model)
+        if isinstance(child, serializers.BaseSerializer) and hasattr(child, 'fields'):
+            _plan_fields(nested, related_model, child.fields.values(), '', only)
+        else:
+            nested.only = None
+        if model_field.one_to_many and nested.only is not None:
+            # The prefetch needs the FK back to us to group the rows.
+            nested.only.add(model_field.field.name)
+        if not only:
+            nested.only = None
+        plan.prefetch.append((path, related_model, nested))
+        return
+
+    if not model_field.is_relation:
+        if plan.only is not None:
+            plan.only.add(path)
+        return
+
+    # --- Forward FK / one-to-one ---
+    if plan.only is not None:
+        plan.only.add(path)
+
+    if rest:
+        # e.g. 'seller.store_name': JOIN seller and load just that column.
+        plan.select_related.append(path)
+        _plan_source(plan, model_field.related_model, field, rest, f'{path}__', only)
+    elif isinstance(field, serializers.BaseSerializer) and hasattr(field, 'fields'):
+        # A nested serializer for a single related object.
+        plan.select_related.append(path)
+        nested = QueryPlan(model_field.related_model)
+        _plan_fields(nested, model_field.related_model, field.fields.values(), '', only)
+        if nested.only is None:
+            plan.only = None
+        elif plan.only is not None:
+            # 'pk' only works at the top level; spell out the related pk
+            pk_name = model_field.related_model._meta.pk.name
+            plan.only.update(
+                f"{path}__{pk_name if column == 'pk' else column}" for column in nested.only
+            )
+        plan.select_related.extend(f'{path}__{join}' for join in nested.select_related)
+        # Prefetches below a select_related join are not worth chasing here.
+
+
+class QueryPlanMixin:
+    """
+    Mixin for generic views: applies the serializer's query plan to the
+    queryset, for both list and detail endpoints.
+
+    We hook `filter_queryset` rather than `get_queryset` so views that
+    override `get_queryset` (e.g. to scope to the current seller) still
+    get planned without having to remember to call anything.
+    """
+    # Set to False on views that save the instance (see plan_queryset).
+    query_plan_only = True
+    # Columns the view itself needs on top of what the serializer reads.
+    query_plan_extra_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        fieldset = None
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            fieldset = fieldset_from_request(self.request)
+        queryset = plan_queryset(queryset, serializer_class, only=self.query_plan_only, fieldset=fieldset)
+        if self.query_plan_extra_fields:
+            names, defer = queryset.query.deferred_loading
+            if names and not defer:
+                queryset = queryset.only(*names, *self.query_plan_extra_fields)
+        return queryset
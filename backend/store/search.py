@@ -0,0 +1,190 @@
+# store/search.py
+
+"""
+Full-text product search.
+
+Instead of `name ILIKE '%term%'` scans, products are looked up through
+an inverted index:
+
+- SQLite: an FTS5 virtual table ('store_product_fts', rowid = product id)
+  created by migration 0004 and kept in sync by the Product signals in
+  store/models.py. Results are ranked with bm25(), name matches count
+  more than description matches.
+- PostgreSQL: a GIN expression index over a weighted tsvector of name
+  and description (also created by migration 0004), ranked with ts_rank.
+  The database keeps that index up to date by itself.
+- Anything else falls back to icontains, so search still works.
+
+The last word of the query is matched as a prefix ("blueto" finds
+"bluetooth"), which is what autocomplete needs.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'store_product_fts'
+
+# Weighted document used by the PostgreSQL index. The query below must
+# use exactly the same expression, or the planner won't use the index.
+PG_VECTOR = (
+    "(setweight(to_tsvector('english', coalesce(\"store_product\".\"name\", '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(\"store_product\".\"description\", '')), 'B'))"
+)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())[:10]
+
+
+def get_backend(using='default'):
+    vendor = connections[using].vendor
+    if vendor == 'sqlite':
+        return SQLiteSearchBackend(using)
+    if vendor == 'postgresql':
+        return PostgresSearchBackend(using)
+    return LikeSearchBackend(using)
+
+
+def search_products(queryset, query, limit=20):
+    """
+    Returns up to 'limit' products from 'queryset' matching 'query',
+    best matches first.
+    """
+    if not tokenize(query):
+        return []
+    return get_backend(queryset.db).search(queryset, query, limit)
+
+
+def filter_products(queryset, query):
+    """
+    Narrows 'queryset' to every product matching 'query', unranked and
+    without a limit (e.g. for the admin changelist, which paginates).
+    The index lookup is a subquery, so no ids pass through Python.
+    A query without words matches nothing.
+    """
+    if not tokenize(query):
+        return queryset.none()
+    return get_backend(queryset.db).filter(queryset, query)
+
+
+class LikeSearchBackend:
+    """
+    The plain icontains scan; used where no index is available and as
+    the baseline for the search benchmark.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    def search(self, queryset, query, limit):
+        return list(self.filter(queryset, query)[:limit])
+
+    def filter(self, queryset, query):
+        for token in tokenize(query):
+            queryset = queryset.filter(Q(name__icontains=token) | Q(description__icontains=token))
+        return queryset
+
+    # The LIKE scan has no index to maintain.
+    def index_products(self, products):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteSearchBackend(LikeSearchBackend):
+
+    def match_expression(self, query):
+        # Every word must match; quoting keeps FTS5 operators in the
+        # user's input from being interpreted. The last word is a prefix.
+        tokens = [f'"{token}"' for token in tokenize(query)]
+        tokens[-1] += '*'
+        return ' '.join(tokens)
+
+    def search(self, queryset, query, limit):
+        match = self.match_expression(query)
+        sql = (
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT %s OFFSET %s'
+        )
+
+        # The index knows nothing about the view's filters (e.g. only
+        # available products), so we pull ranked candidates in chunks and
+        # keep the ones the queryset allows, until we have enough.
+        results = []
+        offset = 0
+        chunk = max(limit * 2, 20)
+        with connections[self.using].cursor() as cursor:
+            while len(results) < limit:
+                cursor.execute(sql, [match, chunk, offset])
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    break
+                found = queryset.in_bulk(ids)
+                results.extend(found[pk] for pk in ids if pk in found)
+                if len(ids) < chunk:
+                    break
+                offset += chunk
+        return results[:limit]
+
+    def filter(self, queryset, query):
+        matches = RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [self.match_expression(query)]
+        )
+        return queryset.filter(pk__in=matches)
+
+    def index_products(self, products):
+        rows = [(product.id, product.name, product.description) for product in products]
+        if not rows:
+            return
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)', rows
+            )
+
+    def remove_products(self, product_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in product_ids]
+            )
+
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+                f'SELECT id, name, description FROM store_product'
+            )
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+
+    def tsquery(self, query):
+        tokens = tokenize(query)
+        tokens[-1] += ':*'
+        return ' & '.join(tokens)
+
+    def matches(self, query):
+        return RawSQL(
+            f"{PG_VECTOR} @@ to_tsquery('english', %s)", [self.tsquery(query)], output_field=BooleanField()
+        )
+
+    def search(self, queryset, query, limit):
+        rank = RawSQL(
+            f"ts_rank({PG_VECTOR}, to_tsquery('english', %s))", [self.tsquery(query)], output_field=FloatField()
+        )
+        return list(
+            self.filter(queryset, query).annotate(search_rank=rank).order_by('-search_rank', 'id')[:limit]
+        )
+
+    def filter(self, queryset, query):
+        return queryset.filter(self.matches(query))
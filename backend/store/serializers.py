@@ -1,15 +1,97 @@
 # store/serializers.py
 
+from decimal import Decimal
+
 from rest_framework import serializers
+from rest_framework.fields import SkipField
 from .models import Category, Product
 from users.models import SellerProfile
+from django.core.files.storage import FileSystemStorage, default_storage
+from .fieldsets import SparseFieldsetMixin
+from .images import FORMATS, VARIANTS
+
+CENTS = Decimal('0.01') # Product.price has 2 decimal places
+SKIP = object() # Marks a field that is left out of a row
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only view of Product.image_variants with absolute URLs:
+
+        {"thumb": {"width": 200, "height": 200, "webp": "<url>", "jpeg": "<url>"}, ...}
+
+    Empty until the variants have been built (see store/images.py).
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def url(self, name):
+        prefix = self.url_prefix()
+        if prefix is not None:
+            return prefix + name
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def url_prefix(self):
+        """
+        On the file system storage a URL is MEDIA_URL + name, and variant
+        names are hex digests with nothing to quote, so the absolute
+        prefix is worked out once per serializer rather than per URL
+        (urljoin() and quote() were most of the cost of a product list).
+        """
+        if not hasattr(self, '_url_prefix'):
+            self._url_prefix = None
+            if isinstance(default_storage, FileSystemStorage):
+                request = self.context.get('request')
+                base = default_storage.base_url
+                self._url_prefix = request.build_absolute_uri(base) if request is not None else base
+        return self._url_prefix
+
+    def variants(self, value):
+        result = {}
+        for variant in VARIANTS:
+            entry = (value or {}).get(variant)
+            if entry:
+                result[variant] = {
+                    'width': entry['width'],
+                    'height': entry['height'],
+                    **{key: self.url(entry[key]) for key in FORMATS if key in entry},
+                }
+        return result
+
+    def to_representation(self, value):
+        return self.variants(value)
+
+class ImageSrcsetField(ImageVariantsField):
+    """
+    The same variants as ready-made `srcset` strings, one per format:
+
+        {"webp": "<url> 200w, <url> 400w, <url> 1200w", "jpeg": "..."}
+    """
+    def to_representation(self, value):
+        variants = list(self.variants(value).values())
+        if not variants:
+            return {}
+        return {
+            key: ', '.join(f"{entry[key]} {entry['width']}w" for entry in variants if key in entry)
+            for key in FORMATS
+        }
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug']
 
-class ProductSerializer(serializers.ModelSerializer):
+class SellerSummarySerializer(serializers.ModelSerializer):
+    """What ?expand=seller shows in place of the seller ID."""
+    class Meta:
+        model = SellerProfile
+        fields = ['id', 'store_name']
+
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Supports ?fields= and ?expand= (see store/fieldsets.py)
+
     # We want to show the seller's store name, not just their ID.
     # 'read_only=True' means we just display it, not expect it on input.
     # 'source' tells DRF to look at the 'store_name' field on the 'seller' object.
@@ -18,6 +100,10 @@ class ProductSerializer(serializers.ModelSerializer):
     # We also want to show the category name
     category_name = serializers.CharField(source='category.name', read_only=True)
 
+    # Small, cacheable copies of 'image' for lists and responsive <img> tags
+    image_variants = ImageVariantsField()
+    image_srcset = ImageSrcsetField(source='image_variants')
+
     class Meta:
         model = Product
         fields = [
@@ -28,6 +114,8 @@ class ProductSerializer(serializers.ModelSerializer):
             'price', 
             'stock', 
             'image', 
+            'image_variants', # Resized copies of the image
+            'image_srcset',   # The same, as srcset strings
             'category',       # We send the category ID for filtering
             'category_name',  # And the name for display
             'seller',         # We send the seller ID
@@ -36,4 +124,61 @@ class ProductSerializer(serializers.ModelSerializer):
         
         # We protect these fields from being edited directly by the API consumer
         # 'seller' will be set automatically based on the logged-in user.
-        read_only_fields = ['seller'] 
\ No newline at end of file
+        read_only_fields = ['seller']
+
+        # ?expand=seller / ?expand=category send the related object
+        # instead of its ID
+        expandable_fields = {
+            'seller': lambda: SellerSummarySerializer(read_only=True),
+            'category': lambda: CategorySerializer(read_only=True),
+        }
+
+class ProductListSerializer(ProductSerializer):
+    """
+    Read-only ProductSerializer for lists. The output is exactly the
+    same, but each row is built with plain attribute reads instead of
+    DRF's per-field get_attribute() / to_representation() calls, which
+    dominate the cost of long lists. Fields without a fast path here go
+    through DRF as usual. ('manage.py benchmark_serializers' compares them.)
+    """
+    FAST_FIELDS = {
+        'id': lambda product: product.id,
+        'name': lambda product: product.name,
+        'slug': lambda product: product.slug,
+        'description': lambda product: product.description,
+        'price': lambda product: f'{product.price.quantize(CENTS):f}',
+        'stock': lambda product: product.stock,
+        'category': lambda product: product.category_id,
+        'seller': lambda product: product.seller_id,
+        # DRF leaves 'category_name' out when there is no category
+        'category_name': lambda product: product.category.name if product.category_id else SKIP,
+        'seller_name': lambda product: product.seller.store_name,
+    }
+
+    def row_builders(self):
+        builders = []
+        for field in self._readable_fields:
+            fast = self.FAST_FIELDS.get(field.field_name)
+            # Expanded fields are serializers with their own representation
+            if fast is not None and not isinstance(field, serializers.BaseSerializer):
+                builders.append((field.field_name, fast))
+            else:
+                builders.append((field.field_name, self.slow_builder(field)))
+        return builders
+
+    @staticmethod
+    def slow_builder(field):
+        def build(product):
+            try:
+                attribute = field.get_attribute(product)
+            except SkipField:
+                return SKIP
+            return None if attribute is None else field.to_representation(attribute)
+        return build
+
+    def to_representation(self, instance):
+        builders = getattr(self, '_row_builders', None)
+        if builders is None: # Once per serializer, i.e. once per list
+            builders = self._row_builders = self.row_builders()
+        return {name: value for name, build in builders if (value := build(instance)) is not SKIP}
+ 
\ No newline at end of file
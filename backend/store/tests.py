@@ -1,3 +1,662 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from .inventory import available_stock, reserve_stock, shard_stock
+from .models import Category, Product, StockShard
+from . import search
+from .images import generate_product_variants
+from .views import SellerProductDetailView
+
+
+class CatalogTestMixin:
+    """
+    Small helpers to build a catalog for the store tests.
+    """
+
+    def make_seller(self, email='seller@example.com', store_name='Acme'):
+        user = CustomUser.objects.create_user(
+            email=email, username=email.split('@')[0], password='pass12345',
+            role=CustomUser.Role.SELLER,
+        )
+        profile = user.sellerprofile
+        profile.store_name = store_name
+        profile.is_approved = True
+        profile.save()
+        return user
+
+    def make_products(self, seller, count, category=None, **extra):
+        products = []
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            products.append(Product.objects.create(
+                seller=seller.sellerprofile,
+                category=category,
+                name=f'Product {i}',
+                description='A product',
+                price=10 + i,
+                stock=5,
+                slug=f'product-{i}',
+                **extra,
+            ))
+        return products
+
+
+class ProductListPaginationTests(CatalogTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = self.make_seller()
+        self.category = Category.objects.create(name='Audio', slug='audio')
+        self.products = self.make_products(self.seller, 7, category=self.category)
+
+    def collect(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_walks_every_product_once_in_order(self):
+        # Force identical timestamps so the 'id' tiebreaker is exercised.
+        Product.objects.update(created_at=self.products[0].created_at)
+        expected = list(
+            Product.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.collect('/api/products/?page_size=3'), expected)
+
+    def test_previous_link_returns_the_previous_page(self):
+        first = self.client.get('/api/products/?page_size=3')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in back.data['results']],
+            [item['id'] for item in first.data['results']],
+        )
+        self.assertIsNone(first.data['previous'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/products/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductQueryCountTests(CatalogTestMixin, TestCase):
+    """
+    The number of SQL queries per request must not grow with the
+    number of products returned (no N+1 through seller / category).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.seller = self.make_seller()
+        self.category = Category.objects.create(name='Audio', slug='audio')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def assert_constant(self, url, add_more):
+        before = self.count_queries(url)
+        add_more()
+        self.assertEqual(self.count_queries(url), before)
+
+    def test_product_list(self):
+        self.make_products(self.seller, 2, category=self.category)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/?page_size=50')
+        self.assertEqual(response.data['results'][0]['seller_name'], 'Acme')
+        self.assertEqual(response.data['results'][0]['category_name'], 'Audio')
+
+        other = self.make_seller('other@example.com', 'Other')
+        self.make_products(other, 20, category=self.category)
+        with self.assertNumQueries(1):
+            self.client.get('/api/products/?page_size=50')
+
+    def test_product_detail(self):
+        product = self.make_products(self.seller, 1, category=self.category)[0]
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/products/{product.slug}/')
+        self.assertEqual(response.data['seller_name'], 'Acme')
+
+    def test_seller_dashboard(self):
+        self.client.force_authenticate(self.seller)
+        self.make_products(self.seller, 2, category=self.category)
+        self.assert_constant(
+            '/api/seller/dashboard/',
+            lambda: self.make_products(self.seller, 15, category=self.category),
+        )
+
+    def test_seller_product_detail(self):
+        self.client.force_authenticate(self.seller)
+        product = self.make_products(self.seller, 1, category=self.category)[0]
+        self.assert_constant(
+            f'/api/seller/dashboard/{product.slug}/',
+            lambda: self.make_products(self.seller, 5, category=self.category),
+        )
+
+
+class CatalogCacheTests(CatalogTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.seller = self.make_seller()
+        self.category = Category.objects.create(name='Audio', slug='audio')
+        self.product = self.make_products(self.seller, 1, category=self.category)[0]
+        self.url = f'/api/products/{self.product.slug}/'
+
+    def test_detail_is_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['name'], self.product.name)
+
+    def test_saving_related_models_invalidates(self):
+        self.client.get(self.url)
+
+        self.product.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(self.client.get(self.url).data['name'], 'Renamed')
+
+        profile = self.seller.sellerprofile
+        profile.store_name = 'New Store'
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(self.client.get(self.url).data['seller_name'], 'New Store')
+
+    def test_stock_changes_only_invalidate_their_product(self):
+        other = self.make_products(self.seller, 1)[0]
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_stock({other.pk: 1})
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_stock({self.product.pk: 2})
+        self.assertEqual(self.client.get(self.url).data['stock'], self.product.stock - 2)
+
+    def test_etag_round_trip(self):
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        self.product.price = 99
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        fresh = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh['ETag'], response['ETag'])
+
+    def test_category_list_invalidates(self):
+        self.assertEqual(len(self.client.get('/api/categories/').data), 1)
+        with self.assertNumQueries(0):
+            self.client.get('/api/categories/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Books', slug='books')
+        self.assertEqual(len(self.client.get('/api/categories/').data), 2)
+
+
+class ProductFilterTests(CatalogTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = self.make_seller()
+        self.other = self.make_seller('other@example.com', 'Other')
+        self.audio = Category.objects.create(name='Audio', slug='audio')
+        self.books = Category.objects.create(name='Books', slug='books')
+        # Prices 10..13 for audio, 14..15 for books
+        self.make_products(self.seller, 4, category=self.audio)
+        self.make_products(self.other, 2, category=self.books)
+
+    def ids(self, query):
+        response = self.client.get(f'/api/products/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['id'] for item in response.data['results']]
+
+    def test_category_and_seller(self):
+        self.assertEqual(len(self.ids('category=books')), 2)
+        self.assertEqual(len(self.ids(f'seller={self.seller.sellerprofile.id}')), 4)
+
+    def test_price_range_and_stock(self):
+        Product.objects.filter(price=12).update(stock=0)
+        self.assertEqual(len(self.ids('min_price=11&max_price=13')), 3)
+        self.assertEqual(len(self.ids('min_price=11&max_price=13&in_stock=true')), 2)
+
+    def test_sort_by_price_across_pages(self):
+        expected = list(Product.objects.order_by('-price').values_list('id', flat=True))
+        response = self.client.get('/api/products/?sort=-price&page_size=4')
+        ids = [item['id'] for item in response.data['results']]
+        ids += [item['id'] for item in self.client.get(response.data['next']).data['results']]
+        self.assertEqual(ids, expected)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "SQLite query plans")
+    def test_every_sort_uses_an_index(self):
+        from .filters import PRODUCT_SORT_ORDERINGS
+        from .views import ProductListView
+        for sort, ordering in PRODUCT_SORT_ORDERINGS.items():
+            plan = ProductListView.queryset.order_by(*ordering)[:20].explain()
+            self.assertNotIn('TEMP B-TREE', plan, sort) # i.e. no sort step
+            self.assertIn('USING INDEX', plan, sort)
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get('/api/products/?sort=random').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/?min_price=abc').status_code, 400)
+
+
+class ProductSearchTests(CatalogTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = self.make_seller()
+        self.speaker, self.lamp, self.hidden = self.make_products(self.seller, 3)
+        self.speaker.name = 'Bluetooth Speaker'
+        self.speaker.save()
+        self.lamp.name = 'Desk Lamp'
+        self.lamp.description = 'Pairs well with a bluetooth speaker'
+        self.lamp.save()
+        self.hidden.name = 'Bluetooth Headphones'
+        self.hidden.available = False
+        self.hidden.save()
+
+    def names(self, query):
+        response = self.client.get('/api/products/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_ranks_name_matches_first_and_hides_unavailable(self):
+        self.assertEqual(self.names('bluetooth speaker'), ['Bluetooth Speaker', 'Desk Lamp'])
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.names('blueto'), ['Bluetooth Speaker', 'Desk Lamp'])
+        self.assertEqual(self.names('des'), ['Desk Lamp'])
+
+    def test_admin_search_returns_every_match(self):
+        Product.objects.bulk_create([
+            Product(seller=self.seller.sellerprofile, name=f'Bluetooth Speaker {i}', description='-',
+                    price=5, slug=f'bulk-speaker-{i}')
+            for i in range(520)
+        ])
+        search.get_backend().rebuild()
+        model_admin = admin.site._registry[Product]
+        request = RequestFactory().get('/admin/store/product/')
+
+        results, _ = model_admin.get_search_results(request, Product.objects.all(), 'bluetooth')
+        # The unavailable product too: the admin sees everything
+        self.assertEqual(results.count(), 523)
+        # A term without words falls back to the admin's own search
+        results, _ = model_admin.get_search_results(request, Product.objects.all(), '!!')
+        self.assertEqual(results.count(), 0)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.speaker.name = 'Portable Radio'
+        self.speaker.save()
+        self.assertEqual(self.names('radio'), ['Portable Radio'])
+        self.speaker.delete()
+        self.assertEqual(self.names('radio'), [])
+
+    def test_empty_query(self):
+        self.assertEqual(self.names('  '), [])
+
+
+class BulkImportExportTests(CatalogTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = self.make_seller()
+        self.category = Category.objects.create(name='Audio', slug='audio')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def upload(self, body, content_type='text/csv', **params):
+        url = '/api/seller/products/import/'
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.generic('POST', url, body.encode(), content_type=content_type)
+
+    def csv_body(self, count, start=0, price='10.00'):
+        lines = ['slug,name,description,price,stock,category,available']
+        lines += [
+            f'item-{i},Item {i},Speaker number {i},{price},3,audio,true'
+            for i in range(start, start + count)
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def test_csv_upsert(self):
+        response = self.upload(self.csv_body(3))
+        self.assertEqual(response.data, {'created': 3, 'updated': 0, 'failed': 0, 'errors': []})
+        product = Product.objects.get(slug='item-1')
+        self.assertEqual(product.category, self.category)
+        self.assertEqual(product.seller, self.seller.sellerprofile)
+
+        response = self.upload(self.csv_body(4, price='7.50'))
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 3))
+        self.assertEqual(Product.objects.get(slug='item-1').price, Decimal('7.50'))
+
+    def test_missing_columns_keep_current_values(self):
+        self.upload(self.csv_body(2))
+        sharded = Product.objects.get(slug='item-1')
+        shard_stock(sharded, 2)
+        response = self.upload('slug,name,price\nitem-0,Renamed,4.00\nitem-1,Item 1,10.00\n')
+        self.assertEqual(response.data['updated'], 2)
+
+        product = Product.objects.get(slug='item-0')
+        self.assertEqual((product.name, product.price), ('Renamed', Decimal('4.00')))
+        self.assertEqual((product.stock, product.category, product.description), (3, self.category, 'Speaker number 0'))
+        self.assertEqual(available_stock([sharded.pk])[sharded.pk], 3)
+
+    def test_queries_per_chunk_do_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            self.upload(self.csv_body(5))
+        with CaptureQueriesContext(connection) as large:
+            self.upload(self.csv_body(60, start=5))
+        self.assertEqual(len(large), len(small))
+
+    def test_row_errors(self):
+        other = self.make_seller('other@example.com', 'Other')
+        self.make_products(other, 1) # slug 'product-0'
+        body = '\n'.join([
+            '{"slug": "ok", "name": "Fine", "price": "5"}',
+            '{"slug": "bad-price", "name": "X", "price": "-1"}',
+            'not json',
+            '{"slug": "product-0", "name": "Taken", "price": "5"}',
+            '{"slug": "no-cat", "name": "X", "price": "5", "category": "nope"}',
+        ])
+        response = self.upload(body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4, 5])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        self.assertEqual(Product.objects.get(slug='product-0').seller, other.sellerprofile)
+
+    def test_imported_products_are_searchable(self):
+        self.upload(self.csv_body(2))
+        response = self.client.get('/api/products/search/', {'q': 'speaker number'})
+        self.assertEqual(len(response.data), 2)
+
+    def test_export_round_trip(self):
+        self.upload(self.csv_body(3))
+        response = self.client.get('/api/seller/products/export/')
+        self.assertEqual(response.status_code, 200)
+        exported = b''.join(response.streaming_content).decode()
+        self.assertEqual(exported.splitlines()[0], 'slug,name,description,price,stock,category,available')
+        self.assertEqual(len(exported.splitlines()), 4)
+
+        response = self.upload(exported)
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 3))
+
+    def test_management_commands(self):
+        path = os.path.join(tempfile.mkdtemp(), 'products.jsonl')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        self.make_products(self.seller, 2)
+        call_command('export_products', seller='seller@example.com', format='jsonl', output=path)
+        Product.objects.all().delete()
+
+        out = StringIO()
+        call_command('import_products', path, seller='seller@example.com', stdout=out)
+        self.assertIn('Created 2', out.getvalue())
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ShardedStockTests(CatalogTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = self.make_seller()
+        self.product = self.make_products(self.seller, 1)[0]
+        Product.objects.filter(pk=self.product.pk).update(stock=7)
+        shard_stock(self.product, 3)
+
+    def shards(self):
+        return list(StockShard.objects.filter(product=self.product).order_by('index').values_list('quantity', flat=True))
+
+    def reserve(self, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            return reserve_stock({self.product.pk: quantity})
+
+    def test_split_evenly(self):
+        self.assertEqual(self.shards(), [3, 2, 2])
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.stock_shards), (7, 3))
+
+    @mock.patch('store.inventory.random.randrange', return_value=0)
+    def test_one_shard_then_all_of_them(self, randrange):
+        self.assertEqual(self.reserve(3), set())
+        self.assertEqual(self.shards(), [0, 2, 2])
+        # Neither shard 0 nor shard 1 has 4 alone; it takes from both 1 and 2
+        self.assertEqual(self.reserve(4), set())
+        self.assertEqual(self.shards(), [0, 0, 0])
+        self.assertEqual(self.reserve(1), {self.product.pk})
+
+        # Product.stock follows the shards once the sync ran
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+
+    def test_seller_stock_edit_rebalances(self):
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        response = client.patch(
+            f'/api/seller/dashboard/{self.product.slug}/', {'stock': 9}, format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.shards(), [3, 3, 3])
+
+    def patch_with(self, stale, data):
+        """PATCHes the product as if the view had loaded 'stale' before other writes."""
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        with mock.patch.object(SellerProductDetailView, 'get_object', return_value=stale):
+            response = client.patch(f'/api/seller/dashboard/{stale.slug}/', data, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_stale_stock_edit_keeps_the_shards(self):
+        shard_stock(self.product, 0)
+        stale = Product.objects.get(pk=self.product.pk)
+        shard_stock(self.product, 2)
+
+        self.patch_with(stale, {'stock': 10})
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.stock_shards), (10, 2))
+        self.assertEqual(self.shards(), [5, 5])
+
+    def test_name_edit_keeps_concurrent_checkouts(self):
+        shard_stock(self.product, 0)
+        stale = Product.objects.get(pk=self.product.pk)
+        self.reserve(2) # Commits while the seller's request is in flight
+
+        self.patch_with(stale, {'name': 'Renamed'})
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, self.product.stock), ('Renamed', 5))
+
+    def test_unshard_keeps_the_stock(self):
+        self.reserve(2)
+        shard_stock(self.product, 0)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.stock_shards), (5, 0))
+        self.assertFalse(StockShard.objects.exists())
+
+
+class ProductImageVariantTests(CatalogTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root, BACKGROUND_TASKS_EAGER=True)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.seller = self.make_seller()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def upload(self, size=(1600, 900), color='red'):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/seller/dashboard/', {
+                'name': 'Poster', 'slug': 'poster', 'description': 'A poster',
+                'price': '9.99', 'stock': 1,
+                'image': SimpleUploadedFile('poster.png', buffer.getvalue(), 'image/png'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Product.objects.get(slug='poster')
+
+    def test_variants_are_built_after_upload(self):
+        product = self.upload()
+        variants = product.image_variants
+        self.assertEqual(variants['source'], product.image.name)
+        self.assertEqual((variants['thumb']['width'], variants['thumb']['height']), (200, 200))
+        self.assertEqual((variants['detail']['width'], variants['detail']['height']), (1200, 675))
+        for variant in ('thumb', 'card', 'detail'):
+            for key in ('webp', 'jpeg'):
+                self.assertTrue(default_storage.exists(variants[variant][key]))
+
+        # A finished job only invalidates its own product's cache entries
+        other = self.make_products(self.seller, 1)[0]
+        self.client.get(f'/api/products/{other.slug}/')
+        poster_etag = self.client.get('/api/products/poster/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            generate_product_variants(product.pk, product.image.name)
+        with self.assertNumQueries(0):
+            self.client.get(f'/api/products/{other.slug}/')
+        self.assertNotEqual(self.client.get('/api/products/poster/')['ETag'], poster_etag)
+
+    def test_serializer_exposes_urls_and_srcset(self):
+        self.upload()
+        data = self.client.get('/api/products/poster/').data
+        thumb = data['image_variants']['thumb']
+        self.assertTrue(thumb['webp'].startswith('http://testserver/media/products/variants/'))
+        self.assertEqual(data['image_srcset']['jpeg'].count('w,'), 2)
+
+    def test_names_follow_content(self):
+        first = self.upload().image_variants
+        Product.objects.all().delete()
+        second = self.upload().image_variants
+        # Same pixels, same files, even though the original got a new name
+        self.assertEqual(first['card']['webp'], second['card']['webp'])
+
+        product = Product.objects.get(slug='poster')
+        product.image = None
+        product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants, {})
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaRoutingTests(CatalogTestMixin, TestCase):
+    """
+    The primary stands in for the replica here; what matters is when
+    the views ask for one.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.seller = self.make_seller()
+        self.product = self.make_products(self.seller, 1)[0]
+        patcher = mock.patch('main.replicas.choose_replica', return_value='default')
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_public_reads_use_a_replica(self):
+        self.assertEqual(self.client.get('/api/products/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/products/{self.product.slug}/').status_code, 200)
+        self.assertEqual(self.choose_replica.call_count, 2)
+
+    def test_writer_reads_own_writes_from_primary(self):
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        response = client.patch(
+            f'/api/seller/dashboard/{self.product.slug}/', {'name': 'Renamed'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.choose_replica.reset_mock()
+
+        response = client.get(f'/api/products/{self.product.slug}/')
+        self.assertEqual(response.data['name'], 'Renamed')
+        self.choose_replica.assert_not_called()
+
+        # Everyone else still reads from the replica
+        self.client.get(f'/api/products/{self.product.slug}/')
+        self.choose_replica.assert_called_once()
+
+        cache.delete(f'replica:pin:{self.seller.id}') # The pin expires
+        client.get('/api/products/')
+        self.assertEqual(self.choose_replica.call_count, 2)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        client.patch(f'/api/seller/dashboard/{self.product.slug}/', {'name': 'Renamed'}, format='json')
+        client.get('/api/products/')
+        self.choose_replica.assert_not_called()
+        self.assertIsNone(cache.get(f'replica:pin:{self.seller.id}'))
+
+
+class SparseFieldsetTests(CatalogTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.seller = self.make_seller()
+        self.category = Category.objects.create(name='Audio', slug='audio')
+        self.products = self.make_products(self.seller, 3, category=self.category)
+
+    def test_fields_narrow_output_and_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/products/?fields=slug,name,price')
+        self.assertEqual(set(response.data['results'][0]), {'slug', 'name', 'price'})
+        self.assertEqual(len(ctx), 1)
+        self.assertNotIn('"description"', ctx[0]['sql'])
+        self.assertNotIn('JOIN', ctx[0]['sql'])
+        # The 'next' link keeps the fieldset
+        response = self.client.get('/api/products/?fields=slug&page_size=1')
+        self.assertIn('fields=slug', response.data['next'])
+
+    def test_expand(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/?fields=name&expand=seller,category')
+        row = response.data['results'][0]
+        self.assertEqual(row['seller'], {'id': self.seller.sellerprofile.id, 'store_name': 'Acme'})
+        self.assertEqual(row['category'], {'id': self.category.id, 'name': 'Audio', 'slug': 'audio'})
+        self.assertEqual(set(row), {'name', 'seller', 'category'})
+
+    def test_detail_caches_each_fieldset_separately(self):
+        slug = self.products[0].slug
+        self.assertEqual(set(self.client.get(f'/api/products/{slug}/?fields=name').data), {'name'})
+        self.assertIn('description', self.client.get(f'/api/products/{slug}/').data)
+
+    def test_list_serializer_matches_model_serializer(self):
+        from .serializers import ProductListSerializer, ProductSerializer
+        Product.objects.filter(pk=self.products[1].pk).update(category=None, price='7.5')
+        products = Product.objects.order_by('id')
+        self.assertEqual(
+            ProductListSerializer(products, many=True).data,
+            ProductSerializer(products, many=True).data,
+        )
@@ -7,9 +7,13 @@ urlpatterns = [
     # --- Public Customer Endpoints ---
     path('categories/', views.CategoryListView.as_view(), name='category-list'),
     path('products/', views.ProductListView.as_view(), name='product-list'),
+    # This must come before the slug route, or 'search' is taken as a slug
+    path('products/search/', views.ProductSearchView.as_view(), name='product-search'),
     path('products/<slug:slug>/', views.ProductDetailView.as_view(), name='product-detail'),
     
     # --- Protected Seller Endpoints ---
     path('seller/dashboard/', views.SellerProductDashboard.as_view(), name='seller-dashboard'),
     path('seller/dashboard/<slug:slug>/', views.SellerProductDetailView.as_view(), name='seller-product-detail'),
+    path('seller/products/import/', views.SellerProductImportView.as_view(), name='seller-product-import'),
+    path('seller/products/export/', views.SellerProductExportView.as_view(), name='seller-product-export'),
 ]
\ No newline at end of file
@@ -1,13 +1,37 @@
 # store/views.py
 
-from rest_framework import generics, permissions
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework import generics, permissions, status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from main.replicas import ReplicaReadMixin
+from users.authentication import get_seller_profile
+from users.models import SellerProfile
+from .bulk import (
+    FORMATS, BulkFormatError, CSVUploadParser, JSONLinesUploadParser, ProductImporter,
+    detect_format, export_lines, read_rows,
+)
+from .cache import entry_timeout, get_cache, make_etag, make_key, read_through
+from .filters import ProductFilterBackend, get_product_sort_ordering
+from .inventory import rebalance_stock
+from .search import search_products
 from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from .fieldsets import fieldset_from_request, fieldset_key
+from .serializers import ProductListSerializer, ProductSerializer, CategorySerializer
 from .permissions import IsApprovedSeller, IsProductOwner
+from .pagination import KeysetPagination
+from .queries import QueryPlanMixin
 
 # --- 1. Public Views (for Customers) ---
+# These only read, so they can be served from a read replica
+# (see main/replicas.py).
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(ReplicaReadMixin, generics.ListAPIView):
     """
     Public endpoint to list all categories.
     """
@@ -15,15 +39,64 @@ class CategoryListView(generics.ListAPIView):
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny] # Anyone can see categories
 
-class ProductListView(generics.ListAPIView):
+    def list(self, request, *args, **kwargs):
+        # Categories rarely change, so we serve them from the cache.
+        # The cache entry is dropped whenever a Category is saved or deleted.
+        data, key = read_through(
+            'categories', 'all', (Category,),
+            lambda: list(self.get_serializer(self.get_queryset(), many=True).data),
+        )
+        return conditional_response(request, Response(data), make_etag(key))
+
+class ProductListView(ReplicaReadMixin, QueryPlanMixin, generics.ListAPIView):
     """
     Public endpoint to list all available products.
+    Results are cursor-paginated (newest first), so every page costs
+    the same no matter how deep into the catalog the client is.
+    Use the 'next' / 'previous' links in the response to move around.
+
+    Filtering and sorting happen in the database:
+    ?category=<slug>&seller=<id>&min_price=&max_price=&in_stock=true
+    ?sort=newest|price|-price|name
+
+    ?fields= / ?expand= pick the fields of each row (store/fieldsets.py),
+    e.g. ?fields=id,slug,name,price,image_variants for a product grid.
     """
-    queryset = Product.objects.filter(available=True)
-    serializer_class = ProductSerializer
+    # 'available__in' rather than 'available=True': Django writes the latter
+    # as WHERE available, which SQLite can't match to the indexes leading
+    # with 'available' that back each sort (see store/filters.py)
+    queryset = Product.objects.filter(available__in=[True])
+    serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny] # Anyone can see products
+    pagination_class = KeysetPagination
+    filter_backends = [ProductFilterBackend]
+
+    def get_keyset_ordering(self):
+        return get_product_sort_ordering(self.request)
+
+class ProductSearchView(ReplicaReadMixin, QueryPlanMixin, generics.ListAPIView):
+    """
+    Public full-text search over product names and descriptions.
+    ?q=<words> returns the best matches first; the last word is
+    matched as a prefix, so this also works for autocomplete.
+    ?limit=<n> caps the number of results (default 20, max 100).
+    """
+    queryset = Product.objects.filter(available=True)
+    serializer_class = ProductListSerializer
+    permission_classes = [permissions.AllowAny]
+    default_limit = 20
+    max_limit = 100
 
-class ProductDetailView(generics.RetrieveAPIView):
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        products = search_products(self.filter_queryset(self.get_queryset()), query, max(limit, 1))
+        return Response(self.get_serializer(products, many=True).data)
+
+class ProductDetailView(ReplicaReadMixin, QueryPlanMixin, generics.RetrieveAPIView):
     """
     Public endpoint to view a single product's details.
     'lookup_field = "slug"' tells DRF to find the product by its 'slug' field,
@@ -33,10 +106,76 @@ class ProductDetailView(generics.RetrieveAPIView):
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
+    # Needed for the ETag / Last-Modified headers.
+    query_plan_extra_fields = ('updated_at',)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serves the product from the cache, keyed by slug. The entry is
+        rebuilt whenever a Product, Category or SellerProfile changes,
+        or this product's stock does (store/inventory.py bumps only its
+        own version). The host is part of the key because image URLs are
+        absolute, and so are ?fields= / ?expand=, which change the
+        representation.
+        """
+        slug = kwargs[self.lookup_field]
+        fields = fieldset_key(fieldset_from_request(request))
+        identifier = f'{request.get_host()}:{slug}:{fields}'
+        models = (Product, Category, SellerProfile)
+
+        # The key needs the product's id (for its own version), which is
+        # cached by slug
+        cache = get_cache()
+        id_key = make_key('product-id', slug, (Product,))
+        product_id = cache.get(id_key)
+        if product_id is not None:
+            entry, key = read_through(
+                'product', identifier, models, self.build_cache_entry,
+                objects=[(Product, product_id)],
+            )
+        else:
+            # First visit: read the product once and learn its id. Its
+            # version is only read now, after the row, so the entry is
+            # kept briefly in case a checkout slipped in between.
+            entry = self.build_cache_entry()
+            key = make_key('product', identifier, models, [(Product, entry['id'])])
+            cache.set(id_key, entry['id'], timeout=entry_timeout())
+            cache.set(key, entry, timeout=entry_timeout(short=True))
+        return conditional_response(
+            request, Response(entry['data']),
+            make_etag(key, entry['updated_at'].isoformat()),
+            entry['updated_at'],
+        )
+
+    def build_cache_entry(self):
+        instance = self.get_object()
+        return {
+            'id': instance.pk,
+            'data': dict(self.get_serializer(instance).data),
+            'updated_at': instance.updated_at,
+        }
+
+def conditional_response(request, response, etag, last_modified=None):
+    """
+    Adds ETag / Last-Modified headers and answers with a
+    '304 Not Modified' when the client already has this version.
+    """
+    timestamp = last_modified.timestamp() if last_modified else None
+    not_modified = get_conditional_response(
+        request._request, etag=etag, last_modified=timestamp
+    )
+    if not_modified is not None:
+        response = not_modified
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    # Let browsers keep a copy, but revalidate it on every use.
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return response
 
 # --- 2. Protected Views (for Sellers) ---
 
-class SellerProductDashboard(generics.ListCreateAPIView):
+class SellerProductDashboard(QueryPlanMixin, generics.ListCreateAPIView):
     """
     Protected endpoint for a seller to:
     - LIST all of their own products.
@@ -52,7 +191,7 @@ class SellerProductDashboard(generics.ListCreateAPIView):
         logged-in seller.
         """
         # We get the SellerProfile linked to the logged-in user
-        user_profile = self.request.user.sellerprofile
+        user_profile = get_seller_profile(self.request)
         return Product.objects.filter(seller=user_profile)
 
     def perform_create(self, serializer):
@@ -61,10 +200,10 @@ class SellerProductDashboard(generics.ListCreateAPIView):
         the logged-in seller.
         """
         # This is the "Model Method" concept in action for the API.
-        user_profile = self.request.user.sellerprofile
+        user_profile = get_seller_profile(self.request)
         serializer.save(seller=user_profile)
 
-class SellerProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SellerProductDetailView(QueryPlanMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Protected endpoint for a seller to:
     - RETRIEVE, UPDATE, or DELETE one of their *own* products.
@@ -74,11 +213,90 @@ class SellerProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     # AND the owner of the product.
     permission_classes = [permissions.IsAuthenticated, IsApprovedSeller, IsProductOwner]
     lookup_field = 'slug'
+    # This view saves the product, so load every column (joins still apply).
+    query_plan_only = False
 
     def get_queryset(self):
         """
         This view should only allow modification of products
         owned by the currently logged-in seller.
         """
-        user_profile = self.request.user.sellerprofile
-        return Product.objects.filter(seller=user_profile)
\ No newline at end of file
+        user_profile = get_seller_profile(self.request)
+        return Product.objects.filter(seller=user_profile)
+
+    def perform_update(self, serializer):
+        # Write only the fields the seller sent. Saving the whole row would
+        # put back the stock (and shard count) loaded at the start of the
+        # request, undoing checkouts that committed since.
+        product = serializer.instance
+        for field, value in serializer.validated_data.items():
+            setattr(product, field, value)
+        product.save(update_fields=[*serializer.validated_data, 'updated_at'])
+        # A sharded product's stock lives in its shards (store/inventory.py)
+        if 'stock' in serializer.validated_data:
+            rebalance_stock([product])
+
+class SellerProductImportView(APIView):
+    """
+    Protected endpoint for a seller to create or update many products
+    at once (matched by slug). See store/bulk.py for the columns.
+
+    Send the file as the request body (Content-Type: text/csv or
+    application/x-ndjson) or as a multipart upload named 'file'.
+    ?file_format=csv|jsonl overrides the detected format.
+    Answers with the number of products created / updated and the
+    errors of the rows that were skipped.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsApprovedSeller]
+    parser_classes = [CSVUploadParser, JSONLinesUploadParser, MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.data.get('file')
+        if upload is None:
+            return Response(
+                {"error": "Send a CSV or JSON-lines file."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        file_format = (
+            request.query_params.get('file_format')
+            or request.data.get('file_format')
+            or detect_format(getattr(upload, 'name', ''), getattr(upload, 'content_type', ''))
+        )
+        if file_format not in FORMATS:
+            return Response(
+                {"error": f"Unknown file format. Choose from: {', '.join(FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        importer = ProductImporter(get_seller_profile(request))
+        try:
+            result = importer.run(read_rows(upload, file_format))
+        except (BulkFormatError, UnicodeDecodeError, csv.Error) as e:
+            # Chunks before the bad line have been imported already
+            data = importer.result.as_dict()
+            data['error'] = f"Could not read the file: {e}"
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict())
+
+class SellerProductExportView(APIView):
+    """
+    Protected endpoint that streams all of a seller's products as CSV
+    (default) or JSON lines (?file_format=jsonl), in the import format.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsApprovedSeller]
+    content_types = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in FORMATS:
+            return Response(
+                {"error": f"Unknown file format. Choose from: {', '.join(FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        products = Product.objects.filter(seller=get_seller_profile(request))
+        response = StreamingHttpResponse(
+            export_lines(products, file_format), content_type=self.content_types[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{file_format}"'
+        return response
@@ -0,0 +1,99 @@
+# users/authentication.py
+
+"""
+JWT authentication that resolves the seller profile along with the user.
+
+The seller endpoints need both the user and their SellerProfile (role,
+approval, ownership checks, the queryset filter). By default simple-jwt
+loads the user with one query, and every `request.user.sellerprofile`
+afterwards can cost another. Here the user is loaded with its profile in
+a single joined query, once per request, and everything else goes
+through get_seller_profile(request).
+
+Stateless reads (JWT_STATELESS_READS = True): for GET/HEAD/OPTIONS
+requests the user is not loaded at all. request.user is built from the
+token's claims (id, email, username and the 'role' added by
+MyTokenObtainPairSerializer.get_token). Seller reads then only need the
+profile, which is cached (see get_seller_profile). Writes always load
+the real user, so a deactivated account or changed password still
+blocks them right away.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import CustomUser, SellerProfile, seller_profile_cache_key
+
+
+class SellerJWTAuthentication(JWTAuthentication):
+
+    def authenticate(self, request):
+        # DRF builds a new authenticator for every request
+        self.stateless = settings.JWT_STATELESS_READS and request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        if self.stateless:
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        # Same checks as JWTAuthentication.get_user, plus the profile JOIN
+        try:
+            user = self.user_model.objects.select_related('sellerprofile').get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+# --- Seller Profile Lookup ---
+
+def get_seller_profile(request):
+    """
+    The SellerProfile of the requesting user, or None. Resolved at most
+    once per request.
+
+    - A user loaded by SellerJWTAuthentication already carries it.
+    - A stateless (token) user is looked up by id, through the cache;
+      the cached copy is dropped whenever the profile is saved (see
+      users/models.py). Non-sellers never hit the database.
+    """
+    if hasattr(request, '_seller_profile'):
+        return request._seller_profile
+
+    user = request.user
+    profile = None
+    if user.is_authenticated and user.role == CustomUser.Role.SELLER:
+        if isinstance(user, CustomUser):
+            profile = getattr(user, 'sellerprofile', None) # None if the profile is missing
+        else:
+            key = seller_profile_cache_key(user.id)
+            profile = cache.get(key)
+            if profile is None:
+                profile = SellerProfile.objects.filter(user_id=user.id).first()
+                if profile is not None:
+                    cache.set(key, profile, settings.SELLER_PROFILE_CACHE_TIMEOUT)
+
+    request._seller_profile = profile
+    return profile
@@ -3,7 +3,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 # 1. --- CustomUser Model ---
@@ -52,4 +53,17 @@ class SellerProfile(models.Model):
 @receiver(post_save, sender=CustomUser)
 def create_seller_profile(sender, instance, created, **kwargs):
     if created and instance.role == CustomUser.Role.SELLER:
-        SellerProfile.objects.create(user=instance)
\ No newline at end of file
+        SellerProfile.objects.create(user=instance)
+
+# 4. --- Signal ---
+# Stateless requests read the seller profile from the cache (see
+# users/authentication.py). Drop the cached copy whenever it changes,
+# e.g. when an admin approves the seller.
+
+def seller_profile_cache_key(user_id):
+    return f'seller-profile:{user_id}'
+
+@receiver(post_save, sender=SellerProfile)
+@receiver(post_delete, sender=SellerProfile)
+def forget_cached_seller_profile(sender, instance, **kwargs):
+    cache.delete(seller_profile_cache_key(instance.user_id))
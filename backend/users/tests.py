@@ -1,3 +1,84 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from store.models import Product
+from users.serializers import MyTokenObtainPairSerializer
+from .models import CustomUser
+
+
+class SellerAuthenticationTests(TestCase):
+    """
+    Seller endpoints resolve the user and the seller profile together,
+    once per request.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.seller = CustomUser.objects.create_user(
+            email='seller@example.com', username='seller', password='pass12345',
+            role=CustomUser.Role.SELLER,
+        )
+        profile = self.seller.sellerprofile
+        profile.is_approved = True
+        profile.save()
+        self.product = Product.objects.create(
+            seller=profile, name='Mug', description='A mug',
+            price=Decimal('12.50'), stock=3, slug='mug',
+        )
+        self.client = self.client_for(self.seller)
+
+    def client_for(self, user):
+        client = APIClient()
+        token = MyTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def test_user_and_profile_in_one_query(self):
+        # One joined query for the user, one for the products
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/seller/dashboard/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_owner_check_needs_no_extra_queries(self):
+        # User, product, plus nothing for the ownership check
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/seller/dashboard/mug/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unapproved_seller(self):
+        self.seller.sellerprofile.is_approved = False
+        self.seller.sellerprofile.save()
+        self.assertEqual(self.client.get('/api/seller/dashboard/').status_code, 403)
+
+    @override_settings(JWT_STATELESS_READS=True)
+    def test_stateless_reads_skip_the_user_lookup(self):
+        # Profile, then products; afterwards the profile comes from the cache
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/seller/dashboard/').status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/seller/dashboard/').status_code, 200)
+
+        # Customers are turned away on their token's role alone
+        customer = CustomUser.objects.create_user(
+            email='buyer@example.com', username='buyer', password='pass12345',
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client_for(customer).get('/api/seller/dashboard/').status_code, 403)
+
+    @override_settings(JWT_STATELESS_READS=True)
+    def test_stateless_cache_follows_approval(self):
+        self.client.get('/api/seller/dashboard/')
+        profile = self.seller.sellerprofile
+        profile.is_approved = False
+        profile.save()
+        self.assertEqual(self.client.get('/api/seller/dashboard/').status_code, 403)
+
+    @override_settings(JWT_STATELESS_READS=True)
+    def test_stateless_mode_still_loads_user_for_writes(self):
+        self.seller.is_active = False
+        self.seller.save()
+        response = self.client.patch('/api/seller/dashboard/mug/', {'stock': 10}, format='json')
+        self.assertEqual(response.status_code, 401)
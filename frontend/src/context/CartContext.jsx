@@ -1,6 +1,7 @@
 // src/context/CartContext.jsx
 
-import React, { createContext, useState, useContext, useEffect } from 'react';
+import React, { createContext, useState, useContext, useEffect, useCallback } from 'react';
+import api from '../utils/api';
 
 // Create the context
 const CartContext = createContext();
@@ -75,6 +76,40 @@ export function CartProvider({ children }) {
     setCartItems([]); // Just set the cart to an empty array
   };
 
+  // --- Refresh Prices and Stock ---
+  // The cart keeps whatever a product looked like when it was added.
+  // This sends the whole cart to '/api/cart/validate/' (one request,
+  // one query on the server) and updates every line with the current
+  // price, stock and availability. Returns the server's answer, whose
+  // 'valid' says whether the cart can be checked out as is.
+  const refreshCart = useCallback(async () => {
+    if (cartItems.length === 0) return null;
+    const response = await api.post('/api/cart/validate/', {
+      items: cartItems.map((item) => ({
+        product_id: item.id,
+        quantity: item.quantity,
+        price: item.price,
+      })),
+    });
+    const lines = new Map(response.data.items.map((line) => [line.product_id, line]));
+    setCartItems((prevItems) =>
+      prevItems.map((item) => {
+        const line = lines.get(item.id);
+        if (!line || line.status === 'not_found') {
+          return { ...item, available: false, status: 'not_found' };
+        }
+        return {
+          ...item,
+          price: line.price,
+          stock: line.stock,
+          available: line.available,
+          status: line.status,
+        };
+      })
+    );
+    return response.data;
+  }, [cartItems]);
+
   // --- Get Total Cart Cost ---
   const getCartTotal = () => {
     return cartItems.reduce((total, item) => {
@@ -96,6 +131,7 @@ export function CartProvider({ children }) {
     getCartTotal,
     getCartCount,
     clearCart,
+    refreshCart,
   };
 
   return (
@@ -1,6 +1,6 @@
 // src/pages/CartPage.jsx
 
-import React from 'react';
+import React, { useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useCart } from '../context/CartContext';
 
@@ -10,9 +10,16 @@ function CartPage() {
     removeFromCart, 
     updateQuantity, 
     getCartTotal, 
-    getCartCount 
+    getCartCount,
+    refreshCart
   } = useCart();
 
+  // Bring prices and stock up to date once, when the page opens
+  useEffect(() => {
+    refreshCart().catch((err) => console.error(err));
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
   if (cartItems.length === 0) {
     return (
       <div className="text-center">
@@ -54,6 +61,13 @@ function CartPage() {
                   <div>
                     <h3 className="text-lg font-semibold">{item.name}</h3>
                     <p className="text-gray-600">${item.price}</p>
+                    {item.status && item.status !== 'ok' && (
+                      <p className="text-red-500 text-sm">
+                        {item.status === 'insufficient_stock'
+                          ? `Only ${item.stock} left in stock`
+                          : 'No longer available'}
+                      </p>
+                    )}
                   </div>
                 </div>
                 
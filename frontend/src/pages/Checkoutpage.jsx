@@ -53,7 +53,8 @@ function CheckoutPage() {
     setLoading(true);
     setError(null);
 
-    // --- Step 1: Create the Order in our Django DB ---
+    // --- Steps 1 & 2: Create the Order and get the Razorpay Order ID ---
+    // '/api/orders/checkout/' does both in one request
     try {
       // Format cart items for the backend serializer
       const orderItems = cartItems.map(item => ({
@@ -66,15 +67,13 @@ function CheckoutPage() {
         items: orderItems,
       };
 
-      const orderResponse = await api.post('/api/orders/create/', orderData);
-      const ourOrderId = orderResponse.data.id;
-
-      // --- Step 2: Get Razorpay Order ID from our backend ---
-      const paymentResponse = await api.post('/api/orders/pay/', { 
-        order_id: ourOrderId 
-      });
+      const paymentResponse = await api.post('/api/orders/checkout/', orderData);
       
-      const { razorpay_order_id, amount, key } = paymentResponse.data;
+      const { razorpay_order_id, amount, key, expires_at } = paymentResponse.data;
+
+      // The order only holds its stock until 'expires_at'; close the
+      // popup a minute before, so nobody pays for an expired order
+      const secondsLeft = Math.floor((Date.parse(expires_at) - Date.now()) / 1000) - 60;
 
       // --- Step 3: Open the Razorpay Payment Popup ---
       const options = {
@@ -84,6 +83,7 @@ function CheckoutPage() {
         name: "Emporia",
         description: "E-commerce Transaction",
         order_id: razorpay_order_id,
+        timeout: Math.max(secondsLeft, 60),
         
         // This 'handler' function is called when payment is successful
         handler: async function (response) {
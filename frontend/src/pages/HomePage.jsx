@@ -4,11 +4,17 @@ import React, { useState, useEffect } from 'react'
 import api from '../utils/api' // <-- Import our new API client
 import { Link } from 'react-router-dom'
 
+// The product fields a card on this page uses
+const CARD_FIELDS = 'id,slug,name,description,price,seller_name,image,image_variants,image_srcset'
+
 function HomePage() {
   // We'll use state to store our products, loading status, and any errors
   const [products, setProducts] = useState([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
+  // The product list is cursor-paginated; 'nextUrl' is the link to the next page
+  const [nextUrl, setNextUrl] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   // This 'useEffect' hook will run once when the component
   // first loads, thanks to the empty array [].
@@ -21,9 +27,12 @@ function HomePage() {
         // --- This is the API call! ---
         // We're using our 'api' instance to send a GET request to
         // the '/api/products/' endpoint we created in Django.
-        const response = await api.get('/api/products/')
+        // ?fields= asks only for what a product card shows; the 'next'
+        // links keep it, so later pages are narrowed too
+        const response = await api.get('/api/products/', { params: { fields: CARD_FIELDS } })
         
-        setProducts(response.data) // Save the products in our state
+        setProducts(response.data.results) // Save the products in our state
+        setNextUrl(response.data.next)
         setError(null) // Clear any previous errors
       } catch (err) {
         // Handle any errors from the API
@@ -38,6 +47,22 @@ function HomePage() {
     fetchProducts() // Call the function to run it
   }, []) // The empty array [] means "run this effect only once"
 
+  // Fetches the next page and appends it to the list
+  const loadMore = async () => {
+    if (!nextUrl) return
+    try {
+      setLoadingMore(true)
+      const response = await api.get(nextUrl)
+      setProducts((current) => [...current, ...response.data.results])
+      setNextUrl(response.data.next)
+    } catch (err) {
+      setError('Failed to fetch more products.')
+      console.error(err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   // --- Render logic ---
   if (loading) {
     return <div className="text-center">Loading products...</div>
@@ -65,11 +90,20 @@ function HomePage() {
               className="border rounded-lg p-4 shadow-lg hover:shadow-xl transition-shadow"
             >
               {product.image && (
-                <img 
-                  src={product.image} // We use the full URL from the API
-                  alt={product.name} 
-                  className="w-full h-48 object-cover rounded-md mb-4"
-                />
+                <picture>
+                  {/* Resized copies, once the backend has built them */}
+                  {product.image_srcset?.webp && (
+                    <source type="image/webp" srcSet={product.image_srcset.webp} sizes="(min-width: 768px) 33vw, 100vw" />
+                  )}
+                  <img 
+                    src={product.image_variants?.card?.jpeg || product.image} // Fall back to the original
+                    srcSet={product.image_srcset?.jpeg}
+                    sizes="(min-width: 768px) 33vw, 100vw"
+                    alt={product.name} 
+                    loading="lazy"
+                    className="w-full h-48 object-cover rounded-md mb-4"
+                  />
+                </picture>
               )}
               <h2 className="text-xl font-semibold">{product.name}</h2>
               <p className="text-gray-700 mt-2 truncate">{product.description}</p>
@@ -83,6 +117,18 @@ function HomePage() {
           ))}
         </div>
       )}
+
+      {nextUrl && (
+        <div className="text-center mt-8">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="bg-gray-800 text-white py-2 px-6 rounded hover:bg-gray-700"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
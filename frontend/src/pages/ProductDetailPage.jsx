@@ -51,7 +51,9 @@ function ProductDetailPage() {
         {/* Product Image */}
         <div>
           <img
-            src={product.image}
+            src={product.image_variants?.detail?.jpeg || product.image}
+            srcSet={product.image_srcset?.jpeg}
+            sizes="(min-width: 768px) 50vw, 100vw"
             alt={product.name}
             className="w-full h-auto object-cover rounded-lg shadow-md"
           />